@@ -0,0 +1,67 @@
+# Copyright [2024] [Ian Moore]
+# Distributed under the MIT License (license terms are at http://opensource.org/licenses/MIT).
+# Email: defipy.devs@gmail.com
+
+# Speed of the integer (uint112 wei) V2 core against the float V2 core, replaying the same recorded
+# swap sequence through swap_exact_tokens_for_tokens and swap_batch
+#
+# Run from the repository root:
+#   > python python/bench/v2/bench_integer_exchange.py
+
+BENCH_PATH = "python/bench/v2"
+
+import os
+import sys
+import time
+import numpy as np
+sys.path.append(os.getcwd().replace(BENCH_PATH,""))
+
+from python.prod.cpt.factory import UniswapFactory
+from python.prod.erc import ERC20
+from python.prod.utils.data import UniswapExchangeData
+
+USER_NM = 'user0'
+N_SWAPS = 20000
+SEED = 42
+
+def setup_lp(precision):
+    scale = 10**18 if precision == UniswapExchangeData.TYPE_GWEI else 1
+    eth = ERC20("ETH", "0x09")
+    tkn = ERC20("TKN", "0x111")
+    factory = UniswapFactory("BENCH pool factory", "0x2")
+    exchg_data = UniswapExchangeData(tkn0 = eth, tkn1 = tkn, symbol="LP", address="0x011",
+                                     precision = precision)
+    lp = factory.deploy(exchg_data)
+    lp.add_liquidity(USER_NM, 1000*scale, 100000*scale, 1000*scale, 100000*scale)
+    return (lp, eth, tkn)
+
+def record_swaps(n_swaps, seed):
+    rng = np.random.default_rng(seed)
+    token_in_flags = rng.integers(2, size=n_swaps).astype(bool)
+    amounts = rng.uniform(0.01, 1, size=n_swaps)
+    return (token_in_flags, amounts)
+
+def replay(precision, token_in_flags, amounts):
+    (lp, eth, tkn) = setup_lp(precision)
+    if precision == UniswapExchangeData.TYPE_GWEI:
+        amounts = [int(amt*10**18) for amt in amounts]
+    else:
+        amounts = list(amounts)
+    t0 = time.perf_counter()
+    for (flag, amt) in zip(token_in_flags, amounts):
+        lp.swap_exact_tokens_for_tokens(amt, 0, eth if flag else tkn, USER_NM)
+    t_swap = (time.perf_counter() - t0)/len(amounts)
+
+    (lp, eth, tkn) = setup_lp(precision)
+    t0 = time.perf_counter()
+    lp.swap_batch(token_in_flags, amounts, USER_NM)
+    t_batch = (time.perf_counter() - t0)/len(amounts)
+    return (t_swap, t_batch)
+
+if __name__ == '__main__':
+    (token_in_flags, amounts) = record_swaps(N_SWAPS, SEED)
+    print(f"{N_SWAPS} recorded swaps")
+    print(f"{'core':>8} {'swap (us)':>10} {'batch (us)':>11}")
+    for (name, precision) in [('float', UniswapExchangeData.TYPE_DEC), ('integer', UniswapExchangeData.TYPE_GWEI)]:
+        (t_swap, t_batch) = replay(precision, token_in_flags, amounts)
+        print(f"{name:>8} {1e6*t_swap:>10.1f} {1e6*t_batch:>11.1f}")
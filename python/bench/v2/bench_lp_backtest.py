@@ -0,0 +1,52 @@
+# Copyright [2024] [Ian Moore]
+# Distributed under the MIT License (license terms are at http://opensource.org/licenses/MIT).
+# Email: defipy.devs@gmail.com
+
+# Speed of the closed-form V2 backtest (LPBacktest) against the step by step SimpleLPSimulation,
+# which solves for the reserve deltas and updates the pool at every price of the path
+#
+# Run from the repository root:
+#   > python python/bench/v2/bench_lp_backtest.py
+
+BENCH_PATH = "python/bench/v2"
+
+import os
+import sys
+import time
+import numpy as np
+sys.path.append(os.getcwd().replace(BENCH_PATH,""))
+
+from python.prod.erc import ERC20
+from python.prod.simulate import SimpleLPSimulation
+from python.prod.simulate import LPBacktest
+
+N_STEPS = 500
+N_PATHS = [1, 100, 1000]
+SEED = 42
+
+def gen_paths(n_paths, n_steps, seed):
+    rng = np.random.default_rng(seed)
+    return 100*np.exp(np.cumsum(rng.normal(0, 0.01, size=(n_paths, n_steps)), axis=1))
+
+def setup_sim():
+    sim = SimpleLPSimulation()
+    sim.init_amts(1000, 100)
+    sim.create_lp(ERC20("ETH", "0x09"), ERC20("TKN", "0x111"))
+    return sim
+
+if __name__ == '__main__':
+    p_path = gen_paths(1, N_STEPS, SEED)[0]
+    sim = setup_sim()
+    t0 = time.perf_counter()
+    sim.run(p_path)
+    t_sim = time.perf_counter() - t0
+    print(f"{N_STEPS} steps per path")
+    print(f"{'engine':>20} {'paths':>6} {'time (ms)':>10} {'per path (ms)':>14}")
+    print(f"{'SimpleLPSimulation':>20} {1:>6} {1e3*t_sim:>10.1f} {1e3*t_sim:>14.3f}")
+    for n_paths in N_PATHS:
+        lp = setup_sim().get_lp()
+        p_paths = gen_paths(n_paths, N_STEPS, SEED)
+        t0 = time.perf_counter()
+        LPBacktest(lp).run(p_paths)
+        t_backtest = time.perf_counter() - t0
+        print(f"{'LPBacktest':>20} {n_paths:>6} {1e3*t_backtest:>10.1f} {1e3*t_backtest/n_paths:>14.3f}")
@@ -0,0 +1,86 @@
+# Copyright [2024] [Ian Moore]
+# Distributed under the MIT License (license terms are at http://opensource.org/licenses/MIT).
+# Email: defipy.devs@gmail.com
+
+# Throughput of the lock-step batch engine (UniswapV3Batch) against stepping one float64 pool
+# object per Monte Carlo path, on the same random swap paths
+#
+# Run from the repository root:
+#   > python python/bench/v3/bench_batch_engine.py
+
+BENCH_PATH = "python/bench/v3"
+
+import os
+import sys
+import copy
+import time
+import numpy as np
+sys.path.append(os.getcwd().replace(BENCH_PATH,""))
+
+from python.prod.cpt.factory import UniswapFactory
+from python.prod.erc import ERC20
+from python.prod.simulate import UniswapV3Batch
+from python.prod.utils.data import UniswapExchangeData
+from python.prod.utils.tools.v3 import UniV3Utils
+
+USER_NM = 'user0'
+N_STEPS = 50
+N_PATHS = [10, 100, 1000, 10000]
+N_POOLS_MAX = 1000
+SEED = 42
+
+def setup_lp():
+    fee = UniV3Utils.FeeAmount.MEDIUM
+    tick_spacing = UniV3Utils.TICK_SPACINGS[fee]
+    factory = UniswapFactory("BENCH pool factory", "0x2")
+    exchg_data = UniswapExchangeData(tkn0 = ERC20("TKN0", "0x09"), tkn1 = ERC20("TKN1", "0x111"),
+                                     symbol="LP", address="0x011", version = UniswapExchangeData.VERSION_V3,
+                                     tick_spacing = tick_spacing, fee = fee, engine = UniswapExchangeData.ENGINE_FLOAT)
+    lp = factory.deploy(exchg_data)
+    lp.initialize(UniV3Utils.encodePriceSqrt(1, 1))
+    lp.mint(USER_NM, UniV3Utils.getMinTick(tick_spacing), UniV3Utils.getMaxTick(tick_spacing), 1000)
+    for k in range(1, 21):
+        lp.mint(USER_NM, -60*k, 60*k, 50)
+    return lp
+
+def record_paths(n_paths, seed):
+    rng = np.random.default_rng(seed)
+    token_in_flags = rng.integers(2, size=(N_STEPS, n_paths)).astype(bool)
+    amounts = rng.uniform(1, 50, size=(N_STEPS, n_paths))
+    return (token_in_flags, amounts)
+
+def run_pools(lp, token_in_flags, amounts):
+    n_paths = amounts.shape[1]
+    pools = [copy.deepcopy(lp) for k in range(n_paths)]
+    t0 = time.perf_counter()
+    for step in range(N_STEPS):
+        for k, pool in enumerate(pools):
+            if token_in_flags[step, k]:
+                pool.swapExact0For1(USER_NM, amounts[step, k], None)
+            else:
+                pool.swapExact1For0(USER_NM, amounts[step, k], None)
+    prices = np.array([(pool.slot0.sqrtPriceX96/2**96)**2 for pool in pools])
+    return (time.perf_counter() - t0, prices)
+
+def run_batch(lp, token_in_flags, amounts):
+    batch = UniswapV3Batch(lp, amounts.shape[1])
+    t0 = time.perf_counter()
+    for step in range(N_STEPS):
+        batch.swap(token_in_flags[step], amounts[step])
+    return (time.perf_counter() - t0, batch.sqrtPrice**2)
+
+if __name__ == '__main__':
+    lp = setup_lp()
+    print(f"{N_STEPS} lock-step swaps per path")
+    print(f"{'paths':>7} {'pools (ms)':>11} {'batch (ms)':>11} {'speedup':>8} {'batch us/swap':>14} {'max rel err price':>18}")
+    for n_paths in N_PATHS:
+        (token_in_flags, amounts) = record_paths(n_paths, SEED)
+        (t_batch, price_batch) = run_batch(lp, token_in_flags, amounts)
+        if n_paths <= N_POOLS_MAX:
+            (t_pools, price_pools) = run_pools(lp, token_in_flags, amounts)
+            err = np.max(np.abs(price_batch - price_pools)/price_pools)
+            print(f"{n_paths:>7} {1e3*t_pools:>11.1f} {1e3*t_batch:>11.1f} {t_pools/t_batch:>8.1f} "
+                  f"{1e6*t_batch/(N_STEPS*n_paths):>14.2f} {err:>18.2e}")
+        else:
+            print(f"{n_paths:>7} {'-':>11} {1e3*t_batch:>11.1f} {'-':>8} "
+                  f"{1e6*t_batch/(N_STEPS*n_paths):>14.2f} {'-':>18}")
@@ -0,0 +1,94 @@
+# Copyright [2024] [Ian Moore]
+# Distributed under the MIT License (license terms are at http://opensource.org/licenses/MIT).
+# Email: defipy.devs@gmail.com
+
+# Accuracy and speed of the float64 V3 engine against the exact (Q64.96 integer) engine, replaying
+# the same recorded swap sequences on both
+#
+# Run from the repository root:
+#   > python python/bench/v3/bench_float_engine.py
+
+BENCH_PATH = "python/bench/v3"
+
+import os
+import sys
+import time
+import numpy as np
+sys.path.append(os.getcwd().replace(BENCH_PATH,""))
+
+from python.prod.cpt.factory import UniswapFactory
+from python.prod.erc import ERC20
+from python.prod.utils.data import UniswapExchangeData
+from python.prod.utils.tools.v3 import UniV3Utils
+
+USER_NM = 'user0'
+N_SWAPS = 2000
+SEED = 42
+
+# name: (swap size range in token units, positions as (lower tick, upper tick, liquidity))
+SEQUENCES = {
+    'in range' : ((0.01, 1), [(None, None, 10000), (-600, 600, 1000)]),
+    'crossing' : ((1, 50), [(None, None, 1000)] + [(-60*k, 60*k, 50) for k in range(1, 21)]),
+}
+
+def setup_lp(engine, positions):
+    fee = UniV3Utils.FeeAmount.MEDIUM
+    tick_spacing = UniV3Utils.TICK_SPACINGS[fee]
+    factory = UniswapFactory("BENCH pool factory", "0x2")
+    exchg_data = UniswapExchangeData(tkn0 = ERC20("TKN0", "0x09"), tkn1 = ERC20("TKN1", "0x111"),
+                                     symbol="LP", address="0x011", version = UniswapExchangeData.VERSION_V3,
+                                     tick_spacing = tick_spacing, fee = fee, engine = engine)
+    lp = factory.deploy(exchg_data)
+    lp.initialize(UniV3Utils.encodePriceSqrt(1, 1))
+    for (lwr_tick, upr_tick, liquidity) in positions:
+        lwr_tick = UniV3Utils.getMinTick(tick_spacing) if lwr_tick == None else lwr_tick
+        upr_tick = UniV3Utils.getMaxTick(tick_spacing) if upr_tick == None else upr_tick
+        lp.mint(USER_NM, lwr_tick, upr_tick, liquidity)
+    return lp
+
+def record_swaps(amount_range, n_swaps, seed):
+    rng = np.random.default_rng(seed)
+    token_in_flags = rng.integers(2, size=n_swaps).astype(bool)
+    amounts = rng.uniform(amount_range[0], amount_range[1], size=n_swaps)
+    return (token_in_flags, amounts)
+
+def replay(lp, token_in_flags, amounts):
+    n = len(amounts)
+    amount_out = np.zeros(n)
+    price = np.zeros(n)
+    t0 = time.perf_counter()
+    for k in range(n):
+        if token_in_flags[k]:
+            out = lp.swapExact0For1(USER_NM, amounts[k], None)
+            amount_out[k] = -out[2]
+        else:
+            out = lp.swapExact1For0(USER_NM, amounts[k], None)
+            amount_out[k] = -out[1]
+        price[k] = (lp.slot0.sqrtPriceX96/2**96)**2
+    return ((time.perf_counter() - t0)/n, amount_out, price)
+
+def rel_err(approx, exact):
+    return np.max(np.abs(approx - exact)/np.abs(exact))
+
+def bench(name):
+    (amount_range, positions) = SEQUENCES[name]
+    (token_in_flags, amounts) = record_swaps(amount_range, N_SWAPS, SEED)
+    lp_exact = setup_lp(UniswapExchangeData.ENGINE_EXACT, positions)
+    lp_float = setup_lp(UniswapExchangeData.ENGINE_FLOAT, positions)
+
+    (t_exact, out_exact, price_exact) = replay(lp_exact, token_in_flags, amounts)
+    (t_float, out_float, price_float) = replay(lp_float, token_in_flags, amounts)
+
+    reserves_exact = np.array([lp_exact.reserve0, lp_exact.reserve1], dtype=float)
+    reserves_float = np.array([lp_float.reserve0, lp_float.reserve1])
+    return (t_exact, t_float, rel_err(out_float, out_exact), rel_err(price_float, price_exact),
+            rel_err(reserves_float, reserves_exact), lp_exact.slot0.tick == lp_float.slot0.tick)
+
+if __name__ == '__main__':
+    print(f"{N_SWAPS} recorded swaps per sequence")
+    print(f"{'sequence':>10} {'exact (us)':>11} {'float (us)':>11} {'speedup':>8} "
+          f"{'max rel err out':>16} {'price':>9} {'reserves':>9} {'same tick':>10}")
+    for name in SEQUENCES:
+        (t_exact, t_float, err_out, err_price, err_reserves, same_tick) = bench(name)
+        print(f"{name:>10} {1e6*t_exact:>11.1f} {1e6*t_float:>11.1f} {t_exact/t_float:>8.2f} "
+              f"{err_out:>16.2e} {err_price:>9.2e} {err_reserves:>9.2e} {str(same_tick):>10}")
@@ -0,0 +1,82 @@
+# Copyright [2024] [Ian Moore]
+# Distributed under the MIT License (license terms are at http://opensource.org/licenses/MIT).
+# Email: defipy.devs@gmail.com
+
+# Startup cost of seeding a V3 pool with a liquidity distribution: one mint per position against
+# mint_many, and load_distribution from the resulting (tick, liquidityNet) columns
+#
+# Run from the repository root:
+#   > python python/bench/v3/bench_mint_many.py
+
+BENCH_PATH = "python/bench/v3"
+
+import os
+import sys
+import time
+import numpy as np
+sys.path.append(os.getcwd().replace(BENCH_PATH,""))
+
+from python.prod.cpt.factory import UniswapFactory
+from python.prod.erc import ERC20
+from python.prod.utils.data import UniswapExchangeData
+from python.prod.utils.tools.v3 import UniV3Utils
+
+USER_NM = 'user0'
+N_POSITIONS = [1000, 10000, 50000]
+SEED = 42
+
+def setup_lp(tick_store):
+    fee = UniV3Utils.FeeAmount.MEDIUM
+    factory = UniswapFactory("BENCH pool factory", "0x2")
+    exchg_data = UniswapExchangeData(tkn0 = ERC20("TKN0", "0x09"), tkn1 = ERC20("TKN1", "0x111"),
+                                     symbol="LP", address="0x011", version = UniswapExchangeData.VERSION_V3,
+                                     precision = UniswapExchangeData.TYPE_GWEI, tick_store = tick_store,
+                                     tick_spacing = UniV3Utils.TICK_SPACINGS[fee], fee = fee)
+    lp = factory.deploy(exchg_data)
+    lp.initialize(UniV3Utils.encodePriceSqrt(1, 1))
+    return lp
+
+def record_positions(n_positions, seed):
+    # ranges clustered around the price, like a mainnet pool
+    rng = np.random.default_rng(seed)
+    centers = np.round(rng.normal(0, 2000, n_positions)).astype(int)
+    widths = rng.integers(1, 400, n_positions)
+    tickLowers = 60*(centers - widths)
+    tickUppers = 60*(centers + widths)
+    amounts = rng.integers(10**15, 10**18, n_positions)
+    owners = [f"user{k % 100}" for k in range(n_positions)]
+    return (owners, tickLowers.tolist(), tickUppers.tolist(), amounts.tolist())
+
+def bench(n_positions, tick_store):
+    (owners, tickLowers, tickUppers, amounts) = record_positions(n_positions, SEED)
+
+    lp_mint = setup_lp(tick_store)
+    t0 = time.perf_counter()
+    for args in zip(owners, tickLowers, tickUppers, amounts):
+        lp_mint.mint(*args)
+    t_mint = time.perf_counter() - t0
+
+    lp_many = setup_lp(tick_store)
+    t0 = time.perf_counter()
+    lp_many.mint_many(owners, tickLowers, tickUppers, amounts)
+    t_many = time.perf_counter() - t0
+
+    ticks = lp_mint.ticks.sortedTicks
+    liquidityNet = [lp_mint.ticks[tick].liquidityNet for tick in ticks]
+    lp_load = setup_lp(tick_store)
+    t0 = time.perf_counter()
+    lp_load.load_distribution(USER_NM, ticks, liquidityNet)
+    t_load = time.perf_counter() - t0
+
+    same = (lp_many.ticks == lp_mint.ticks and lp_many.positions == lp_mint.positions
+            and (lp_many.reserve0, lp_many.reserve1) == (lp_mint.reserve0, lp_mint.reserve1))
+    return (t_mint, t_many, t_load, len(ticks), same)
+
+if __name__ == '__main__':
+    print(f"{'positions':>10} {'store':>6} {'ticks':>6} {'mint (s)':>9} {'mint_many (s)':>14} {'speedup':>8} "
+          f"{'load (s)':>9} {'same state':>11}")
+    for n_positions in N_POSITIONS:
+        for tick_store in [UniswapExchangeData.TICK_STORE_DICT, UniswapExchangeData.TICK_STORE_ARRAY]:
+            (t_mint, t_many, t_load, n_ticks, same) = bench(n_positions, tick_store)
+            print(f"{n_positions:>10} {tick_store:>6} {n_ticks:>6} {t_mint:>9.2f} {t_many:>14.2f} "
+                  f"{t_mint/t_many:>8.1f} {t_load:>9.2f} {str(same):>11}")
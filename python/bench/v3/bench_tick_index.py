@@ -0,0 +1,90 @@
+# Copyright [2024] [Ian Moore]
+# Distributed under the MIT License (license terms are at http://opensource.org/licenses/MIT).
+# Email: defipy.devs@gmail.com
+
+# Swap cost against the number of initialized ticks in a V3 pool
+#
+# Run from the repository root:
+#   > python python/bench/v3/bench_tick_index.py
+
+BENCH_PATH = "python/bench/v3"
+
+import os
+import sys
+import time
+sys.path.append(os.getcwd().replace(BENCH_PATH,""))
+
+from python.prod.cpt.factory import UniswapFactory
+from python.prod.erc import ERC20
+from python.prod.utils.data import UniswapExchangeData
+from python.prod.utils.tools.v3 import UniV3Utils
+from python.prod.utils.tools.v3.Shared import *
+
+USER_NM = 'user0'
+TICK_COUNTS = [10, 100, 1000, 4000]
+N_SWAPS = 50
+
+def setup_lp(n_ticks):
+    fee = UniV3Utils.FeeAmount.MEDIUM
+    tick_spacing = UniV3Utils.TICK_SPACINGS[fee]
+    factory = UniswapFactory("BENCH pool factory", "0x2")
+    exchg_data = UniswapExchangeData(tkn0 = ERC20("TKN0", "0x09"), tkn1 = ERC20("TKN1", "0x111"),
+                                     symbol="LP", address="0x011", version = UniswapExchangeData.VERSION_V3,
+                                     precision = UniswapExchangeData.TYPE_GWEI,
+                                     tick_spacing = tick_spacing, fee = fee)
+    lp = factory.deploy(exchg_data)
+    lp.initialize(UniV3Utils.encodePriceSqrt(1, 1))
+    lwr_tick = UniV3Utils.getMinTick(tick_spacing)
+    upr_tick = UniV3Utils.getMaxTick(tick_spacing)
+    lp.mint(USER_NM, lwr_tick, upr_tick, UniV3Utils.expandTo18Decimals(1000))
+
+    # Narrow positions on both sides of the current price
+    for k in range(n_ticks//2):
+        lp.mint(USER_NM, -(k+1)*tick_spacing, (k+1)*tick_spacing, UniV3Utils.expandTo18Decimals(1))
+    return lp
+
+def naive_next_tick(ticks, tick, lte):
+    # Previous implementation: sort every initialized tick on each lookup
+    keyList = list(ticks.keys())
+    if not ticks.__contains__(tick):
+        keyList += [tick]
+    sortedKeyList = sorted(keyList)
+    indexCurrentTick = sortedKeyList.index(tick)
+    if lte:
+        if ticks.__contains__(tick):
+            return tick, True
+        elif indexCurrentTick == 0:
+            return MIN_TICK, False
+        return sortedKeyList[indexCurrentTick - 1], True
+    if indexCurrentTick == len(sortedKeyList) - 1:
+        return MAX_TICK, False
+    return sortedKeyList[indexCurrentTick + 1], True
+
+def bench(n_ticks):
+    lp = setup_lp(n_ticks)
+    amount = UniV3Utils.expandTo18Decimals(1)
+
+    t0 = time.perf_counter()
+    for k in range(N_SWAPS):
+        lp.swapExact0For1(USER_NM, amount, None)
+        lp.swapExact1For0(USER_NM, amount, None)
+    t_swap = (time.perf_counter() - t0)/(2*N_SWAPS)
+
+    tick = lp.slot0.tick
+    t0 = time.perf_counter()
+    for k in range(N_SWAPS):
+        lp.ticks.nextInitializedTick(tick, True)
+    t_bisect = (time.perf_counter() - t0)/N_SWAPS
+
+    t0 = time.perf_counter()
+    for k in range(N_SWAPS):
+        naive_next_tick(lp.ticks, tick, True)
+    t_sort = (time.perf_counter() - t0)/N_SWAPS
+
+    return (len(lp.ticks), t_swap, t_bisect, t_sort)
+
+if __name__ == '__main__':
+    print(f"{'ticks':>8} {'swap (us)':>12} {'nextTick bisect (us)':>22} {'nextTick sort (us)':>20}")
+    for n_ticks in TICK_COUNTS:
+        (n, t_swap, t_bisect, t_sort) = bench(n_ticks)
+        print(f"{n:>8} {1e6*t_swap:>12.1f} {1e6*t_bisect:>22.2f} {1e6*t_sort:>20.2f}")
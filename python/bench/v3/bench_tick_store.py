@@ -0,0 +1,76 @@
+# Copyright [2024] [Ian Moore]
+# Distributed under the MIT License (license terms are at http://opensource.org/licenses/MIT).
+# Email: defipy.devs@gmail.com
+
+# Memory and swap cost of the dict (TickMap) and array-backed (TickArrayStore) tick stores
+#
+# Run from the repository root:
+#   > python python/bench/v3/bench_tick_store.py
+
+BENCH_PATH = "python/bench/v3"
+
+import os
+import sys
+import time
+import tracemalloc
+from copy import copy
+sys.path.append(os.getcwd().replace(BENCH_PATH,""))
+
+from python.prod.cpt.factory import UniswapFactory
+from python.prod.erc import ERC20
+from python.prod.utils.data import UniswapExchangeData
+from python.prod.utils.tools.v3 import UniV3Utils
+from python.prod.utils.tools.v3.Shared import TickInfo
+
+USER_NM = 'user0'
+TICK_COUNTS = [1000, 10000, 40000]
+N_SWAPS = 50
+
+def setup_lp(n_ticks, tick_store):
+    fee = UniV3Utils.FeeAmount.LOW
+    tick_spacing = UniV3Utils.TICK_SPACINGS[fee]
+    factory = UniswapFactory("BENCH pool factory", "0x2")
+    exchg_data = UniswapExchangeData(tkn0 = ERC20("TKN0", "0x09"), tkn1 = ERC20("TKN1", "0x111"),
+                                     symbol="LP", address="0x011", version = UniswapExchangeData.VERSION_V3,
+                                     precision = UniswapExchangeData.TYPE_GWEI,
+                                     tick_spacing = tick_spacing, fee = fee, tick_store = tick_store)
+    lp = factory.deploy(exchg_data)
+    lp.initialize(UniV3Utils.encodePriceSqrt(1, 1))
+    lp.mint(USER_NM, UniV3Utils.getMinTick(tick_spacing), UniV3Utils.getMaxTick(tick_spacing),
+            UniV3Utils.expandTo18Decimals(1000))
+
+    # Narrow positions on both sides of the current price
+    for k in range(n_ticks//2):
+        lp.mint(USER_NM, -(k+1)*tick_spacing, (k+1)*tick_spacing, UniV3Utils.expandTo18Decimals(1))
+    return lp
+
+def tick_memory(lp):
+    # Allocations kept alive by a copy of the pool's tick store
+    items = [(tick, copy(lp.ticks[tick])) for tick in lp.ticks.sortedTicks]
+    store = lp.ticks.__class__()
+    tracemalloc.start()
+    for (tick, info) in items:
+        store[tick] = TickInfo(info.liquidityGross, info.liquidityNet,
+                               info.feeGrowthOutside0X128, info.feeGrowthOutside1X128)
+    (size, _) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size
+
+def bench(n_ticks, tick_store):
+    lp = setup_lp(n_ticks, tick_store)
+    amount = UniV3Utils.expandTo18Decimals(1)
+
+    t0 = time.perf_counter()
+    for k in range(N_SWAPS):
+        lp.swapExact0For1(USER_NM, amount, None)
+        lp.swapExact1For0(USER_NM, amount, None)
+    t_swap = (time.perf_counter() - t0)/(2*N_SWAPS)
+
+    return (len(lp.ticks), tick_memory(lp), t_swap)
+
+if __name__ == '__main__':
+    print(f"{'ticks':>8} {'store':>6} {'memory (kB)':>12} {'bytes/tick':>11} {'swap (us)':>10}")
+    for n_ticks in TICK_COUNTS:
+        for tick_store in [UniswapExchangeData.TICK_STORE_DICT, UniswapExchangeData.TICK_STORE_ARRAY]:
+            (n, mem, t_swap) = bench(n_ticks, tick_store)
+            print(f"{n:>8} {tick_store:>6} {mem/1e3:>12.1f} {mem/n:>11.1f} {1e6*t_swap:>10.1f}")
@@ -7,10 +7,20 @@ from ...erc import LPERC20
 from ...utils.interfaces import IExchange 
 from ...utils.data import UniswapExchangeData
 from ...utils.data import FactoryData
+from ...utils.tools import StateJournal
+from ...utils.tools import PriceOracle
+from ...utils.tools import FeeLedger
 import math
+import numpy as np
 
 MINIMUM_LIQUIDITY = 1e-15
 
+# Pool state restored by a rolled back transaction (liquidity_providers is recorded per account)
+JOURNAL_FIELDS = ['reserve0', 'reserve1', 'aggr_fee0', 'aggr_fee1', 'collected_fee0', 'collected_fee1',
+                  'last_liquidity_deposit', 'total_supply', 'token_total', 'price0_cumulative_last',
+                  'price1_cumulative_last', 'block_timestamp_last']
+JOURNAL_STRUCTS = ['oracle', 'fee_ledger']
+
 class UniswapExchange(IExchange, LPERC20):
     
     """ 
@@ -31,17 +41,24 @@ class UniswapExchange(IExchange, LPERC20):
         self.token1 = exchg_struct.tkn1.token_name       
         self.reserve0 = 0             
         self.reserve1 = 0       
-        self.fee0_arr = []
-        self.fee1_arr = []
         self.aggr_fee0 = 0
         self.aggr_fee1 = 0
         self.collected_fee0 = 0
         self.collected_fee1 = 0              
         self.name =  f"{self.token0}-{self.token1}"
         self.symbol = exchg_struct.symbol
+        self.precision = exchg_struct.precision
         self.liquidity_providers = {}
         self.last_liquidity_deposit = 0
         self.total_supply = 0
+        self.price0_cumulative_last = 0
+        self.price1_cumulative_last = 0
+        self.block_timestamp_last = 0
+        self.block_timestamp = 0
+        self.state_version = 0
+        self.oracle = PriceOracle(exchg_struct.observation_cardinality)
+        self.fee_ledger = FeeLedger(exchg_struct.fee_history)
+        self.journal = StateJournal(self, JOURNAL_FIELDS, JOURNAL_STRUCTS)
 
     def summary(self):
 
@@ -53,6 +70,127 @@ class UniswapExchange(IExchange, LPERC20):
         print(f"Reserves: {self.token0} = {self.reserve0}, {self.token1} = {self.reserve1}")
         print(f"Liquidity: {self.total_supply} \n")
 
+    def transaction(self):
+
+        """ transaction
+
+            Context manager which groups several pool updates: if the enclosed block raises 
+            (eg. a failed assert halfway through a multi-step process) the pool, its liquidity 
+            providers and the ERC20 totals are restored to their state at the start of the block. 
+            Transactions can be nested.
+
+            Returns
+            -------
+            transaction : contextmanager
+                with lp.transaction(): ...           
+        """
+
+        return self.journal.transaction()
+
+    def set_block_timestamp(self, block_timestamp):
+
+        """ set_block_timestamp
+
+            Set the pool clock (seconds) used by the price accumulators; the simulation has no 
+            blocks, so the caller advances it between pool updates
+                
+            Parameters
+            -----------------
+            block_timestamp : int
+                Current timestamp, non-decreasing                     
+        """  
+
+        assert block_timestamp >= self.block_timestamp, 'UniswapV2: TIMESTAMP'
+        self.block_timestamp = block_timestamp
+
+    def observe(self, seconds_agos):
+
+        """ observe
+
+            Cumulative prices as of each timestamp `seconds_ago` from the current block timestamp; 
+            the TWAP over a period is the difference of the cumulative prices at both ends divided 
+            by its length. Observations live in a ring of observation_cardinality slots, and each 
+            lookup is a binary search over the ring.
+                
+            Parameters
+            -----------------
+            seconds_agos : list
+                How long ago each cumulative price should be returned
+
+            Returns
+            -------
+            price0_cumulatives : list
+                Cumulative token0 prices (in token1) as of each seconds_ago
+            price1_cumulatives : list
+                Cumulative token1 prices (in token0) as of each seconds_ago
+        """  
+
+        price0_cumulative = self.price0_cumulative_last
+        price1_cumulative = self.price1_cumulative_last
+        time_elapsed = self.block_timestamp - self.block_timestamp_last
+        if time_elapsed > 0 and self.reserve0 != 0 and self.reserve1 != 0:
+            price0_cumulative += (self.reserve1/self.reserve0)*time_elapsed
+            price1_cumulative += (self.reserve0/self.reserve1)*time_elapsed
+        return self.oracle.observe(self.block_timestamp, seconds_agos, price0_cumulative, price1_cumulative)
+
+    def get_fees(self, n_swaps = None, since = None):
+
+        """ get_fees
+
+            Swap fees collected by the pool: over the last n_swaps swaps, over the swaps made at 
+            or after the timestamp since, or in total. Served from the running sums of the fee 
+            ledger, so the cost does not depend on the length of the history.
+                
+            Parameters
+            -----------------
+            n_swaps : int
+                Number of most recent swaps, at most fee_history
+            since : int
+                Block timestamp
+
+            Returns
+            -------
+            fee0 : float
+                Fees from reserve0
+            fee1 : float
+                Fees from reserve1
+        """  
+
+        if n_swaps != None:
+            return self.fee_ledger.window(n_swaps)
+        if since != None:
+            return self.fee_ledger.since(since)
+        return self.fee_ledger.total0, self.fee_ledger.total1
+
+    def last_fees(self):
+
+        """ last_fees
+
+            Swap fees of the most recent swap, in constant time (unlike fee0_arr[-1] and 
+            fee1_arr[-1], which copy the whole history)
+
+            Returns
+            -------
+            fee0 : float
+                Fee from reserve0
+            fee1 : float
+                Fee from reserve1
+        """  
+
+        return self.fee_ledger.latest()
+
+    @property
+    def fee0_arr(self):
+        # Per swap fees from reserve0 kept in the fee ledger, oldest first; kept for compatibility,
+        # each access copies the retained history (O(n)), see last_fees and get_fees
+        return self.fee_ledger.fees()[0].tolist()
+
+    @property
+    def fee1_arr(self):
+        # Per swap fees from reserve1 kept in the fee ledger, oldest first; kept for compatibility,
+        # each access copies the retained history (O(n)), see last_fees and get_fees
+        return self.fee_ledger.fees()[1].tolist()
+
     def add_liquidity(self, _from_addr, amountADesired, amountBDesired, amountAMin, amountBMin):
         
         """ add_liquidity
@@ -245,6 +383,109 @@ class UniswapExchange(IExchange, LPERC20):
             
         return amount_out_expected
 
+    def swap_batch(self, token_in_flags, amounts, to_addr):
+        
+        """ swap_batch
+
+            Apply a sequence of exact input swaps in order; the resulting pool and ERC20 state is 
+            identical to calling Swap().apply for each of them, without its per-call overhead. The 
+            batch is atomic: if any swap reverts, none of them is applied.
+                
+            Parameters
+            -----------------
+            token_in_flags : numpy.ndarray
+                Swap directions, True when token0 is swapped in and False when token1 is swapped in
+            amounts : numpy.ndarray
+                Swap amounts in
+            to_addr : str
+               receiving user address  
+                
+            Returns
+            -------
+            batch : dict
+                numpy arrays 'amount_out', 'price' (token0 price in token1), 'reserve0' and 'reserve1' 
+                after each swap                    
+        """          
+        
+        token_in_flags = np.asarray(token_in_flags, dtype=bool).tolist()
+        amounts = np.asarray(amounts, dtype=float).tolist()
+        assert len(token_in_flags) == len(amounts), 'UniswapV2: BATCH_LENGTH_MISMATCH'
+        
+        tokens = self.factory.token_from_exchange[self.name]
+        tkn0 = tokens.get(self.token0)
+        tkn1 = tokens.get(self.token1)
+        assert tkn0.token_addr != to_addr, 'UniswapV2: INVALID_TO_ADDRESS'
+        assert tkn1.token_addr != to_addr, 'UniswapV2: INVALID_TO_ADDRESS'
+
+        # Same float operations, in the same order, as get_amount_out + swap_exact_tokens_for_tokens
+        balanceA = tkn0.token_total
+        balanceB = tkn1.token_total
+        reserve0 = self.reserve0
+        reserve1 = self.reserve1
+        collected_fee0 = self.collected_fee0
+        collected_fee1 = self.collected_fee1
+        aggr_fee0 = self.aggr_fee0
+        aggr_fee1 = self.aggr_fee1
+        n = len(amounts)
+        fee0_arr = [0]*n
+        fee1_arr = [0]*n
+        amount_out_arr = [0]*n
+        reserve0_arr = [0]*n
+        reserve1_arr = [0]*n
+        
+        for k in range(n):
+            amount_in = amounts[k]
+            assert amount_in > 0, 'UniswapV2Library: INSUFFICIENT_INPUT_AMOUNT'
+            assert reserve0 > 0 and reserve1 > 0, 'UniswapV2Library: INSUFFICIENT_LIQUIDITY'
+            amount_in_with_fee = amount_in * 997 
+            if token_in_flags[k]:
+                amountA_out = 0
+                amountB_out = (amount_in * 997  * reserve1) / (reserve0 * 1000 + amount_in_with_fee)
+                assert amountB_out > 0, 'UniswapV2: INSUFFICIENT_OUTPUT_AMOUNT'
+                balanceA += amount_in
+            else:
+                amountA_out = (amount_in_with_fee * reserve0) / (reserve1 * 1000 + amount_in_with_fee)
+                amountB_out = 0
+                assert amountA_out > 0, 'UniswapV2: INSUFFICIENT_OUTPUT_AMOUNT'
+                balanceB += amount_in
+            assert amountA_out < reserve0 and amountB_out < reserve1, 'UniswapV2: INSUFFICIENT_LIQUIDITY'
+            
+            balanceA -= amountA_out
+            balanceB -= amountB_out
+            amountA_in = balanceA - (reserve0 - amountA_out) if balanceA > reserve0 - amountA_out else 0
+            amountB_in = balanceB - (reserve1 - amountB_out) if balanceB > reserve1 - amountB_out else 0
+            assert amountA_in > 0 or amountB_in > 0, 'UniswapV2: INSUFFICIENT_INPUT_AMOUNT'
+            
+            reserve0 = balanceA
+            reserve1 = balanceB
+            fee0 = amountA_in * 3 / 1000
+            fee1 = amountB_in * 3 / 1000
+            fee0_arr[k] = fee0
+            fee1_arr[k] = fee1
+            collected_fee0 += fee0 
+            collected_fee1 += fee1        
+            aggr_fee0 += fee0 
+            aggr_fee1 += fee1
+            amount_out_arr[k] = amountA_out + amountB_out
+            reserve0_arr[k] = reserve0
+            reserve1_arr[k] = reserve1
+
+        tkn0.token_total = balanceA
+        tkn1.token_total = balanceB
+        self._update(reserve0, reserve1)
+        self._log_fees(fee0_arr, fee1_arr)
+        self.collected_fee0 = collected_fee0
+        self.collected_fee1 = collected_fee1
+        self.aggr_fee0 = aggr_fee0
+        self.aggr_fee1 = aggr_fee1
+        
+        reserve0_arr = np.array(reserve0_arr, dtype=float)
+        reserve1_arr = np.array(reserve1_arr, dtype=float)
+        return {'amount_out' : np.array(amount_out_arr, dtype=float),
+                'price' : reserve1_arr/reserve0_arr,
+                'reserve0' : reserve0_arr,
+                'reserve1' : reserve1_arr}
+
     def burn(self, to_addr, liquidity, amountA, amountB):
         
         """ burn
@@ -288,6 +529,8 @@ class UniswapExchange(IExchange, LPERC20):
                 amount of liquidity to be burned                           
         """            
         
+        if self.journal.savepoints:
+            self.journal.record(self.liquidity_providers, to_addr)
         available_liquidity = self.liquidity_providers.get(to_addr)
         self.liquidity_providers[to_addr] = available_liquidity - value
         self.total_supply -= value
@@ -338,7 +581,9 @@ class UniswapExchange(IExchange, LPERC20):
         
         """ _update
 
-            Update reserve amounts for both coins in the pair
+            Update reserve amounts for both coins in the pair and, on the first update of a 
+            block, the price accumulators; bumps the state version (mint, burn and swap all 
+            end here)
                 
             Parameters
             -----------------   
@@ -348,8 +593,19 @@ class UniswapExchange(IExchange, LPERC20):
                 new reserve amount of B                   
         """         
         
+        time_elapsed = self.block_timestamp - self.block_timestamp_last
+        if time_elapsed > 0 and self.reserve0 != 0 and self.reserve1 != 0:
+            self.price0_cumulative_last += (self.reserve1/self.reserve0)*time_elapsed
+            self.price1_cumulative_last += (self.reserve0/self.reserve1)*time_elapsed
+        
+        if self.journal.savepoints:
+            self.journal.record(self.oracle.observations, (self.oracle.index + 1) % self.oracle.size)
+        self.oracle.write(self.block_timestamp, self.price0_cumulative_last, self.price1_cumulative_last)
+        
         self.reserve0 = balanceA
         self.reserve1 = balanceB
+        self.block_timestamp_last = self.block_timestamp
+        self.state_version += 1
 
     def _mint(self, to_addr, value):
         
@@ -365,6 +621,8 @@ class UniswapExchange(IExchange, LPERC20):
                 amount of new liquidity                  
         """          
         
+        if self.journal.savepoints:
+            self.journal.record(self.liquidity_providers, to_addr)
         if self.liquidity_providers.get(to_addr):
             self.liquidity_providers[to_addr] += value
         else:
@@ -386,12 +644,32 @@ class UniswapExchange(IExchange, LPERC20):
             fee1 : float
                 fee from reserve1                 
         """         
-        self.fee0_arr.append(fee0)
-        self.fee1_arr.append(fee1)
+        if self.journal.savepoints:
+            for slot in self.fee_ledger.slots(1):
+                self.journal.record(self.fee_ledger.history, slot)
+        self.fee_ledger.write(self.block_timestamp, fee0, fee1)
         self.collected_fee0 += fee0 
         self.collected_fee1 += fee1        
         self.aggr_fee0 += fee0 
         self.aggr_fee1 += fee1
+
+    def _log_fees(self, fees0, fees1):
+        
+        """ _log_fees
+
+            Add the fees of a batch of swaps to the fee ledger
+                
+            Parameters
+            -----------------   
+            fees0 : list
+                fees from reserve0      
+            fees1 : list
+                fees from reserve1                 
+        """         
+        if self.journal.savepoints:
+            for slot in self.fee_ledger.slots(len(fees0)):
+                self.journal.record(self.fee_ledger.history, slot)
+        self.fee_ledger.extend(self.block_timestamp, fees0, fees1)
         
     def swap(self, amountA_out, amountB_out, to_addr):
         
@@ -0,0 +1,453 @@
+# Copyright [2024] [Ian Moore]
+# Distributed under the MIT License (license terms are at http://opensource.org/licenses/MIT).
+# Email: defipy.devs@gmail.com
+
+import math
+import numpy as np
+from ...utils.data import UniswapExchangeData
+from ...utils.data import FactoryData
+from ...utils.tools import FeeLedger
+from .UniswapExchange import UniswapExchange
+
+MINIMUM_LIQUIDITY = 1000
+MAX_UINT112 = 2**112 - 1
+
+class UniswapIntegerExchange(UniswapExchange):
+
+    """
+        Uniswap V2 Exchange, integer core
+
+        Version of UniswapExchange with the arithmetic of the UniswapV2Pair contract: reserves,
+        token totals, liquidity and every amount are integers in wei (machine units), reserves
+        have uint112 semantics, amounts out use the exact 997/1000 fee math rounded down, and
+        each swap checks the K invariant on the fee adjusted balances. Swaps update the ERC20
+        totals and the reserves directly, with the pair tokens looked up once. Deployed by
+        UniswapFactory for a V2 pool when exchg_struct.engine is ENGINE_INTEGER.
+
+        Parameters
+        -----------------
+        factory_struct : FactoryInit
+            Factory initialization data
+        exchg_struct : UniswapExchangeInit
+            Exchange initialization data
+    """
+
+    def __init__(self, factory_struct: FactoryData, exchg_struct: UniswapExchangeData):
+        super().__init__(factory_struct, exchg_struct)
+        self.fee_ledger = FeeLedger(exchg_struct.fee_history, dtype=object)
+        self.tokens = None
+
+    def _add_liquidity(self, amountADesired, amountBDesired, amountAMin, amountBMin):
+
+        """ _add_liquidity
+
+            Amounts of each token to add, at the current reserve ratio
+
+            Parameters
+            -----------------
+            amountADesired : int
+                desired amount of A
+            amountBDesired : int
+                desired amount of B
+            amountAMin : int
+                Minimum amount of A
+            amountBMin : int
+                Minimum amount of B
+
+            Returns
+            -------
+            amountA : int
+                amount of A to add
+            amountB : int
+                amount of B to add
+        """
+
+        if self.reserve0 == 0 and self.reserve1 == 0:
+            return amountADesired, amountBDesired
+
+        amountBOptimal = self.quote(amountADesired, self.reserve0, self.reserve1)
+        if amountBOptimal <= amountBDesired:
+            assert amountBOptimal >= amountBMin, 'UniswapV2: INSUFFICIENT_B_AMOUNT'
+            return amountADesired, amountBOptimal
+        amountAOptimal = self.quote(amountBDesired, self.reserve1, self.reserve0)
+        assert amountAOptimal <= amountADesired
+        assert amountAOptimal >= amountAMin, 'UniswapV2: INSUFFICIENT_A_AMOUNT'
+        return amountAOptimal, amountBDesired
+
+    def get_amounts(self, to_addr, liquidity):
+
+        """ get_amounts
+
+            Amounts of each token returned by burning lp amount (rounded down)
+
+            Parameters
+            -----------------
+            to_addr : str
+                receiving user address
+            liquidity : int
+                lp amount
+
+            Returns
+            -------
+            amountA : int
+                liquidity portion of reserve0
+            amountB : int
+                liquidity portion of reserve1
+        """
+
+        (tkn0, tkn1) = self._pair_tokens()
+        liquidity = min(liquidity, self.liquidity_providers[to_addr])
+        amountA = liquidity * tkn0.token_total // self.total_supply
+        amountB = liquidity * tkn1.token_total // self.total_supply
+        return amountA, amountB
+
+    def remove_liquidity(self, to_addr, liquidity, amountAMin, amountBMin):
+
+        """ remove_liquidity
+
+            Remove liquidity from both coins in the pair based on lp amount
+
+            Parameters
+            -----------------
+            to_addr : str
+                receiving user address
+            liquidity : int
+                lp amount to removed
+            amountAMin : int
+                Minimum amount of A
+            amountBMin : int
+                Minimum amount of B
+
+            Returns
+            -------
+            amountA : int
+                removed liquidity from reserve0
+            amountB : int
+                removed liquidity from reserve1
+        """
+
+        liquidity = min(liquidity, self.liquidity_providers[to_addr])
+        amountA, amountB = self.get_amounts(to_addr, liquidity)
+        assert amountA > 0 and amountB > 0, 'UniswapV2: INSUFFICIENT_LIQUIDITY_BURNED'
+        assert amountA >= amountAMin, 'UniswapV2: INSUFFICIENT_A_AMOUNT'
+        assert amountB >= amountBMin, 'UniswapV2: INSUFFICIENT_B_AMOUNT'
+
+        self.burn(to_addr, liquidity, amountA, amountB)
+        return amountA, amountB
+
+    def swap_exact_tokens_for_tokens(self, amountIn, amountOutMin, token_in, to_addr):
+
+        """ swap_exact_tokens_for_tokens
+
+            Swap amt of token for min opposing token out
+
+            Parameters
+            -----------------
+            amountIn : int
+                swap amount in
+            amountOutMin : int
+                min swap amount in
+            token_in : ERC20
+                Token to be swapped
+            to_addr : str
+               receiving user address
+
+            Returns
+            -------
+            amount_out_expected : int
+                amount expected from the swap
+        """
+
+        assert type(amountIn) == int, 'UniswapV2: NOT_INTEGER'
+        amount_out_expected = self.get_amount_out(amountIn, token_in)
+        assert amount_out_expected >= amountOutMin, 'UniswapV2: INSUFFICIENT_OUTPUT_AMOUNT'
+
+        # The amount in is transferred along with the swap, so a reverted swap transfers nothing
+        if(token_in.token_name == self.token0):
+            self._swap(0, amount_out_expected, to_addr, amountIn, 0)
+        elif(token_in.token_name == self.token1):
+            self._swap(amount_out_expected, 0, to_addr, 0, amountIn)
+
+        return amount_out_expected
+
+    def swap_batch(self, token_in_flags, amounts, to_addr):
+
+        """ swap_batch
+
+            Apply a sequence of exact input swaps in order, with the same pool and ERC20 state as
+            one swap_exact_tokens_for_tokens each; atomic, if any swap reverts none is applied
+
+            Parameters
+            -----------------
+            token_in_flags : numpy.ndarray
+                Swap directions, True when token0 is swapped in and False when token1 is swapped in
+            amounts : list
+                Swap amounts in (int)
+            to_addr : str
+               receiving user address
+
+            Returns
+            -------
+            batch : dict
+                'amount_out', 'reserve0' and 'reserve1' after each swap (object arrays of ints) and
+                'price' (token0 price in token1, float64)
+        """
+
+        token_in_flags = np.asarray(token_in_flags, dtype=bool).tolist()
+        # Object dtype keeps Python ints, which NumPy would turn into floats past 2**63
+        amounts = np.asarray(amounts, dtype=object).tolist()
+        assert len(token_in_flags) == len(amounts), 'UniswapV2: BATCH_LENGTH_MISMATCH'
+
+        (tkn0, tkn1) = self._pair_tokens()
+        assert tkn0.token_addr != to_addr, 'UniswapV2: INVALID_TO_ADDRESS'
+        assert tkn1.token_addr != to_addr, 'UniswapV2: INVALID_TO_ADDRESS'
+
+        # Same integer operations, in the same order, as swap_exact_tokens_for_tokens
+        balanceA = tkn0.token_total
+        balanceB = tkn1.token_total
+        reserve0 = self.reserve0
+        reserve1 = self.reserve1
+        n = len(amounts)
+        fee0_arr = [0]*n
+        fee1_arr = [0]*n
+        amount_out_arr = [0]*n
+        reserve0_arr = [0]*n
+        reserve1_arr = [0]*n
+
+        for k in range(n):
+            amount_in = amounts[k]
+            assert type(amount_in) == int, 'UniswapV2: NOT_INTEGER'
+            assert amount_in > 0, 'UniswapV2Library: INSUFFICIENT_INPUT_AMOUNT'
+            assert reserve0 > 0 and reserve1 > 0, 'UniswapV2Library: INSUFFICIENT_LIQUIDITY'
+            amount_in_with_fee = amount_in * 997
+            if token_in_flags[k]:
+                amountA_out = 0
+                amountB_out = amount_in_with_fee * reserve1 // (reserve0 * 1000 + amount_in_with_fee)
+                assert amountB_out > 0, 'UniswapV2: INSUFFICIENT_OUTPUT_AMOUNT'
+                balanceA += amount_in
+            else:
+                amountA_out = amount_in_with_fee * reserve0 // (reserve1 * 1000 + amount_in_with_fee)
+                amountB_out = 0
+                assert amountA_out > 0, 'UniswapV2: INSUFFICIENT_OUTPUT_AMOUNT'
+                balanceB += amount_in
+            assert amountA_out < reserve0 and amountB_out < reserve1, 'UniswapV2: INSUFFICIENT_LIQUIDITY'
+
+            balanceA -= amountA_out
+            balanceB -= amountB_out
+            amountA_in = balanceA - (reserve0 - amountA_out) if balanceA > reserve0 - amountA_out else 0
+            amountB_in = balanceB - (reserve1 - amountB_out) if balanceB > reserve1 - amountB_out else 0
+            assert amountA_in > 0 or amountB_in > 0, 'UniswapV2: INSUFFICIENT_INPUT_AMOUNT'
+            assert (balanceA * 1000 - amountA_in * 3) * (balanceB * 1000 - amountB_in * 3) >= (
+                reserve0 * reserve1 * 1000**2), 'UniswapV2: K'
+            assert balanceA <= MAX_UINT112 and balanceB <= MAX_UINT112, 'UniswapV2: OVERFLOW'
+
+            reserve0 = balanceA
+            reserve1 = balanceB
+            fee0_arr[k] = amountA_in * 3 // 1000
+            fee1_arr[k] = amountB_in * 3 // 1000
+            amount_out_arr[k] = amountA_out + amountB_out
+            reserve0_arr[k] = reserve0
+            reserve1_arr[k] = reserve1
+
+        tkn0.token_total = balanceA
+        tkn1.token_total = balanceB
+        self._update(reserve0, reserve1)
+        self._log_fees(fee0_arr, fee1_arr)
+        self.collected_fee0 += sum(fee0_arr)
+        self.collected_fee1 += sum(fee1_arr)
+        self.aggr_fee0 += sum(fee0_arr)
+        self.aggr_fee1 += sum(fee1_arr)
+
+        return {'amount_out' : np.array(amount_out_arr, dtype=object),
+                'price' : np.array(reserve1_arr, dtype=float)/np.array(reserve0_arr, dtype=float),
+                'reserve0' : np.array(reserve0_arr, dtype=object),
+                'reserve1' : np.array(reserve1_arr, dtype=object)}
+
+    def burn(self, to_addr, liquidity, amountA, amountB):
+
+        """ burn
+
+            Burn liquidity from both coins in the pair based on lp amount
+
+            Parameters
+            -----------------
+            to_addr : str
+               receiving user address
+            liquidity : int
+                amount of liquidity to be burned
+            amountA : int
+                amount from reserve0 to be burned
+            amountB : int
+                amount from reserve1 to be burned
+        """
+
+        self._burn(to_addr, liquidity)
+        (tkn0, tkn1) = self._pair_tokens()
+        tkn0.token_total -= amountA
+        tkn1.token_total -= amountB
+        self._update(tkn0.token_total, tkn1.token_total)
+
+    def mint(self, to_addr, _amountA, _amountB):
+
+        """ mint
+
+            Mint new liquidity based on amounts on each coin in the pair; the first deposit
+            locks MINIMUM_LIQUIDITY wei of liquidity
+
+            Parameters
+            -----------------
+            to_addr : str
+                receiving user address
+            _amountA : int
+                desired amount of A
+            _amountB : int
+                desired amount of B
+        """
+
+        (tkn0, tkn1) = self._pair_tokens()
+        balanceA = tkn0.token_total
+        balanceB = tkn1.token_total
+        amountA = balanceA - self.reserve0
+        amountB = balanceB - self.reserve1
+        assert type(amountA) == int and type(amountB) == int, 'UniswapV2: NOT_INTEGER'
+        assert amountA == _amountA and amountB == _amountB
+
+        if self.total_supply != 0:
+            liquidity = min(
+                amountA * self.total_supply // self.reserve0,
+                amountB * self.total_supply // self.reserve1
+            )
+        else:
+            liquidity = math.isqrt(amountA * amountB) - MINIMUM_LIQUIDITY
+
+        assert liquidity > 0, 'UniswapV2: INSUFFICIENT_LIQUIDITY_MINTED'
+
+        if self.total_supply == 0:
+            self._mint("0", MINIMUM_LIQUIDITY)
+
+        self._update(balanceA, balanceB)
+        self._mint(to_addr, liquidity)
+
+    def _update(self, balanceA, balanceB):
+        assert balanceA <= MAX_UINT112 and balanceB <= MAX_UINT112, 'UniswapV2: OVERFLOW'
+        super()._update(balanceA, balanceB)
+
+    def swap(self, amountA_out, amountB_out, to_addr):
+
+        """ swap
+
+            Send the amounts out and check the K invariant of the fee adjusted balances against the
+            reserves, as UniswapV2Pair.swap; the amounts in are the balances above the reserves. Every
+            check runs before the ERC20 totals and the reserves are written, so a reverted swap leaves
+            the pool unchanged
+
+            Parameters
+            -----------------
+            amountA_out : int
+                swap amountA out
+            amountB_out : int
+                swap amountB out
+            to_addr : str
+               receiving user address
+        """
+
+        self._swap(amountA_out, amountB_out, to_addr, 0, 0)
+
+    def _swap(self, amountA_out, amountB_out, to_addr, amountA_deposit, amountB_deposit):
+        assert amountA_out > 0 or amountB_out > 0, 'UniswapV2: INSUFFICIENT_OUTPUT_AMOUNT'
+        reserve0 = self.reserve0
+        reserve1 = self.reserve1
+        assert amountA_out < reserve0 and amountB_out < reserve1, 'UniswapV2: INSUFFICIENT_LIQUIDITY'
+
+        (tkn0, tkn1) = self._pair_tokens()
+        assert tkn0.token_addr != to_addr, 'UniswapV2: INVALID_TO_ADDRESS'
+        assert tkn1.token_addr != to_addr, 'UniswapV2: INVALID_TO_ADDRESS'
+
+        balanceA = tkn0.token_total + amountA_deposit - amountA_out
+        balanceB = tkn1.token_total + amountB_deposit - amountB_out
+
+        amountA_in = balanceA - (reserve0 - amountA_out) if balanceA > reserve0 - amountA_out else 0
+        amountB_in = balanceB - (reserve1 - amountB_out) if balanceB > reserve1 - amountB_out else 0
+        assert amountA_in > 0 or amountB_in > 0, 'UniswapV2: INSUFFICIENT_INPUT_AMOUNT'
+
+        balanceA_adjusted = balanceA * 1000 - amountA_in * 3
+        balanceB_adjusted = balanceB * 1000 - amountB_in * 3
+        assert balanceA_adjusted * balanceB_adjusted >= reserve0 * reserve1 * 1000**2, 'UniswapV2: K'
+        assert balanceA <= MAX_UINT112 and balanceB <= MAX_UINT112, 'UniswapV2: OVERFLOW'
+
+        tkn0.token_total = balanceA
+        tkn1.token_total = balanceB
+        self._update(balanceA, balanceB)
+        self._tally_fees(amountA_in * 3 // 1000, amountB_in * 3 // 1000)
+
+    def quote(self, amountA, reserveA, reserveB):
+
+        """ quote
+
+            Given amount asset and reserves, return equivalent amount of other asset (rounded down)
+
+            Parameters
+            -----------------
+            amountA : int
+                amount of a given asset token
+            reserveA : int
+                total amount of asset A in LP
+            reserveB : int
+                total amount of asset B in LP
+        """
+
+        assert amountA > 0, 'UniswapV2Library: INSUFFICIENT_AMOUNT'
+        assert reserveA > 0 and reserveB > 0, 'UniswapV2Library: INSUFFICIENT_LIQUIDITY'
+        return amountA * reserveB // reserveA
+
+    def get_amount_out0(self, amount_in):
+
+        """ get_amount_out0
+
+            Get maximum amount of token1 given input amount of token0 (rounded down)
+
+            Parameters
+            -----------------
+            amount_in : int
+                input amount of token0
+
+            Returns
+            -------
+            amount_out out : int
+                amount of token1
+        """
+
+        assert amount_in > 0, 'UniswapV2Library: INSUFFICIENT_INPUT_AMOUNT'
+        assert self.reserve0 > 0 and self.reserve1 > 0, 'UniswapV2Library: INSUFFICIENT_LIQUIDITY'
+        amount_in_with_fee = amount_in * 997
+        return amount_in_with_fee * self.reserve1 // (self.reserve0 * 1000 + amount_in_with_fee)
+
+    def get_amount_out1(self, amount_in):
+
+        """ get_amount_out1
+
+            Get maximum amount of token0 given input amount of token1 (rounded down)
+
+            Parameters
+            -----------------
+            amount_in : int
+                input amount of token1
+
+            Returns
+            -------
+            amount_out out : int
+                amount of token0
+        """
+
+        assert amount_in > 0, 'UniswapV2Library: INSUFFICIENT_INPUT_AMOUNT'
+        assert self.reserve0 > 0 and self.reserve1 > 0, 'UniswapV2Library: INSUFFICIENT_LIQUIDITY'
+        amount_in_with_fee = amount_in * 997
+        return amount_in_with_fee * self.reserve0 // (self.reserve1 * 1000 + amount_in_with_fee)
+
+    def _pair_tokens(self):
+        # The factory registers the pair tokens after deploying the exchange, so look them up once on use
+        if self.tokens == None:
+            tokens = self.factory.token_from_exchange[self.name]
+            assert tokens.get(self.token0) and tokens.get(self.token1), 'UniswapV2: TOKEN_UNAVAILABLE'
+            self.tokens = (tokens.get(self.token0), tokens.get(self.token1))
+        return self.tokens
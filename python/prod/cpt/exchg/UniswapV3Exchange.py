@@ -6,20 +6,30 @@
 # - https://github.com/chainflip-io/chainflip-uniswapV3-python
 
 import math
-from decimal import Decimal
+import numpy as np
 from dataclasses import dataclass
 from ...erc import LPERC20
 from ...utils.interfaces import IExchange
 from ...utils.data import FactoryData
 from ...utils.data import UniswapExchangeData
+from ...utils.tools import StateJournal
 from ...utils.tools.v3.Shared import *
 from ...utils.tools.v3 import Position, Tick, SqrtPriceMath, LiquidityMath
 from ...utils.tools.v3 import SwapMath, TickMath, SafeMath, FullMath, UniV3Utils
-from ...utils.tools.v3 import UniV3Helper
+from ...utils.tools.v3 import Oracle, Precision
+from ...utils.tools.v3.SwapTrace import SwapTrace
+from ...utils.tools.v3.LiquidityIndex import LiquidityIndex
 
 MINIMUM_LIQUIDITY = 1e-15
 GWEI_PRECISION = 18
 
+# Pool state restored by a rolled back transaction (ticks and positions are recorded per key)
+JOURNAL_FIELDS = ['reserve0', 'reserve1', 'aggr_fee0', 'aggr_fee1', 'collected_fee0', 'collected_fee1',
+                  'last_liquidity_deposit', 'total_supply', 'token_total',
+                  'feeGrowthGlobal0X128', 'feeGrowthGlobal1X128']
+JOURNAL_STRUCTS = ['slot0', 'protocolFees']
+JOURNAL_LOGS = ['fee0_arr', 'fee1_arr']
+
 @dataclass
 class Slot0:
     ## the current price
@@ -29,6 +39,12 @@ class Slot0:
     ## the current protocol fee as a percentage of the swap fee taken on withdrawal
     ## represented as an integer denominator (1#x)%
     feeProtocol: int
+    ## the most-recently updated index of the observations array
+    observationIndex: int = 0
+    ## the current maximum number of observations that are being stored
+    observationCardinality: int = 0
+    ## the next maximum number of observations to store, triggered in observations.write
+    observationCardinalityNext: int = 0
     
 @dataclass
 class ModifyPositionParams:
@@ -67,6 +83,10 @@ class SwapState:
     ## list of ticks crossed during the swap
     ticksCrossed: list
 
+    ## the amount already swapped in#out of the specified asset, when kept apart from amountSpecifiedRemaining
+    ## (float engine, where amountSpecified - amountSpecifiedRemaining cancels for a large amountSpecified)
+    amountSpecifiedUsed: int = None
+
 @dataclass
 class StepComputations:
     ## the price at the beginning of the step
@@ -84,6 +104,20 @@ class StepComputations:
     ## how much fee is being paid in
     feeAmount: int
 
+@dataclass
+class SwapQuote:
+    ## delta of the balance of token0 and token1 of the pool (positive in, negative out)
+    amount0: int
+    amount1: int
+    ## sqrt(price) after the swap
+    sqrtPriceX96: int
+    ## the tick after the swap
+    tick: int
+    ## the liquidity in range after the swap
+    liquidity: int
+    ## initialized ticks crossed during the swap, in crossing order
+    ticksCrossed: list
+
 @dataclass
 class ProtocolFees:
     token0: int
@@ -123,13 +157,19 @@ class UniswapV3Exchange(IExchange, LPERC20):
         self.last_liquidity_deposit = 0
         self.total_supply = 0
         self.slot0 = Slot0(0, 0, 0)
-        self.positions = {}
-        self.ticks = {}
+        self.positions = Position.PositionRegistry()
+        self.ticks = TickArrayStore() if exchg_struct.tick_store == UniswapExchangeData.TICK_STORE_ARRAY else TickMap()
         self.feeGrowthGlobal0X128 = 0
         self.feeGrowthGlobal1X128 = 0  
         self.protocolFees = ProtocolFees(0, 0)
         self.tickSpacing = exchg_struct.tick_spacing
+        self.trusted = exchg_struct.trusted
+        self.observations = Oracle.newObservations(exchg_struct.observation_cardinality)
+        self.block_timestamp = 0
+        self.state_version = 0
+        self.trace = None
         self.maxLiquidityPerTick = Tick.tickSpacingToMaxLiquidityPerTick(self.tickSpacing)      
+        self.journal = StateJournal(self, JOURNAL_FIELDS, JOURNAL_STRUCTS, JOURNAL_LOGS)
 
     def summary(self):
 
@@ -145,10 +185,27 @@ class UniswapV3Exchange(IExchange, LPERC20):
             print(f"Real Reserves:   {self.token0} = {self.reserve0}, {self.token1} = {self.reserve1}")
             print(f"Gross Liquidity: {self.total_supply} \n")
         else:  
-            res0 = UniV3Helper().gwei2dec(self.reserve0)
-            res1 = UniV3Helper().gwei2dec(self.reserve1)
+            res0 = Precision.gweiToDec(self.reserve0)
+            res1 = Precision.gweiToDec(self.reserve1)
             print(f"Real Reserves:   {self.token0} = {res0}, {self.token1} = {res1}")
-            print(f"Gross Liquidity: {UniV3Helper().gwei2dec(self.total_supply)} \n")            
+            print(f"Gross Liquidity: {Precision.gweiToDec(self.total_supply)} \n")            
+
+    def transaction(self):
+
+        """ transaction
+
+            Context manager which groups several pool updates: if the enclosed block raises 
+            (eg. a failed assert halfway through a multi-step process) slot0, fee growth, the 
+            touched ticks and positions, and the ERC20 totals are restored to their state at 
+            the start of the block. Transactions can be nested.
+
+            Returns
+            -------
+            transaction : contextmanager
+                with lp.transaction(): ...           
+        """
+
+        return self.journal.transaction()
 
     def initialize(self, sqrtPriceX96):
 
@@ -167,12 +224,69 @@ class UniswapV3Exchange(IExchange, LPERC20):
 
         tick = TickMath.getTickAtSqrtRatio(sqrtPriceX96)
 
+        (cardinality, cardinalityNext) = Oracle.initialize(self.observations, self.block_timestamp)
+
         self.slot0 = Slot0(
             sqrtPriceX96,
             tick,
             0,
+            0,
+            cardinality,
+            cardinalityNext,
+        )
+        self.state_version += 1
+
+    def set_block_timestamp(self, block_timestamp):
+
+        """ set_block_timestamp
+
+            Set the pool clock (seconds) used to timestamp oracle observations; the simulation 
+            has no blocks, so the caller advances it between pool updates
+                
+            Parameters
+            -----------------
+            block_timestamp : int
+                Current timestamp, non-decreasing                     
+        """  
+
+        assert block_timestamp >= self.block_timestamp, "UniswapV3: TIMESTAMP"
+        self.block_timestamp = block_timestamp
+
+    def observe(self, secondsAgos):
+
+        """ observe
+
+            Returns the cumulative tick and liquidity as of each timestamp `secondsAgo` from the 
+            current block timestamp. To get a time weighted average tick or liquidity-in-range, 
+            call this with two values, one representing the beginning of the period and another 
+            for the end of the period. Observations live in a ring preallocated with 
+            observation_cardinality slots, and each lookup is a binary search over the ring.
+                
+            Parameters
+            -----------------
+            secondsAgos : list
+                From how long ago each cumulative tick and liquidity value should be returned
+
+            Returns
+            -------
+            tickCumulatives : list
+                Cumulative tick values as of each `secondsAgos` from the current block timestamp
+            secondsPerLiquidityCumulativeX128s : list
+                Cumulative seconds per liquidity-in-range value as of each `secondsAgos` from 
+                the current block timestamp
+        """  
+
+        return Oracle.observe(
+            self.observations,
+            self.block_timestamp,
+            secondsAgos,
+            self.slot0.tick,
+            self.slot0.observationIndex,
+            self.total_supply,
+            self.slot0.observationCardinality,
         )
     
+    @trustedEntryPoint
     def mint(self, recipient, tickLower, tickUpper, amount): 
 
         """ mint
@@ -237,6 +351,149 @@ class UniswapV3Exchange(IExchange, LPERC20):
         return (amount0, amount1)
         
 
+    @trustedEntryPoint
+    def mint_many(self, recipients, tickLowers, tickUppers, amounts): 
+
+        """ mint_many
+
+            Adds liquidity for many recipient/tickLower/tickUpper positions, with the same final state 
+            (ticks, positions, liquidity, reserves and token totals) as one mint per entry in order. 
+            The inputs are validated up front, the liquidity is summed per tick and per position and the 
+            ticks are updated with one sorted merge (Tick.updateMany).
+                
+            Parameters
+            -----------------    
+            recipients : list
+                Address for which each liquidity will be created      
+            tickLowers : list
+                Lower tick of each position (list or numpy array)
+            tickUppers : list
+                Upper tick of each position (list or numpy array)
+            amounts : list
+                Amount of liquidity to mint in each position (list or numpy array)
+                
+            Returns
+            -------
+            amount0 : numpy.ndarray
+                Amount of token0 paid for each mint
+            amount1 : numpy.ndarray
+                Amount of token1 paid for each mint
+        """          
+        
+        assert len(recipients) == len(amounts), 'UniswapV3: LENGTH_MISMATCH'
+        # Liquidity is an exact machine integer in every engine; object dtype keeps Python ints, which 
+        # NumPy would turn into floats past 2**63
+        amounts = [UniswapV3Exchange._convert_to_machine(self, amount) 
+                   for amount in np.asarray(amounts, dtype=object).tolist()]
+        return self._mint_many(recipients, tickLowers, tickUppers, amounts)
+
+    @trustedEntryPoint
+    def load_distribution(self, recipient, ticks, liquidityNet): 
+
+        """ load_distribution
+
+            Seeds the pool with a liquidity distribution given as columns (tick, liquidityNet), eg. 
+            exported from a mainnet pool. The active liquidity between two consecutive ticks is minted 
+            as one position of recipient over that range (mint_many), so the ticks end up with the 
+            given liquidityNet.
+                
+            Parameters
+            -----------------    
+            recipient : str
+                Address owning the minted positions
+            ticks : list
+                Initialized ticks, ascending (list or numpy array)
+            liquidityNet : list
+                Liquidity added when each tick is crossed left to right; sums to zero and its running 
+                sum is never negative
+                
+            Returns
+            -------
+            amount0 : numpy.ndarray
+                Amount of token0 paid for each range
+            amount1 : numpy.ndarray
+                Amount of token1 paid for each range
+        """          
+
+        ticks = np.asarray(ticks)
+        assert len(ticks) == len(liquidityNet) and len(ticks) > 1, 'UniswapV3: LENGTH_MISMATCH'
+        assert np.all(np.diff(ticks) > 0), 'UniswapV3: TICKS_NOT_SORTED'
+        # Running sums in machine units, so that the ranges telescope back to liquidityNet exactly (object 
+        # dtype throughout, liquidity past 2**63 must stay an int)
+        liquidity = np.cumsum(np.array([UniswapV3Exchange._convert_to_machine(self, net) 
+                                        for net in np.asarray(liquidityNet, dtype=object).tolist()], dtype=object))
+        assert liquidity[-1] == 0 and all(amount >= 0 for amount in liquidity), 'UniswapV3: INVALID_DISTRIBUTION'
+        ranges = [k for k in range(len(ticks) - 1) if liquidity[k] > 0]
+        return self._mint_many([recipient]*len(ranges), ticks[ranges], ticks[[k + 1 for k in ranges]], 
+                               [liquidity[k] for k in ranges])
+
+    def _mint_many(self, recipients, tickLowers, tickUppers, amounts):
+        n = len(amounts)
+        assert len(recipients) == n and len(tickLowers) == n and len(tickUppers) == n, 'UniswapV3: LENGTH_MISMATCH'
+        tickLowers = np.asarray(tickLowers).tolist()
+        tickUppers = np.asarray(tickUppers).tolist()
+
+        tickDeltas = {}
+        positionDeltas = {}
+        for recipient, tickLower, tickUpper, amount in zip(recipients, tickLowers, tickUppers, amounts):
+            checkInputTypes(
+                accounts=(recipient), int24=(tickLower, tickUpper), uint128=(amount)
+            )
+            assert amount > 0
+            self.checkTicks(tickLower, tickUpper)
+            (grossLower, netLower) = tickDeltas.get(tickLower, (0, 0))
+            tickDeltas[tickLower] = (grossLower + amount, netLower + amount)
+            (grossUpper, netUpper) = tickDeltas.get(tickUpper, (0, 0))
+            tickDeltas[tickUpper] = (grossUpper + amount, netUpper - amount)
+            key = Position.positionKey(recipient, tickLower, tickUpper)
+            positionDeltas[key] = positionDeltas.get(key, 0) + amount
+        for tick in tickDeltas:
+            if tick not in self.ticks:
+                assert tick % self.tickSpacing == 0  ## ensure that the tick is spaced
+
+        if self.journal.savepoints:
+            for tick in tickDeltas:
+                self.journal.record(self.ticks, tick)
+            for key in positionDeltas:
+                self.journal.record(self.positions, key)
+
+        ## the inputs are validated above, the kernels run unchecked
+        with trustedKernels():
+            tick = self.slot0.tick
+            Tick.updateMany(self.ticks, tickDeltas, tick, self.feeGrowthGlobal0X128, self.feeGrowthGlobal1X128,
+                            self.maxLiquidityPerTick)
+
+            ## fee growth inside a range only depends on its own ticks, so one credit per position is enough
+            for (owner, tickLower, tickUpper), amount in positionDeltas.items():
+                position = Position.get(self.positions, owner, tickLower, tickUpper)
+                (feeGrowthInside0X128, feeGrowthInside1X128) = self._fee_growth_inside(tickLower, tickUpper, tick)
+                self._credit_position(position, amount, feeGrowthInside0X128, feeGrowthInside1X128)
+
+            amounts0 = [0]*n
+            amounts1 = [0]*n
+            liquidityInRange = 0
+            for k, (tickLower, tickUpper, amount) in enumerate(zip(tickLowers, tickUppers, amounts)):
+                (amounts0[k], amounts1[k]) = self._position_amounts(tickLower, tickUpper, amount)
+                if tick >= tickLower and tick < tickUpper:
+                    liquidityInRange += amount
+                    self.last_liquidity_deposit = self._convert_to_human(amount)
+
+        if liquidityInRange > 0:
+            ## one oracle entry, as every mint of the same block after the first writes none
+            self._write_observation(tick, self.total_supply)
+            self.total_supply = LiquidityMath.addDelta(self.total_supply, liquidityInRange)
+
+        tokens = self.factory.token_from_exchange[self.name]
+        assert tokens.get(self.token0) and tokens.get(self.token1), 'UniswapV3: TOKEN_UNAVAILABLE' 
+        for recipient, amount0, amount1 in zip(recipients, amounts0, amounts1):
+            tokens.get(self.token0).deposit(recipient, amount0)
+            tokens.get(self.token1).deposit(recipient, amount1)
+        self._update(tokens.get(self.token0).token_total, tokens.get(self.token1).token_total)
+
+        return (np.array([self._convert_to_human(amount0) for amount0 in amounts0]),
+                np.array([self._convert_to_human(amount1) for amount1 in amounts1]))
+
+    @trustedEntryPoint
     def collect(self, recipient, tickLower, tickUpper, amount0Requested, amount1Requested):
 
         """ collect
@@ -281,6 +538,9 @@ class UniswapV3Exchange(IExchange, LPERC20):
             self.positions, recipient, tickLower, tickUpper
         )
 
+        if self.journal.savepoints:
+            self.journal.record(self.positions, Position.positionKey(recipient, tickLower, tickUpper))
+
         amount0 = (
             position.tokensOwed0
             if (amount0Requested > position.tokensOwed0)
@@ -309,7 +569,96 @@ class UniswapV3Exchange(IExchange, LPERC20):
 
         return (recipient, tickLower, tickUpper, amount0, amount1)   
         
+    @trustedEntryPoint
+    def poke_all(self, owner = None):
+
+        """ poke_all
+
+            Credit the fees earned so far to many positions in one pass, like a burn of 0 liquidity 
+            of each of them: the fee growth inside is computed once per tick range and applied to 
+            every position with liquidity over that range.
+                
+            Parameters
+            -----------------    
+            owner : str
+                Only update the positions of this address (default: all positions)
+                
+            Returns
+            -------
+            n_positions : int
+                Number of positions updated                  
+        """ 
+
+        if owner == None:
+            ranges = [(tickRange, list(keys)) for (tickRange, keys) in self.positions.byRange.items()]
+        else:
+            ranges = {}
+            for key in self.positions.ownerPositions(owner):
+                ranges.setdefault((key[1], key[2]), []).append(key)
+            ranges = ranges.items()
+
+        n_positions = 0
+        for ((tickLower, tickUpper), keys) in ranges:
+            keys = [key for key in keys if self.positions[key].liquidity > 0]
+            if not keys:
+                continue
+            (feeGrowthInside0X128, feeGrowthInside1X128) = self._fee_growth_inside(
+                tickLower, tickUpper, self.slot0.tick
+            )
+            for key in keys:
+                if self.journal.savepoints:
+                    self.journal.record(self.positions, key)
+                self._credit_position(self.positions[key], 0, feeGrowthInside0X128, feeGrowthInside1X128)
+            n_positions += len(keys)
+        return n_positions
+
+    @trustedEntryPoint
+    def collect_all(self, recipient):
+
+        """ collect_all
+
+            Credit the fees earned by every position of recipient (see poke_all) and collect all the 
+            tokens owed to them
+                
+            Parameters
+            -----------------    
+            recipient : str
+                Owner of the positions
+                
+            Returns
+            -------
+            amount0 : float
+                Total amount of token0 collected
+            amount1 : float
+                Total amount of token1 collected                  
+        """ 
+
+        self.poke_all(recipient)
+
+        tokens = self.factory.token_from_exchange[self.name]
+        assert tokens.get(self.token0) and tokens.get(self.token1), 'UniswapV3: TOKEN_UNAVAILABLE' 
+
+        amount0 = amount1 = 0
+        for key in self.positions.ownerPositions(recipient):
+            position = self.positions[key]
+            if position.tokensOwed0 == 0 and position.tokensOwed1 == 0:
+                continue
+            if self.journal.savepoints:
+                self.journal.record(self.positions, key)
+            amount0 += position.tokensOwed0
+            amount1 += position.tokensOwed1
+            position.tokensOwed0 = 0
+            position.tokensOwed1 = 0
 
+        if amount0 > 0:
+            tokens.get(self.token0).deposit(recipient, amount0)
+        if amount1 > 0:
+            tokens.get(self.token1).deposit(recipient, amount1) 
+
+        return (self._convert_to_human(amount0), self._convert_to_human(amount1))
+
+
+    @trustedEntryPoint
     def burn(self, recipient, tickLower, tickUpper, amount):
 
         """ burn
@@ -475,7 +824,7 @@ class UniswapV3Exchange(IExchange, LPERC20):
                 Delta of the balance of token1 of the pool, exact when negative, minimum when positive                             
         """          
         
-        amount = amount if self.precision == UniswapExchangeData.TYPE_GWEI else UniV3Helper().dec2gwei(amount)
+        amount = self._convert_to_machine(amount)
         sqrtPriceLimitX96 = (
             sqrtPriceLimit
             if sqrtPriceLimit != None
@@ -517,6 +866,7 @@ class UniswapV3Exchange(IExchange, LPERC20):
         )
         return self._swap(UniV3Utils.TEST_TOKENS[1], [0, amount], recipient, sqrtPriceLimitX96)     
 
+    @trustedEntryPoint
     def swap(self, recipient, zeroForOne, amountSpecified, sqrtPriceLimitX96):
 
         """ swap
@@ -548,144 +898,17 @@ class UniswapV3Exchange(IExchange, LPERC20):
                 Delta of the balance of token1 of the pool, exact when negative, minimum when positive                             
         """ 
         
-        checkInputTypes(
-            accounts=(recipient),
-            bool=(zeroForOne),
-            int256=(amountSpecified),
-            uint160=(sqrtPriceLimitX96),
-        )
+        checkInputTypes(accounts=(recipient))
+        self._check_swap_inputs(zeroForOne, amountSpecified, sqrtPriceLimitX96)
         assert amountSpecified != 0, "UniswapV3: AS"
 
-        slot0Start = self.slot0        
-        
-        if zeroForOne:
-            assert (
-                sqrtPriceLimitX96 < slot0Start.sqrtPriceX96
-                and sqrtPriceLimitX96 > TickMath.MIN_SQRT_RATIO
-            ), "UniswapV3: ZEROFORONE SPL"
-        else:
-            assert (
-                sqrtPriceLimitX96 > slot0Start.sqrtPriceX96
-                and sqrtPriceLimitX96 < TickMath.MAX_SQRT_RATIO
-            ), "UniswapV3: ONEFORZERO SPL"
-  
-        feeProtocol = (
-            (slot0Start.feeProtocol % 16)
-            if zeroForOne
-            else (slot0Start.feeProtocol >> 4)
-        )
-
-        cache = SwapCache(feeProtocol, self.total_supply)
-
-        exactInput = amountSpecified > 0
-
-        state = SwapState(
-            amountSpecified,
-            0,
-            slot0Start.sqrtPriceX96,
-            slot0Start.tick,
-            self.feeGrowthGlobal0X128 if zeroForOne else self.feeGrowthGlobal1X128,
-            0,
-            cache.liquidityStart,
-            [],
-        )
-
-        while (
-            state.amountSpecifiedRemaining != 0
-            and state.sqrtPriceX96 != sqrtPriceLimitX96
-        ):
-            step = StepComputations(0, 0, 0, 0, 0, 0, 0)
-            step.sqrtPriceStartX96 = state.sqrtPriceX96
-
-            (step.tickNext, step.initialized) = self.nextTick(state.tick, zeroForOne)
-
-            ## get the price for the next tick
-            step.sqrtPriceNextX96 = TickMath.getSqrtRatioAtTick(step.tickNext)
-
-            ## compute values to swap to the target tick, price limit, or point where input#output amount is exhausted
-            if zeroForOne:
-                sqrtRatioTargetX96 = (
-                    sqrtPriceLimitX96
-                    if step.sqrtPriceNextX96 < sqrtPriceLimitX96
-                    else step.sqrtPriceNextX96
-                )
-            else:
-                sqrtRatioTargetX96 = (
-                    sqrtPriceLimitX96
-                    if step.sqrtPriceNextX96 > sqrtPriceLimitX96
-                    else step.sqrtPriceNextX96
-                )
-
-            (
-                state.sqrtPriceX96,
-                step.amountIn,
-                step.amountOut,
-                step.feeAmount,
-            ) = SwapMath.computeSwapStep(
-                state.sqrtPriceX96,
-                sqrtRatioTargetX96,
-                state.liquidity,
-                state.amountSpecifiedRemaining,
-                self.fee,
-            )
-
-            if exactInput:
-                state.amountSpecifiedRemaining -= step.amountIn + step.feeAmount
-                state.amountCalculated = SafeMath.subInts(
-                    state.amountCalculated, step.amountOut
-                )
-            else:
-                state.amountSpecifiedRemaining += step.amountOut
-                state.amountCalculated = SafeMath.addInts(
-                    state.amountCalculated, step.amountIn + step.feeAmount
-                )
-
-            ## if the protocol fee is on, calculate how much is owed, decrement feeAmount, and increment protocolFee
-            if cache.feeProtocol > 0:
-                delta = abs(step.feeAmount // cache.feeProtocol)
-                step.feeAmount -= delta
-                state.protocolFee += delta & (2**128 - 1)
-
-            ## update global fee tracker
-            if state.liquidity > 0:
-                state.feeGrowthGlobalX128 += FullMath.mulDiv(
-                    step.feeAmount, FixedPoint128_Q128, state.liquidity
-                )
-                # Addition can overflow in Solidity - mimic it
-                state.feeGrowthGlobalX128 = toUint256(state.feeGrowthGlobalX128)
-
-            ## shift tick if we reached the next price
-            if state.sqrtPriceX96 == step.sqrtPriceNextX96:
-                ## if the tick is initialized, run the tick transition
-                ## @dev: here is where we should handle the case of an uninitialized boundary tick
-                if step.initialized:
-                    liquidityNet = Tick.cross(
-                        self.ticks,
-                        step.tickNext,
-                        state.feeGrowthGlobalX128
-                        if zeroForOne
-                        else self.feeGrowthGlobal0X128,
-                        self.feeGrowthGlobal1X128
-                        if zeroForOne
-                        else state.feeGrowthGlobalX128,
-                    )
-                    ## if we're moving leftward, we interpret liquidityNet as the opposite sign
-                    ## safe because liquidityNet cannot be type(int128).min
-                    if zeroForOne:
-                        liquidityNet = -liquidityNet
-
-                    state.liquidity = LiquidityMath.addDelta(
-                        state.liquidity, liquidityNet
-                    )
-
-                state.tick = (step.tickNext - 1) if zeroForOne else step.tickNext
-            elif state.sqrtPriceX96 != step.sqrtPriceStartX96:
-                ## recompute unless we're on a lower tick boundary (i.e. already transitioned ticks), and haven't moved
-                state.tick = TickMath.getTickAtSqrtRatio(state.sqrtPriceX96)
+        slot0Start = self.slot0
+        (cache, state) = self._walk_ticks(zeroForOne, amountSpecified, sqrtPriceLimitX96, True)
 
         ## End of swap loop
-        ## update tick
+        ## update tick and write an oracle entry if the tick changed
         if state.tick != slot0Start.tick:
+            self._write_observation(slot0Start.tick, cache.liquidityStart)
             self.slot0.sqrtPriceX96 = state.sqrtPriceX96
             self.slot0.tick = state.tick
         else:
@@ -694,7 +917,7 @@ class UniswapV3Exchange(IExchange, LPERC20):
 
         ## update liquidity if it changed
         if cache.liquidityStart != state.liquidity:
-            self.liquidity = state.liquidity
+            self.total_supply = state.liquidity
 
         ## update fee growth global and, if necessary, protocol fees
         ## overflow is acceptable, protocol has to withdraw before it hits type(uint128).max fees
@@ -708,14 +931,7 @@ class UniswapV3Exchange(IExchange, LPERC20):
             if state.protocolFee > 0:
                 self.protocolFees.token1 += state.protocolFee
 
-        (amount0, amount1) = (
-            (amountSpecified - state.amountSpecifiedRemaining, state.amountCalculated)
-            if (zeroForOne == exactInput)
-            else (
-                state.amountCalculated,
-                amountSpecified - state.amountSpecifiedRemaining,
-            )
-        )
+        (amount0, amount1) = self._swap_amounts(zeroForOne, amountSpecified, state)
         
         tokens = self.factory.token_from_exchange[self.name]
         if zeroForOne: 
@@ -739,35 +955,240 @@ class UniswapV3Exchange(IExchange, LPERC20):
             state.tick,
         )
 
-    def setFeeProtocol(self, feeProtocol0, feeProtocol1):
+    def swap_batch(self, token_in_flags, amounts, recipient, sqrtPriceLimit = None):
 
-        """ setFeeProtocol
+        """ swap_batch
 
-            Set the denominator of the protocol's % share of the fees
-            
+            Apply a sequence of exact input swaps in order; the resulting pool and ERC20 state is 
+            identical to calling Swap().apply for each of them, without its per-call overhead. The 
+            batch runs in a transaction: if any swap reverts, none of them is applied.
+                
             Parameters
             -----------------    
-            feeProtocol0 : int
-                New protocol fee for token0 of the pool      
-            feeProtocol1 : int
-                New protocol fee for token1 of the pool                        
+            token_in_flags : numpy.ndarray
+                Swap directions, True when token0 is swapped in and False when token1 is swapped in
+            amounts : numpy.ndarray
+                Swap amounts in
+            recipient : str
+                Address of the swapper
+            sqrtPriceLimit : int
+                The Q64.96 sqrt price limit for every swap, defaults to the widest limit in the 
+                direction of each swap
+                
+            Returns
+            -------
+            batch : dict
+                numpy arrays 'amount_out', 'price' (token0 price in token1), 'reserve0' and 'reserve1' 
+                after each swap                             
         """ 
-        
-        checkInputTypes(uint8=(feeProtocol0, feeProtocol1))
-        assert (feeProtocol0 == 0 or (feeProtocol0 >= 4 and feeProtocol0 <= 10)) and (
-            feeProtocol1 == 0 or (feeProtocol1 >= 4 and feeProtocol1 <= 10)
-        )
-
-        feeProtocolOld = self.slot0.feeProtocol
-        feeProtocolNew = feeProtocol0 + (feeProtocol1 << 4)
-        # Health check
-        checkUInt8(feeProtocolNew)
-        self.slot0.feeProtocol = feeProtocolNew
-        return (feeProtocolOld % 16, feeProtocolOld >> 4, feeProtocol0, feeProtocol1)
-
-    def checkTicks(self, tickLower, tickUpper):
 
-        """ checkTicks
+        token_in_flags = np.asarray(token_in_flags, dtype=bool).tolist()
+        # Object dtype keeps Python ints, which NumPy would turn into floats past 2**63
+        amounts = np.asarray(amounts, dtype=object).tolist()
+        assert len(token_in_flags) == len(amounts), 'UniswapV3: BATCH_LENGTH_MISMATCH'
+
+        n = len(amounts)
+        amount_out_arr = [0]*n
+        price_arr = [0]*n
+        reserve0_arr = [0]*n
+        reserve1_arr = [0]*n
+        limits = (self._sqrt_price_limit(True, sqrtPriceLimit), self._sqrt_price_limit(False, sqrtPriceLimit))
+        
+        with self.transaction():
+            for k in range(n):
+                zeroForOne = token_in_flags[k]
+                amount = self._convert_to_machine(amounts[k])
+                self._check_amount(amount)
+                (_, amount0, amount1, sqrtPriceX96, _, _) = self.swap(
+                    recipient, zeroForOne, amount, limits[0] if zeroForOne else limits[1]
+                )
+                amount_out_arr[k] = abs(amount1) if zeroForOne else abs(amount0)
+                price_arr[k] = (sqrtPriceX96/2**96)**2
+                reserve0_arr[k] = self.reserve0
+                reserve1_arr[k] = self.reserve1
+
+        reserve0_arr = [self._convert_to_human(reserve) for reserve in reserve0_arr]
+        reserve1_arr = [self._convert_to_human(reserve) for reserve in reserve1_arr]
+        return {'amount_out' : np.array(amount_out_arr, dtype=float),
+                'price' : np.array(price_arr, dtype=float),
+                'reserve0' : np.array(reserve0_arr, dtype=float),
+                'reserve1' : np.array(reserve1_arr, dtype=float)}
+
+    @trustedEntryPoint
+    def quote_swap(self, zeroForOne, amountSpecified, sqrtPriceLimitX96):
+
+        """ quote_swap
+
+            Read-only version of swap: runs the same tick-walking loop against a scratch state and 
+            returns the result without changing slot0, fee growth, ticks or token totals. Reverts 
+            with the same messages as swap.
+                
+            Parameters
+            -----------------    
+            zeroForOne : int
+                the direction of the swap, true for token0 to token1, false for token1 to token0 
+            amountSpecified : int
+                The amount of the swap, which implicitly configures the swap as exact input 
+                (positive), or exact output (negative)        
+            sqrtPriceLimitX96 : int
+                The Q64.96 sqrt price limit. If zero for one, the price cannot be less than this 
+                value after the swap. If one for zero, the price cannot be greater than this 
+                value after the swap
+                
+            Returns
+            -------
+            quote : SwapQuote
+                Pool balance deltas (same units as swap), final sqrt price, tick and liquidity, 
+                and the initialized ticks crossed                             
+        """ 
+        
+        self._check_swap_inputs(zeroForOne, amountSpecified, sqrtPriceLimitX96)
+        assert amountSpecified != 0, "UniswapV3: AS"
+
+        (_, state) = self._walk_ticks(zeroForOne, amountSpecified, sqrtPriceLimitX96, False)
+        (amount0, amount1) = self._swap_amounts(zeroForOne, amountSpecified, state)
+
+        return SwapQuote(
+            self._convert_to_human(amount0),
+            self._convert_to_human(amount1),
+            state.sqrtPriceX96,
+            state.tick,
+            self._convert_to_human(state.liquidity),
+            state.ticksCrossed,
+        )
+
+    def quote_exact_input(self, zeroForOne, amount, sqrtPriceLimit = None):
+
+        """ quote_exact_input
+
+            Quote swapping an exact amount of token0 (zeroForOne) or token1 into the pool, see 
+            quote_swap
+                
+            Parameters
+            -----------------    
+            zeroForOne : bool
+                the direction of the swap, true for token0 to token1, false for token1 to token0       
+            amount : int
+                How much token to swap in
+            sqrtPriceLimit : int
+                The Q64.96 sqrt price limit, defaults to the widest limit in the swap direction     
+                
+            Returns
+            -------
+            quote : SwapQuote
+                Result of the swap                             
+        """ 
+        
+        amount = self._convert_to_machine(amount)
+        self._check_amount(amount)
+        return self.quote_swap(zeroForOne, amount, self._sqrt_price_limit(zeroForOne, sqrtPriceLimit))
+
+    def quote_exact_output(self, zeroForOne, amount, sqrtPriceLimit = None):
+
+        """ quote_exact_output
+
+            Quote receiving an exact amount of token1 (zeroForOne) or token0 from the pool, see 
+            quote_swap
+                
+            Parameters
+            -----------------    
+            zeroForOne : bool
+                the direction of the swap, true for token0 to token1, false for token1 to token0       
+            amount : int
+                How much token to receive
+            sqrtPriceLimit : int
+                The Q64.96 sqrt price limit, defaults to the widest limit in the swap direction     
+                
+            Returns
+            -------
+            quote : SwapQuote
+                Result of the swap                             
+        """ 
+        
+        amount = self._convert_to_machine(amount)
+        self._check_amount(-amount)
+        return self.quote_swap(zeroForOne, -amount, self._sqrt_price_limit(zeroForOne, sqrtPriceLimit))
+
+    def amount_to_price(self, sqrtPriceX96):
+
+        """ amount_to_price
+
+            Exact input needed to move the pool price to a target price, from a single walk over 
+            the initialized ticks between the current and the target price (O(ticks crossed)); 
+            fees are included. Nothing is changed in the pool, see swap_to_price
+                
+            Parameters
+            -----------------    
+            sqrtPriceX96 : int
+                The target Q64.96 sqrt price
+
+            Returns
+            -------
+            zeroForOne : bool
+                The direction of the swap, true when token0 has to be swapped in (target price below 
+                the current one)
+            amount_in : int
+                How much token to swap in; 0 if the pool is already at the target price                        
+        """ 
+
+        (zeroForOne, amountIn) = self._amount_to_price(sqrtPriceX96)
+        return (zeroForOne, self._convert_to_human(amountIn))
+
+    def swap_to_price(self, recipient, sqrtPriceX96):
+
+        """ swap_to_price
+
+            Swap the exact input which moves the pool price to a target price (see amount_to_price); 
+            the target is also passed as price limit, so the swap ends on it
+                
+            Parameters
+            -----------------    
+            recipient : str
+                Address which swaps
+            sqrtPriceX96 : int
+                The target Q64.96 sqrt price
+
+            Returns
+            -------
+            swap : tuple
+                (recipient, amount0, amount1, sqrtPriceX96, liquidity, tick) as returned by swap; the 
+                amounts are 0 if the pool is already at the target price                        
+        """ 
+
+        (zeroForOne, amountIn) = self._amount_to_price(sqrtPriceX96)
+        if amountIn == 0:
+            return (recipient, 0, 0, self.slot0.sqrtPriceX96, self.get_liquidity(), self.slot0.tick)
+        return self.swap(recipient, zeroForOne, amountIn, sqrtPriceX96)
+
+    def setFeeProtocol(self, feeProtocol0, feeProtocol1):
+
+        """ setFeeProtocol
+
+            Set the denominator of the protocol's % share of the fees
+            
+            Parameters
+            -----------------    
+            feeProtocol0 : int
+                New protocol fee for token0 of the pool      
+            feeProtocol1 : int
+                New protocol fee for token1 of the pool                        
+        """ 
+        
+        checkInputTypes(uint8=(feeProtocol0, feeProtocol1))
+        assert (feeProtocol0 == 0 or (feeProtocol0 >= 4 and feeProtocol0 <= 10)) and (
+            feeProtocol1 == 0 or (feeProtocol1 >= 4 and feeProtocol1 <= 10)
+        )
+
+        feeProtocolOld = self.slot0.feeProtocol
+        feeProtocolNew = feeProtocol0 + (feeProtocol1 << 4)
+        # Health check
+        checkUInt8(feeProtocolNew)
+        self.slot0.feeProtocol = feeProtocolNew
+        return (feeProtocolOld % 16, feeProtocolOld >> 4, feeProtocol0, feeProtocol1)
+
+    def checkTicks(self, tickLower, tickUpper):
+
+        """ checkTicks
 
             Common checks for valid tick inputs
             
@@ -793,6 +1214,8 @@ class UniswapV3Exchange(IExchange, LPERC20):
             (keys) have been initialized within the boundaries. However, if there is no initialized 
             tick to the left or right we will return the next boundary. Then we need to return the 
             initialized bool to indicate that we are at the boundary and it is not an initalized tick.
+            The lookup is a bisection over the sorted keys of the TickMap, O(log n) in the number of 
+            initialized ticks.
             
             Parameters
             -----------------    
@@ -809,33 +1232,58 @@ class UniswapV3Exchange(IExchange, LPERC20):
         
         checkInputTypes(int24=(tick), bool=(lte))
 
-        keyList = list(self.ticks.keys())
-
-        # If tick doesn't exist in the mapping we fake it (easier than searching for nearest value). This is probably not the
-        # best way, but it is a simple and intuitive way to reproduce the behaviour of the logic.
-        if not self.ticks.__contains__(tick):
-            keyList += [tick]
-        sortedKeyList = sorted(keyList)
-        indexCurrentTick = sortedKeyList.index(tick)
-
-        if lte:
-            # If the current tick is initialized (not faked), we return the current tick
-            if self.ticks.__contains__(tick):
-                return tick, True
-            elif indexCurrentTick == 0:
-                # No tick to the left
-                return TickMath.MIN_TICK, False
-            else:
-                nextTick = sortedKeyList[indexCurrentTick - 1]
-        else:
+        # Initialized ticks are kept sorted by the TickMap, so this is a bisection rather than a sort
+        return self.ticks.nextInitializedTick(tick, lte)
+
+    def enable_trace(self, capacity = 256):
 
-            if indexCurrentTick == len(sortedKeyList) - 1:
-                # No tick to the right
-                return TickMath.MAX_TICK, False
-            nextTick = sortedKeyList[indexCurrentTick + 1]
+        """ enable_trace
 
-        # Return tick within the boundaries
-        return nextTick, True  
+            Record every step of the following swaps (not quotes) until disable_trace is called; 
+            tracing is off by default and then costs nothing
+                
+            Parameters
+            -----------------
+            capacity : int
+                Number of steps preallocated in the trace buffers
+
+            Returns
+            -------
+            trace : SwapTrace
+                The trace being recorded; an existing trace is kept (and reused)
+        """ 
+
+        if self.trace == None:
+            self.trace = SwapTrace(capacity)
+        return self.trace
+
+    def disable_trace(self):
+
+        """ disable_trace
+
+            Stop recording swap steps
+
+            Returns
+            -------
+            trace : SwapTrace
+                The recorded trace, or None if tracing was off
+        """ 
+
+        trace = self.trace
+        self.trace = None
+        return trace
+
+    def preload_sqrt_prices(self):
+
+        """ preload_sqrt_prices
+
+            Fill the TickMath.getSqrtRatioAtTick cache with the sqrt prices of every initialized tick 
+            (ie, the boundaries of all open positions), so swaps, position updates and settlement quotes 
+            read them from the cache. The cache is bounded (TickMath.SQRT_RATIO_CACHE_SIZE), so on pools 
+            with more initialized ticks than that only the most recently loaded ones are kept.
+        """ 
+        
+        TickMath.preloadSqrtRatios(self.ticks.sortedTicks)
 
     def get_price(self, token):  
         
@@ -870,7 +1318,7 @@ class UniswapV3Exchange(IExchange, LPERC20):
             Get liquidity of exchange pool         
         """          
 
-        return UniV3Helper().gwei2dec(self.total_supply)        
+        return Precision.gweiToDec(self.total_supply)        
             
     def get_reserve(self, token):  
         
@@ -885,9 +1333,9 @@ class UniswapV3Exchange(IExchange, LPERC20):
         """         
         
         if(token.token_name == self.token0):
-            return UniV3Helper().gwei2dec(self.reserve0) 
+            return Precision.gweiToDec(self.reserve0) 
         elif(token.token_name == self.token1):
-            return UniV3Helper().gwei2dec(self.reserve1)
+            return Precision.gweiToDec(self.reserve1)
         else:
             assert False, 'UniswapV2: WRONG_INPUT_TOKEN'      
 
@@ -913,19 +1361,367 @@ class UniswapV3Exchange(IExchange, LPERC20):
         else:
             assert False, 'UniswapV2: WRONG_INPUT_TOKEN'           
 
+    def get_active_liquidity(self, tick = None):  
+        
+        """ get_active_liquidity
+
+            Get the liquidity in range when the current tick is tick, in O(log n) from the 
+            active liquidity index of the pool
+                
+            Parameters
+            -----------------
+            tick : int
+                Tick (default: current tick)                
+        """         
+        
+        tick = self.slot0.tick if tick == None else tick
+        return self._convert_to_human(self.liquidity_index().liquidityAt(tick))
+
+    def get_range_reserves(self, tickLower, tickUpper):  
+        
+        """ get_range_reserves
+
+            Get the token amounts held by the pool liquidity between two ticks, ie. the amount 
+            of token0 needed to move the price from tickLower to tickUpper and the amount of 
+            token1 needed to move it back, in O(log n) from the active liquidity index of the pool
+                
+            Parameters
+            -----------------
+            tickLower : int
+                Lower tick of the range
+            tickUpper : int
+                Upper tick of the range
+
+            Returns
+            -------
+            amount0 : float
+                Amount of token0 in the range
+            amount1 : float
+                Amount of token1 in the range
+        """         
+        
+        (amount0, amount1) = self.liquidity_index().amountsInRange(tickLower, tickUpper)
+        return (self._convert_to_human(amount0), self._convert_to_human(amount1))
+
+    def value_positions(self, keys = None, exact = True):  
+        
+        """ value_positions
+
+            Read-only valuation of many positions at the current price: the token amounts a burn of 
+            their whole liquidity would return, and their uncollected fees (tokens owed plus the fees 
+            earned since their last update, see poke_all). The fee growth inside is computed once 
+            per tick range. The exact mode runs the integer kernels (rounded down, as burn does) 
+            without input checks; the fast mode computes the amounts in float64 over arrays 
+            (relative error around 1e-15).
+                
+            Parameters
+            -----------------
+            keys : list
+                Position keys (owner, tickLower, tickUpper) (default: all positions with liquidity or 
+                tokens owed)
+            exact : bool
+                Exact integer mode (True) or fast float64 mode (False)
+
+            Returns
+            -------
+            values : dict
+                'keys' and numpy arrays 'liquidity', 'amount0', 'amount1', 'fees0' and 'fees1', one 
+                entry per position; object arrays of ints in exact mode on a GWEI pool, float64 otherwise
+        """         
+        
+        positions = self.positions
+        if keys == None:
+            keys = [key for (key, position) in positions.items() 
+                    if position.liquidity > 0 or position.tokensOwed0 > 0 or position.tokensOwed1 > 0]
+        n = len(keys)
+        tick = self.slot0.tick
+        sqrtPriceX96 = self.slot0.sqrtPriceX96
+        liquidity = [0]*n
+        sqrtLower = [0]*n
+        sqrtUpper = [0]*n
+        fees0 = [0]*n
+        fees1 = [0]*n
+        feeGrowthInside = {}
+
+        with trustedKernels():
+            for k, key in enumerate(keys):
+                position = positions[key]
+                (_, tickLower, tickUpper) = key
+                (fees0[k], fees1[k]) = (position.tokensOwed0, position.tokensOwed1)
+                liquidity[k] = position.liquidity
+                sqrtLower[k] = TickMath.getSqrtRatioAtTick(tickLower)
+                sqrtUpper[k] = TickMath.getSqrtRatioAtTick(tickUpper)
+                if position.liquidity == 0:
+                    continue
+                if (tickLower, tickUpper) not in feeGrowthInside:
+                    feeGrowthInside[(tickLower, tickUpper)] = self._fee_growth_inside(tickLower, tickUpper, tick)
+                (earned0, earned1) = self._fees_earned(position, *feeGrowthInside[(tickLower, tickUpper)])
+                fees0[k] += earned0
+                fees1[k] += earned1
+
+            if exact:
+                amount0 = [0]*n
+                amount1 = [0]*n
+                for k in range(n):
+                    if liquidity[k] == 0:
+                        continue
+                    sqrtPrice = min(max(sqrtPriceX96, sqrtLower[k]), sqrtUpper[k])
+                    amount0[k] = SqrtPriceMath.getAmount0Delta(sqrtPrice, sqrtUpper[k], liquidity[k], False)
+                    amount1[k] = SqrtPriceMath.getAmount1Delta(sqrtLower[k], sqrtPrice, liquidity[k], False)
+
+        if exact:
+            dtype = object if self.precision == UniswapExchangeData.TYPE_GWEI else float
+            convert = lambda values: np.array([self._convert_to_human(v) for v in values], dtype=dtype)
+        else:
+            decimals = 0 if self.precision == UniswapExchangeData.TYPE_GWEI else Precision.GWEI_PRECISION
+            convert = lambda values: Precision.gweiToDecArray(values, decimals)
+            liquidity_f = np.asarray(liquidity, dtype=float)
+            sqrtLower_f = np.asarray(sqrtLower, dtype=float)/FixedPoint96_Q96
+            sqrtUpper_f = np.asarray(sqrtUpper, dtype=float)/FixedPoint96_Q96
+            sqrtPrice_f = np.clip(sqrtPriceX96/FixedPoint96_Q96, sqrtLower_f, sqrtUpper_f)
+            amount0 = liquidity_f*(1/sqrtPrice_f - 1/sqrtUpper_f)
+            amount1 = liquidity_f*(sqrtPrice_f - sqrtLower_f)
+
+        return {'keys' : keys,
+                'liquidity' : convert(liquidity),
+                'amount0' : convert(amount0),
+                'amount1' : convert(amount1),
+                'fees0' : convert(fees0),
+                'fees1' : convert(fees1)}
+
+    def liquidity_index(self):  
+        
+        """ liquidity_index
+
+            Active liquidity index (Fenwick tree over liquidityNet) of the pool ticks; built on 
+            first use, then kept up to date by every tick update
+                
+            Returns
+            -------
+            index : LiquidityIndex
+                Index of self.ticks               
+        """         
+        
+        if self.ticks.liquidityIndex == None:
+            self.ticks.liquidityIndex = LiquidityIndex(self.ticks)
+        return self.ticks.liquidityIndex
+
     def _convert_to_human(self, val): 
-        val = val if self.precision == UniswapExchangeData.TYPE_GWEI else UniV3Helper().gwei2dec(val)
+        val = val if self.precision == UniswapExchangeData.TYPE_GWEI else Precision.gweiToDec(val)
         return val
 
     def _convert_to_machine(self, val): 
-        val = val if self.precision == UniswapExchangeData.TYPE_GWEI else UniV3Helper().dec2gwei(val)
+        val = val if self.precision == UniswapExchangeData.TYPE_GWEI else Precision.decToGwei(val)
         return val   
 
+    def _check_swap_inputs(self, zeroForOne, amountSpecified, sqrtPriceLimitX96): 
+        checkInputTypes(
+            bool=(zeroForOne),
+            int256=(amountSpecified),
+            uint160=(sqrtPriceLimitX96),
+        )
+
+    def _check_amount(self, amount): 
+        checkInt128(amount)
+
+    def _fee_growth_inside(self, tickLower, tickUpper, tick): 
+        return Tick.getFeeGrowthInside(
+            self.ticks,
+            tickLower,
+            tickUpper,
+            tick,
+            self.feeGrowthGlobal0X128,
+            self.feeGrowthGlobal1X128,
+        )
+
+    def _credit_position(self, position, liquidityDelta, feeGrowthInside0X128, feeGrowthInside1X128): 
+        Position.update(position, liquidityDelta, feeGrowthInside0X128, feeGrowthInside1X128)
+
+    def _fees_earned(self, position, feeGrowthInside0X128, feeGrowthInside1X128): 
+        ## as in Position.update, without updating the position
+        fees0 = FullMath.mulDiv(toUint256(feeGrowthInside0X128 - position.feeGrowthInside0LastX128),
+                                position.liquidity, FixedPoint128_Q128) & MAX_UINT128
+        fees1 = FullMath.mulDiv(toUint256(feeGrowthInside1X128 - position.feeGrowthInside1LastX128),
+                                position.liquidity, FixedPoint128_Q128) & MAX_UINT128
+        return (fees0, fees1)
+
     def _update_fees(self): 
-        liquidity = UniV3Helper().gwei2dec(self.total_supply)
+        liquidity = Precision.gweiToDec(self.total_supply)
         self.collected_fee0 = liquidity*self.feeGrowthGlobal0X128/2**128
         self.collected_fee1 = liquidity*self.feeGrowthGlobal1X128/2**128
     
+    def _walk_ticks(self, zeroForOne, amountSpecified, sqrtPriceLimitX96, cross):
+
+        """ _walk_ticks
+
+            Tick-walking loop shared by swap and quote_swap. Works on a scratch SwapState, so slot0, 
+            the fee growth globals, protocol fees and token totals are left untouched; the only pool 
+            state it may change is the fee growth outside of the initialized ticks it crosses, and 
+            only when cross is set. Steps are recorded in self.trace, if set, when cross is set.
+                
+            Parameters
+            -----------------    
+            zeroForOne : bool
+                The direction of the swap
+            amountSpecified : int
+                Exact input (positive) or exact output (negative) amount
+            sqrtPriceLimitX96 : int
+                The Q64.96 sqrt price limit of the swap
+            cross : bool
+                Run Tick.cross on every initialized tick crossed (swap) or only read its liquidityNet 
+                (quote_swap)
+                
+            Returns
+            -------
+            cache : SwapCache
+                Protocol fee and liquidity at the start of the swap
+            state : SwapState
+                State at the end of the swap                         
+        """
+        
+        slot0Start = self.slot0
+        if zeroForOne:
+            assert (
+                sqrtPriceLimitX96 < slot0Start.sqrtPriceX96
+                and sqrtPriceLimitX96 > TickMath.MIN_SQRT_RATIO
+            ), "UniswapV3: ZEROFORONE SPL"
+        else:
+            assert (
+                sqrtPriceLimitX96 > slot0Start.sqrtPriceX96
+                and sqrtPriceLimitX96 < TickMath.MAX_SQRT_RATIO
+            ), "UniswapV3: ONEFORZERO SPL"
+  
+        feeProtocol = (
+            (slot0Start.feeProtocol % 16)
+            if zeroForOne
+            else (slot0Start.feeProtocol >> 4)
+        )
+
+        cache = SwapCache(feeProtocol, self.total_supply)
+
+        exactInput = amountSpecified > 0
+
+        state = SwapState(
+            amountSpecified,
+            0,
+            slot0Start.sqrtPriceX96,
+            slot0Start.tick,
+            self.feeGrowthGlobal0X128 if zeroForOne else self.feeGrowthGlobal1X128,
+            0,
+            cache.liquidityStart,
+            [],
+        )
+
+        trace = self.trace if cross else None
+        if trace != None:
+            trace.begin_swap()
+
+        while (
+            state.amountSpecifiedRemaining != 0
+            and state.sqrtPriceX96 != sqrtPriceLimitX96
+        ):
+            step = StepComputations(0, 0, 0, 0, 0, 0, 0)
+            step.sqrtPriceStartX96 = state.sqrtPriceX96
+
+            (step.tickNext, step.initialized) = self.ticks.nextInitializedTick(state.tick, zeroForOne)
+
+            ## get the price for the next tick
+            step.sqrtPriceNextX96 = TickMath.getSqrtRatioAtTick(step.tickNext)
+
+            ## compute values to swap to the target tick, price limit, or point where input#output amount is exhausted
+            if zeroForOne:
+                sqrtRatioTargetX96 = (
+                    sqrtPriceLimitX96
+                    if step.sqrtPriceNextX96 < sqrtPriceLimitX96
+                    else step.sqrtPriceNextX96
+                )
+            else:
+                sqrtRatioTargetX96 = (
+                    sqrtPriceLimitX96
+                    if step.sqrtPriceNextX96 > sqrtPriceLimitX96
+                    else step.sqrtPriceNextX96
+                )
+
+            (
+                state.sqrtPriceX96,
+                step.amountIn,
+                step.amountOut,
+                step.feeAmount,
+            ) = SwapMath.computeSwapStep(
+                state.sqrtPriceX96,
+                sqrtRatioTargetX96,
+                state.liquidity,
+                state.amountSpecifiedRemaining,
+                self.fee,
+            )
+
+            if exactInput:
+                state.amountSpecifiedRemaining -= step.amountIn + step.feeAmount
+                state.amountCalculated = SafeMath.subInts(
+                    state.amountCalculated, step.amountOut
+                )
+            else:
+                state.amountSpecifiedRemaining += step.amountOut
+                state.amountCalculated = SafeMath.addInts(
+                    state.amountCalculated, step.amountIn + step.feeAmount
+                )
+
+            if trace != None:
+                trace.record(step.sqrtPriceStartX96, step.sqrtPriceNextX96, state.sqrtPriceX96, step.tickNext, 
+                             step.initialized, step.amountIn, step.amountOut, step.feeAmount, state.liquidity)
+
+            ## if the protocol fee is on, calculate how much is owed, decrement feeAmount, and increment protocolFee
+            if cache.feeProtocol > 0:
+                delta = abs(step.feeAmount // cache.feeProtocol)
+                step.feeAmount -= delta
+                state.protocolFee += delta & (2**128 - 1)
+
+            ## update global fee tracker
+            if state.liquidity > 0:
+                state.feeGrowthGlobalX128 += FullMath.mulDiv(
+                    step.feeAmount, FixedPoint128_Q128, state.liquidity
+                )
+                # Addition can overflow in Solidity - mimic it
+                state.feeGrowthGlobalX128 = toUint256(state.feeGrowthGlobalX128)
+
+            ## shift tick if we reached the next price
+            if state.sqrtPriceX96 == step.sqrtPriceNextX96:
+                ## if the tick is initialized, run the tick transition
+                ## @dev: here is where we should handle the case of an uninitialized boundary tick
+                if step.initialized:
+                    if cross:
+                        if self.journal.savepoints:
+                            self.journal.record(self.ticks, step.tickNext)
+                        liquidityNet = Tick.cross(
+                            self.ticks,
+                            step.tickNext,
+                            state.feeGrowthGlobalX128
+                            if zeroForOne
+                            else self.feeGrowthGlobal0X128,
+                            self.feeGrowthGlobal1X128
+                            if zeroForOne
+                            else state.feeGrowthGlobalX128,
+                        )
+                    else:
+                        ## quotes only need the liquidity change, the fee growth outside is left untouched
+                        liquidityNet = self.ticks[step.tickNext].liquidityNet
+                    ## if we're moving leftward, we interpret liquidityNet as the opposite sign
+                    ## safe because liquidityNet cannot be type(int128).min
+                    if zeroForOne:
+                        liquidityNet = -liquidityNet
+
+                    state.liquidity = LiquidityMath.addDelta(
+                        state.liquidity, liquidityNet
+                    )
+                    state.ticksCrossed.append(step.tickNext)
+
+                state.tick = (step.tickNext - 1) if zeroForOne else step.tickNext
+            elif state.sqrtPriceX96 != step.sqrtPriceStartX96:
+                ## recompute unless we're on a lower tick boundary (i.e. already transitioned ticks), and haven't moved
+                state.tick = TickMath.getTickAtSqrtRatio(state.sqrtPriceX96)
+
+        return (cache, state)
+
     def _swap(self, inputToken, amounts, recipient, sqrtPriceLimitX96):
         [amountIn, amountOut] = amounts
         exactInput = amountOut == 0
@@ -933,19 +1729,50 @@ class UniswapV3Exchange(IExchange, LPERC20):
 
         if inputToken == 'Token0':
             if exactInput:
-                checkInt128(amount)
+                self._check_amount(amount)
                 return self.swap(recipient, True, amount, sqrtPriceLimitX96)
             else:
-                checkInt128(-amount)
+                self._check_amount(-amount)
                 return self.swap(recipient, True, -amount, sqrtPriceLimitX96)
         else:
             if exactInput:
-                checkInt128(amount)
+                self._check_amount(amount)
                 return self.swap(recipient, False, amount, sqrtPriceLimitX96)                  
             else:
-                checkInt128(-amount)
+                self._check_amount(-amount)
                 return self.swap(recipient, False, -amount, sqrtPriceLimitX96)      
     
+    @trustedEntryPoint
+    def _amount_to_price(self, sqrtPriceX96):
+        self._check_swap_inputs(True, MAX_INT256, sqrtPriceX96)
+        assert TickMath.MIN_SQRT_RATIO < sqrtPriceX96 < TickMath.MAX_SQRT_RATIO, "UniswapV3: SPL"
+        if sqrtPriceX96 == self.slot0.sqrtPriceX96:
+            return (True, 0)
+        ## an unbounded exact input stops at the price limit: what it consumed is the input needed
+        ## (machine units, so swap_to_price can pass it on to swap unchanged)
+        zeroForOne = sqrtPriceX96 < self.slot0.sqrtPriceX96
+        (_, state) = self._walk_ticks(zeroForOne, MAX_INT256, sqrtPriceX96, False)
+        (amount0, amount1) = self._swap_amounts(zeroForOne, MAX_INT256, state)
+        return (zeroForOne, amount0 if zeroForOne else amount1)
+
+    def _swap_amounts(self, zeroForOne, amountSpecified, state):
+        amountSpecifiedUsed = (
+            amountSpecified - state.amountSpecifiedRemaining
+            if state.amountSpecifiedUsed == None
+            else state.amountSpecifiedUsed
+        )
+        return (
+            (amountSpecifiedUsed, state.amountCalculated)
+            if (zeroForOne == (amountSpecified > 0))
+            else (state.amountCalculated, amountSpecifiedUsed)
+        )
+
+    def _sqrt_price_limit(self, zeroForOne, sqrtPriceLimit):
+        if sqrtPriceLimit != None:
+            return sqrtPriceLimit
+        inputToken = UniV3Utils.TEST_TOKENS[0] if zeroForOne else UniV3Utils.TEST_TOKENS[1]
+        return UniV3Utils.getSqrtPriceLimitX96(inputToken)
+
     def _swap_tokens(self, amountA_out, amountB_out, to_addr):
         
         """ _swap_tokens
@@ -988,7 +1815,8 @@ class UniswapV3Exchange(IExchange, LPERC20):
         
         """ _update
 
-            Update reserve amounts for both coins in the pair
+            Update reserve amounts for both coins in the pair and bump the state version 
+            (mint, burn and swap all end here)
                 
             Parameters
             -----------------   
@@ -1000,14 +1828,16 @@ class UniswapV3Exchange(IExchange, LPERC20):
         
         self.reserve0 = balanceA
         self.reserve1 = balanceB    
+        self.state_version += 1
     
     def _modifyPosition(self, params):
 
-        checkInputTypes(
-            accounts=(params.owner),
-            int24=(params.tickLower, params.tickUpper),
-            int128=(params.liquidityDelta),
-        )
+        if kernelMode.checked:
+            checkInputTypes(
+                accounts=(params.owner),
+                int24=(params.tickLower, params.tickUpper),
+                int128=(params.liquidityDelta),
+            )
         self.checkTicks(params.tickLower, params.tickUpper)
 
         # Initialize values
@@ -1022,50 +1852,80 @@ class UniswapV3Exchange(IExchange, LPERC20):
         )
 
         if params.liquidityDelta != 0:
-            if self.slot0.tick < params.tickLower:
-                ## current tick is below the passed range; liquidity can only become in range by crossing from left to
-                ## right, when we'll need _more_ token0 (it's becoming more valuable) so user must provide it
-                amount0 = SqrtPriceMath.getAmount0DeltaHelper(
-                    TickMath.getSqrtRatioAtTick(params.tickLower),
-                    TickMath.getSqrtRatioAtTick(params.tickUpper),
-                    params.liquidityDelta,
-                )
-            elif self.slot0.tick < params.tickUpper:
+            (amount0, amount1) = self._position_amounts(params.tickLower, params.tickUpper, params.liquidityDelta)
+            if self.slot0.tick >= params.tickLower and self.slot0.tick < params.tickUpper:
                 ## current tick is inside the passed range
-                amount0 = SqrtPriceMath.getAmount0DeltaHelper(
-                    self.slot0.sqrtPriceX96,
-                    TickMath.getSqrtRatioAtTick(params.tickUpper),
-                    params.liquidityDelta,
-                )
-                amount1 = SqrtPriceMath.getAmount1DeltaHelper(
-                    TickMath.getSqrtRatioAtTick(params.tickLower),
-                    self.slot0.sqrtPriceX96,
-                    params.liquidityDelta,
-                )
+                ## write an oracle entry
+                self._write_observation(self.slot0.tick, self.total_supply)
                 self.total_supply = LiquidityMath.addDelta(
                     self.total_supply, params.liquidityDelta
                 )
                 self.last_liquidity_deposit = self._convert_to_human(params.liquidityDelta)
-            else:
-                ## current tick is above the passed range; liquidity can only become in range by crossing from right to
-                ## left, when we'll need _more_ token1 (it's becoming more valuable) so user must provide it
-                amount1 = SqrtPriceMath.getAmount1DeltaHelper(
-                    TickMath.getSqrtRatioAtTick(params.tickLower),
-                    TickMath.getSqrtRatioAtTick(params.tickUpper),
-                    params.liquidityDelta,
-                )
 
         return (position, amount0, amount1)  
     
-    def _updatePosition(self, owner, tickLower, tickUpper, liquidityDelta, tick):
-        checkInputTypes(
-            accounts=(owner),
-            int24=(tickLower, tickUpper, tick),
-            int128=(liquidityDelta),
+    def _position_amounts(self, tickLower, tickUpper, liquidityDelta):
+        if self.slot0.tick < tickLower:
+            ## current tick is below the passed range; liquidity can only become in range by crossing from left to
+            ## right, when we'll need _more_ token0 (it's becoming more valuable) so user must provide it
+            amount0 = SqrtPriceMath.getAmount0DeltaHelper(
+                TickMath.getSqrtRatioAtTick(tickLower),
+                TickMath.getSqrtRatioAtTick(tickUpper),
+                liquidityDelta,
+            )
+            return (amount0, 0)
+        elif self.slot0.tick < tickUpper:
+            ## current tick is inside the passed range
+            amount0 = SqrtPriceMath.getAmount0DeltaHelper(
+                self.slot0.sqrtPriceX96,
+                TickMath.getSqrtRatioAtTick(tickUpper),
+                liquidityDelta,
+            )
+            amount1 = SqrtPriceMath.getAmount1DeltaHelper(
+                TickMath.getSqrtRatioAtTick(tickLower),
+                self.slot0.sqrtPriceX96,
+                liquidityDelta,
+            )
+            return (amount0, amount1)
+        else:
+            ## current tick is above the passed range; liquidity can only become in range by crossing from right to
+            ## left, when we'll need _more_ token1 (it's becoming more valuable) so user must provide it
+            amount1 = SqrtPriceMath.getAmount1DeltaHelper(
+                TickMath.getSqrtRatioAtTick(tickLower),
+                TickMath.getSqrtRatioAtTick(tickUpper),
+                liquidityDelta,
+            )
+            return (0, amount1)
+
+    def _write_observation(self, tick, liquidity):
+        index = self.slot0.observationIndex
+        cardinality = self.slot0.observationCardinality
+        if self.journal.savepoints:
+            self.journal.record(self.observations, (index + 1) % self.slot0.observationCardinalityNext)
+        (self.slot0.observationIndex, self.slot0.observationCardinality) = Oracle.write(
+            self.observations,
+            index,
+            self.block_timestamp,
+            tick,
+            liquidity,
+            cardinality,
+            self.slot0.observationCardinalityNext,
         )
-        # This will create a position if it doesn't exist
 
-        
+    def _updatePosition(self, owner, tickLower, tickUpper, liquidityDelta, tick):
+        if kernelMode.checked:
+            checkInputTypes(
+                accounts=(owner),
+                int24=(tickLower, tickUpper, tick),
+                int128=(liquidityDelta),
+            )
+        if self.journal.savepoints:
+            self.journal.record(self.positions, Position.positionKey(owner, tickLower, tickUpper))
+            if liquidityDelta != 0:
+                self.journal.record(self.ticks, tickLower)
+                self.journal.record(self.ticks, tickUpper)
+
+        # This will create a position if it doesn't exist
         position = Position.get(self.positions, owner, tickLower, tickUpper)
 
         # Initialize values
@@ -1099,16 +1959,11 @@ class UniswapV3Exchange(IExchange, LPERC20):
         if flippedUpper:
             assert tickUpper % self.tickSpacing == 0  ## ensure that the tick is spaced
 
-        (feeGrowthInside0X128, feeGrowthInside1X128) = Tick.getFeeGrowthInside(
-            self.ticks,
-            tickLower,
-            tickUpper,
-            tick,
-            self.feeGrowthGlobal0X128,
-            self.feeGrowthGlobal1X128,
+        (feeGrowthInside0X128, feeGrowthInside1X128) = self._fee_growth_inside(
+            tickLower, tickUpper, tick
         )
 
-        Position.update(
+        self._credit_position(
             position, liquidityDelta, feeGrowthInside0X128, feeGrowthInside1X128
         )
 
@@ -0,0 +1,465 @@
+# Copyright [2024] [Ian Moore]
+# Distributed under the MIT License (license terms are at http://opensource.org/licenses/MIT).
+# Email: defipy.devs@gmail.com
+
+import math
+from ...utils.data import FactoryData
+from ...utils.data import UniswapExchangeData
+from ...utils.tools.v3.Shared import *
+from ...utils.tools.v3 import Position, Tick, LiquidityMath, TickMath, Precision, FloatMath
+from .UniswapV3Exchange import UniswapV3Exchange, ModifyPositionParams, SwapCache, SwapState
+
+GWEI_PRECISION = 18
+FLOAT_GWEI = Precision.FLOAT_SCALES[GWEI_PRECISION]
+
+class UniswapV3FloatExchange(UniswapV3Exchange):
+
+    """
+        Uniswap V3 Exchange, float64 engine
+
+        Approximate version of UniswapV3Exchange for Monte Carlo workloads, with the same public
+        API (mint, burn, collect, swap and its variants, quotes, get_price, get_reserve, ...).
+        Sqrt prices (slot0.sqrtPriceX96), token amounts, reserves, fee growth and fees owed are
+        float64, and the swap loop runs on FloatMath instead of the Q64.96 integer kernels: results
+        carry a relative error of the order of 1e-15 per swap step and are not rounded in favour of
+        the pool. The liquidity of positions and ticks stays an exact integer (machine units), so
+        the tick mapping, positions and active liquidity index are the same structures as in the
+        integer engine and a position burnt to zero clears its ticks exactly. Deployed by
+        UniswapFactory when exchg_struct.engine is ENGINE_FLOAT.
+
+        Parameters
+        -----------------
+        factory_struct : FactoryInit
+            Factory initialization data
+        exchg_struct : UniswapExchangeInit
+            Exchange initialization data
+    """
+
+    def __init__(self, factory_struct: FactoryData, exchg_struct: UniswapExchangeData):
+        super().__init__(factory_struct, exchg_struct)
+        # Entry points validate their own arguments; the integer kernels shared with the exact
+        # engine (Tick.update, Tick.cross) would reject float fee growth values
+        self.trusted = True
+
+    def initialize(self, sqrtPriceX96):
+
+        """ initialize
+
+            Sets the initial price for the pool
+
+            Parameters
+            -----------------
+            sqrtPriceX96 : float
+                the initial sqrt price of the pool as a Q64.96 (int or float)
+        """
+
+        assert self.slot0.sqrtPriceX96 == 0, "UniswapV3: AI"
+        assert sqrtPriceX96 >= TickMath.MIN_SQRT_RATIO and sqrtPriceX96 < TickMath.MAX_SQRT_RATIO, "R"
+        super().initialize(int(sqrtPriceX96))
+        self.slot0.sqrtPriceX96 = float(sqrtPriceX96)
+        self.state_version += 1
+
+    @trustedEntryPoint
+    def mint(self, recipient, tickLower, tickUpper, amount):
+
+        """ mint
+
+            Adds liquidity for the given recipient/tickLower/tickUpper position, see
+            UniswapV3Exchange.mint
+
+            Parameters
+            -----------------
+            recipient : str
+                Address for which the liquidity will be created
+            tickLower : int
+                Lower tick of the position in which to add liquidity
+            tickUpper : int
+                Upper tick of the position in which to add liquidity
+            amount : int
+                Amount of liquidity to mint
+
+            Returns
+            -------
+            amount0 : float
+                Amount of token0 that was paid to mint the given amount of liquidity.
+            amount1 : float
+                Amount of token1 that was paid to mint the given amount of liquidity.
+        """
+
+        amount = super()._convert_to_machine(amount)
+
+        checkInputTypes(
+            accounts=(recipient), int24=(tickLower, tickUpper), uint128=(amount)
+        )
+        assert amount > 0
+
+        (_, amount0, amount1) = self._modifyPosition(
+            ModifyPositionParams(recipient, tickLower, tickUpper, amount)
+        )
+
+        tokens = self.factory.token_from_exchange[self.name]
+        assert tokens.get(self.token0) and tokens.get(self.token1), 'UniswapV3: TOKEN_UNAVAILABLE'
+
+        tokens.get(self.token0).deposit(recipient, amount0)
+        tokens.get(self.token1).deposit(recipient, amount1)
+        self._update(tokens.get(self.token0).token_total, tokens.get(self.token1).token_total)
+
+        return (self._convert_to_human(amount0), self._convert_to_human(amount1))
+
+    @trustedEntryPoint
+    def collect(self, recipient, tickLower, tickUpper, amount0Requested, amount1Requested):
+
+        """ collect
+
+            Collects tokens owed to a position, see UniswapV3Exchange.collect
+
+            Parameters
+            -----------------
+            recipient : str
+                Address for which the liquidity will be created
+            tickLower : int
+                Lower tick of the position in which to add liquidity
+            tickUpper : int
+                Lower tick of the position in which to add liquidity
+            amount0Requested : float
+                How much token0 should be withdrawn from the fees owed
+            amount1Requested : float
+                How much token1 should be withdrawn from the fees owed
+
+            Returns
+            -------
+            recipient : str
+                Address of the position owner
+            tickLower : int
+                Lower tick of the position
+            tickUpper : int
+                Upper tick of the position
+            amount0 : float
+                Amount of token0 collected
+            amount1 : float
+                Amount of token1 collected
+        """
+
+        amount0Requested = self._convert_to_machine(amount0Requested)
+        amount1Requested = self._convert_to_machine(amount1Requested)
+
+        checkInputTypes(accounts=(recipient), int24=(tickLower, tickUpper))
+        assert amount0Requested >= 0 and amount1Requested >= 0, "UniswapV3: AR"
+        position = Position.assertPositionExists(
+            self.positions, recipient, tickLower, tickUpper
+        )
+
+        if self.journal.savepoints:
+            self.journal.record(self.positions, Position.positionKey(recipient, tickLower, tickUpper))
+
+        amount0 = min(amount0Requested, position.tokensOwed0)
+        amount1 = min(amount1Requested, position.tokensOwed1)
+
+        tokens = self.factory.token_from_exchange[self.name]
+        assert tokens.get(self.token0) and tokens.get(self.token1), 'UniswapV3: TOKEN_UNAVAILABLE'
+
+        if amount0 > 0:
+            position.tokensOwed0 -= amount0
+            tokens.get(self.token0).deposit(recipient, amount0)
+        if amount1 > 0:
+            position.tokensOwed1 -= amount1
+            tokens.get(self.token1).deposit(recipient, amount1)
+
+        return (recipient, tickLower, tickUpper, self._convert_to_human(amount0), self._convert_to_human(amount1))
+
+    @trustedEntryPoint
+    def burn(self, recipient, tickLower, tickUpper, amount):
+
+        """ burn
+
+            Burn liquidity from the sender and account tokens owed for the liquidity to the position,
+            see UniswapV3Exchange.burn
+
+            Parameters
+            -----------------
+            recipient : str
+                Address for which the liquidity will be created
+            tickLower : int
+                Lower tick of the position in which to add liquidity
+            tickUpper : int
+                Lower tick of the position in which to add liquidity
+            amount : int
+                How much liquidity to burn
+
+            Returns
+            -------
+            recipient : str
+                Address of the position owner
+            tickLower : int
+                Lower tick of the position
+            tickUpper : int
+                Upper tick of the position
+            amount : float
+                How much liquidity was burnt
+            amount0 : float
+                Amount of token0 owed to the position for the liquidity burnt
+            amount1 : float
+                Amount of token1 owed to the position for the liquidity burnt
+        """
+
+        amount = super()._convert_to_machine(amount)
+
+        checkInputTypes(
+            accounts=(recipient), int24=(tickLower, tickUpper), uint128=(amount)
+        )
+        Position.assertPositionExists(self.positions, recipient, tickLower, tickUpper)
+
+        (position, amount0, amount1) = self._modifyPosition(
+            ModifyPositionParams(recipient, tickLower, tickUpper, -amount)
+        )
+
+        tokens = self.factory.token_from_exchange[self.name]
+        tokens.get(self.token0).deposit(recipient, amount0)
+        tokens.get(self.token1).deposit(recipient, amount1)
+        self._update(tokens.get(self.token0).token_total, tokens.get(self.token1).token_total)
+
+        (amount0, amount1) = (-amount0, -amount1)
+        if amount0 > 0 or amount1 > 0:
+            position.tokensOwed0 += amount0
+            position.tokensOwed1 += amount1
+
+        return (recipient, tickLower, tickUpper, super()._convert_to_human(amount),
+                self._convert_to_human(amount0), self._convert_to_human(amount1))
+
+    def value_positions(self, keys = None, exact = True):
+
+        """ value_positions
+
+            Read-only valuation of many positions at the current price, see
+            UniswapV3Exchange.value_positions; on the float64 engine both modes run the fast float64
+            path (amounts and fees are float64 arrays)
+
+            Parameters
+            -----------------
+            keys : list
+                Position keys (owner, tickLower, tickUpper) (default: all positions with liquidity or
+                tokens owed)
+            exact : bool
+                Ignored, kept for API compatibility
+
+            Returns
+            -------
+            values : dict
+                'keys' and float64 numpy arrays 'liquidity', 'amount0', 'amount1', 'fees0' and
+                'fees1', one entry per position
+        """
+
+        return super().value_positions(keys, exact = False)
+
+    def get_reserve(self, token):
+
+        """ get_reserve
+
+            Get reserve amount of select token in the exchange pair
+
+            Parameters
+            -----------------
+            token : ERC20
+                ERC20 token
+        """
+
+        if(token.token_name == self.token0):
+            return Precision.gweiToDecFloat(self.reserve0)
+        elif(token.token_name == self.token1):
+            return Precision.gweiToDecFloat(self.reserve1)
+        else:
+            assert False, 'UniswapV2: WRONG_INPUT_TOKEN'
+
+    def _convert_to_human(self, val):
+        return val if self.precision == UniswapExchangeData.TYPE_GWEI else val / FLOAT_GWEI
+
+    def _convert_to_machine(self, val):
+        return val if self.precision == UniswapExchangeData.TYPE_GWEI else float(val) * FLOAT_GWEI
+
+    def _check_swap_inputs(self, zeroForOne, amountSpecified, sqrtPriceLimitX96):
+        checkInputTypes(bool=(zeroForOne))
+        self._check_amount(amountSpecified)
+        assert sqrtPriceLimitX96 > 0, "UniswapV3: SPL"
+
+    def _check_amount(self, amount):
+        assert math.isfinite(amount), "UniswapV3: AS"
+
+    def _fee_growth_inside(self, tickLower, tickUpper, tick):
+        return FloatMath.getFeeGrowthInside(
+            self.ticks,
+            tickLower,
+            tickUpper,
+            tick,
+            self.feeGrowthGlobal0X128,
+            self.feeGrowthGlobal1X128,
+        )
+
+    def _credit_position(self, position, liquidityDelta, feeGrowthInside0X128, feeGrowthInside1X128):
+        FloatMath.updatePosition(position, liquidityDelta, feeGrowthInside0X128, feeGrowthInside1X128)
+
+    def _fees_earned(self, position, feeGrowthInside0X128, feeGrowthInside1X128):
+        ## as in FloatMath.updatePosition, without updating the position
+        fees0 = (feeGrowthInside0X128 - position.feeGrowthInside0LastX128) * position.liquidity / FloatMath.Q128
+        fees1 = (feeGrowthInside1X128 - position.feeGrowthInside1LastX128) * position.liquidity / FloatMath.Q128
+        return (fees0, fees1) if fees0 > 0 or fees1 > 0 else (0.0, 0.0)
+
+    def _walk_ticks(self, zeroForOne, amountSpecified, sqrtPriceLimitX96, cross):
+
+        """ _walk_ticks
+
+            Float64 version of UniswapV3Exchange._walk_ticks: the swap state is kept in local floats
+            (plain sqrt price, amounts, fee growth) and only the liquidity in range is an integer. The
+            amount of the specified asset swapped is accumulated step by step (amountSpecifiedUsed)
+
+            Parameters
+            -----------------
+            zeroForOne : bool
+                The direction of the swap
+            amountSpecified : float
+                Exact input (positive) or exact output (negative) amount
+            sqrtPriceLimitX96 : float
+                The Q64.96 sqrt price limit of the swap
+            cross : bool
+                Run Tick.cross on every initialized tick crossed (swap) or only read its liquidityNet
+                (quote_swap)
+
+            Returns
+            -------
+            cache : SwapCache
+                Protocol fee and liquidity at the start of the swap
+            state : SwapState
+                State at the end of the swap, with float amounts and sqrt price
+        """
+
+        slot0Start = self.slot0
+        if zeroForOne:
+            assert (
+                sqrtPriceLimitX96 < slot0Start.sqrtPriceX96
+                and sqrtPriceLimitX96 > TickMath.MIN_SQRT_RATIO
+            ), "UniswapV3: ZEROFORONE SPL"
+        else:
+            assert (
+                sqrtPriceLimitX96 > slot0Start.sqrtPriceX96
+                and sqrtPriceLimitX96 < TickMath.MAX_SQRT_RATIO
+            ), "UniswapV3: ONEFORZERO SPL"
+
+        feeProtocol = (
+            (slot0Start.feeProtocol % 16)
+            if zeroForOne
+            else (slot0Start.feeProtocol >> 4)
+        )
+        cache = SwapCache(feeProtocol, self.total_supply)
+
+        exactInput = amountSpecified > 0
+        fee = self.fee
+        ticks = self.ticks
+        trace = self.trace if cross else None
+        if trace != None:
+            trace.begin_swap()
+
+        amountSpecifiedRemaining = float(amountSpecified)
+        amountCalculated = 0.0
+        amountSpecifiedUsed = 0.0
+        sqrtPrice = slot0Start.sqrtPriceX96 / FloatMath.Q96
+        sqrtPriceLimit = sqrtPriceLimitX96 / FloatMath.Q96
+        tick = slot0Start.tick
+        feeGrowthGlobalX128 = self.feeGrowthGlobal0X128 if zeroForOne else self.feeGrowthGlobal1X128
+        protocolFee = 0.0
+        liquidity = cache.liquidityStart
+        liquidityFloat = float(liquidity)
+        ticksCrossed = []
+
+        while amountSpecifiedRemaining != 0 and sqrtPrice != sqrtPriceLimit:
+            sqrtPriceStart = sqrtPrice
+            (tickNext, initialized) = ticks.nextInitializedTick(tick, zeroForOne)
+            sqrtPriceNext = FloatMath.getSqrtPriceAtTick(tickNext)
+
+            ## compute values to swap to the target tick, price limit, or point where input#output amount is exhausted
+            if zeroForOne:
+                sqrtPriceTarget = sqrtPriceLimit if sqrtPriceNext < sqrtPriceLimit else sqrtPriceNext
+            else:
+                sqrtPriceTarget = sqrtPriceLimit if sqrtPriceNext > sqrtPriceLimit else sqrtPriceNext
+
+            (sqrtPrice, amountIn, amountOut, feeAmount) = FloatMath.computeSwapStep(
+                sqrtPrice, sqrtPriceTarget, liquidityFloat, amountSpecifiedRemaining, fee
+            )
+
+            ## a step which stops short of its target uses up what is left of the amount
+            if exactInput:
+                amountSpecifiedRemaining = (
+                    max(amountSpecifiedRemaining - amountIn - feeAmount, 0.0)
+                    if sqrtPrice == sqrtPriceTarget else 0.0
+                )
+                amountSpecifiedUsed += amountIn + feeAmount
+                amountCalculated -= amountOut
+            else:
+                amountSpecifiedRemaining = (
+                    min(amountSpecifiedRemaining + amountOut, 0.0)
+                    if sqrtPrice == sqrtPriceTarget else 0.0
+                )
+                amountSpecifiedUsed -= amountOut
+                amountCalculated += amountIn + feeAmount
+
+            if trace != None:
+                trace.record(sqrtPriceStart*FloatMath.Q96, sqrtPriceNext*FloatMath.Q96, sqrtPrice*FloatMath.Q96,
+                             tickNext, initialized, amountIn, amountOut, feeAmount, liquidityFloat)
+
+            ## if the protocol fee is on, calculate how much is owed, decrement feeAmount, and increment protocolFee
+            if cache.feeProtocol > 0:
+                delta = feeAmount / cache.feeProtocol
+                feeAmount -= delta
+                protocolFee += delta
+
+            ## update global fee tracker
+            if liquidity > 0:
+                feeGrowthGlobalX128 += feeAmount * FloatMath.Q128 / liquidityFloat
+
+            ## shift tick if we reached the next price
+            if sqrtPrice == sqrtPriceNext:
+                if initialized:
+                    if cross:
+                        if self.journal.savepoints:
+                            self.journal.record(ticks, tickNext)
+                        liquidityNet = Tick.cross(
+                            ticks,
+                            tickNext,
+                            feeGrowthGlobalX128 if zeroForOne else self.feeGrowthGlobal0X128,
+                            self.feeGrowthGlobal1X128 if zeroForOne else feeGrowthGlobalX128,
+                        )
+                    else:
+                        liquidityNet = ticks[tickNext].liquidityNet
+                    if zeroForOne:
+                        liquidityNet = -liquidityNet
+                    liquidity = LiquidityMath.addDelta(liquidity, liquidityNet)
+                    liquidityFloat = float(liquidity)
+                    ticksCrossed.append(tickNext)
+
+                tick = (tickNext - 1) if zeroForOne else tickNext
+            elif sqrtPrice != sqrtPriceStart:
+                tick = FloatMath.getTickAtSqrtPrice(sqrtPrice)
+
+        state = SwapState(
+            amountSpecifiedRemaining,
+            amountCalculated,
+            sqrtPrice * FloatMath.Q96,
+            tick,
+            feeGrowthGlobalX128,
+            protocolFee,
+            liquidity,
+            ticksCrossed,
+            amountSpecifiedUsed,
+        )
+        return (cache, state)
+
+    def _position_amounts(self, tickLower, tickUpper, liquidityDelta):
+        liquidityDelta = float(liquidityDelta)
+        sqrtPriceLower = FloatMath.getSqrtPriceAtTick(tickLower)
+        sqrtPriceUpper = FloatMath.getSqrtPriceAtTick(tickUpper)
+        if self.slot0.tick < tickLower:
+            return (FloatMath.getAmount0Delta(sqrtPriceLower, sqrtPriceUpper, liquidityDelta), 0.0)
+        elif self.slot0.tick < tickUpper:
+            sqrtPrice = self.slot0.sqrtPriceX96 / FloatMath.Q96
+            return (FloatMath.getAmount0Delta(sqrtPrice, sqrtPriceUpper, liquidityDelta),
+                    FloatMath.getAmount1Delta(sqrtPriceLower, sqrtPrice, liquidityDelta))
+        else:
+            return (0.0, FloatMath.getAmount1Delta(sqrtPriceLower, sqrtPriceUpper, liquidityDelta))
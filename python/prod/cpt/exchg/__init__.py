@@ -1,4 +1,6 @@
 from .UniswapExchange import UniswapExchange
+from .UniswapIntegerExchange import UniswapIntegerExchange
 from .UniswapV3Exchange import UniswapV3Exchange
+from .UniswapV3FloatExchange import UniswapV3FloatExchange
 from .ChildUniswapExchange import ChildUniswapExchange
 from .ChildLP import ChildLP
\ No newline at end of file
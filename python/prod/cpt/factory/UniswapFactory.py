@@ -3,7 +3,9 @@
 # Email: defipy.devs@gmail.com
 
 from ..exchg import UniswapExchange 
+from ..exchg import UniswapIntegerExchange 
 from ..exchg import UniswapV3Exchange 
+from ..exchg import UniswapV3FloatExchange 
 from ...erc import ERC20
 from ...erc import LPERC20
 from ...utils.interfaces import IExchangeFactory 
@@ -66,14 +68,27 @@ class UniswapFactory(IExchangeFactory):
 
         match exchg_data.version:
             case UniswapExchangeData.VERSION_V2:
-                exchg_struct = UniswapExchangeData(tkn0 = token0, tkn1 = token1, symbol=symbol, address=address)
-                exchange = UniswapExchange(factory_struct, exchg_struct) 
+                exchg_struct = UniswapExchangeData(tkn0 = token0, tkn1 = token1, symbol=symbol, address=address,
+                                                   precision = precision, 
+                                                   observation_cardinality = exchg_data.observation_cardinality,
+                                                   fee_history = exchg_data.fee_history,
+                                                   engine = exchg_data.engine)
+                if exchg_data.engine == UniswapExchangeData.ENGINE_INTEGER:
+                    exchange = UniswapIntegerExchange(factory_struct, exchg_struct) 
+                else:
+                    exchange = UniswapExchange(factory_struct, exchg_struct) 
             case UniswapExchangeData.VERSION_V3: 
                 exchg_struct = UniswapExchangeData(tkn0 = token0, tkn1 = token1, symbol=symbol, 
                                                    address=address, version = UniswapExchangeData.VERSION_V3, 
                                                    precision = precision, 
-                                                   tick_spacing = exchg_data.tick_spacing, fee = exchg_data.fee)                
-                exchange = UniswapV3Exchange(factory_struct, exchg_struct) 
+                                                   tick_spacing = exchg_data.tick_spacing, fee = exchg_data.fee,
+                                                   trusted = exchg_data.trusted, tick_store = exchg_data.tick_store,
+                                                   observation_cardinality = exchg_data.observation_cardinality,
+                                                   engine = exchg_data.engine)                
+                if exchg_data.engine == UniswapExchangeData.ENGINE_FLOAT:
+                    exchange = UniswapV3FloatExchange(factory_struct, exchg_struct) 
+                else:
+                    exchange = UniswapV3Exchange(factory_struct, exchg_struct) 
         
         self.exchange_from_token[token0.token_name] = exchange
         self.token_from_exchange[exchange.name] = {token0.token_name: token0, token1.token_name: token1}
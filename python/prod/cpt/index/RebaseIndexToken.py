@@ -2,6 +2,7 @@
 # Distributed under the MIT License (license terms are at http://opensource.org/licenses/MIT).
 # Email: defipy.devs@gmail.com
 
+import numpy as np
 from ...erc import ERC20
 from ...utils.data import UniswapExchangeData
 from ...utils.tools.v3 import TickMath
@@ -28,15 +29,17 @@ class RebaseIndexToken():
                 Uniswap LP    
             tkn: ERC20
                 Token asset from CPT pair       
-            liq_amt: float
-                Liquidity amount to be priced in in terms of reserve token                 
+            liq_amt: float or np.array
+                Liquidity amount to be priced in in terms of reserve token; an array of amounts is 
+                priced at once, against the same pool state                 
 
             Returns
             -----------------
-            rebase_amount: float
+            rebase_amount: float or np.array
                 Reserve token amount, given liquidity amount
                    
         """        
+        liq_amt = liq_amt if np.isscalar(liq_amt) else np.asarray(liq_amt, dtype=float)
         if(lp.version == UniswapExchangeData.VERSION_V2):
             settlement = self.calc_univ2_tkn_settlement(lp, tkn, liq_amt)
         elif(lp.version == UniswapExchangeData.VERSION_V3):   
@@ -56,7 +59,7 @@ class RebaseIndexToken():
         dy2 = gamma*a0*(y - a1)/(x - a0 + gamma*a0)
         itkn_amt = dy1 + dy2
 
-        return itkn_amt if itkn_amt > 0 else 0  
+        return self._floor_zero(itkn_amt)  
 
     def calc_univ3_tkn_settlement(self, lp, token_in, dL, lwr_tick, upr_tick):
                 
@@ -83,7 +86,12 @@ class RebaseIndexToken():
             sqrtp_next = sqrtp_cur + (997*dx)/(L_diff*1000) 
             itkn_amt = dy + L_diff * (1/sqrtp_cur - 1/sqrtp_next)
 
-        return itkn_amt if itkn_amt > 0 else 0 
+        return self._floor_zero(itkn_amt) 
+
+    def _floor_zero(self, itkn_amt):
+        if np.isscalar(itkn_amt):
+            return itkn_amt if itkn_amt > 0 else 0
+        return np.maximum(itkn_amt, 0)
     
 
     def get_reserves(self, lp, token_in):
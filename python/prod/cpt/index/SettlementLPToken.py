@@ -28,15 +28,17 @@ class SettlementLPToken():
                 Uniswap LP    
             tkn: ERC20
                 Token asset from CPT pair       
-            itkn_amt: float
-                Token reserve amount to be priced in terms of liquidity                 
+            itkn_amt: float or np.array
+                Token reserve amount to be priced in terms of liquidity; an array of amounts is 
+                priced at once, against the same pool state                 
 
             Returns
             -----------------
-            lp_amount: float
+            lp_amount: float or np.array
                 Liquidity amount given reserve token amount
                    
         """          
+        itkn_amt = itkn_amt if np.isscalar(itkn_amt) else np.asarray(itkn_amt, dtype=float)
         if(lp.version == UniswapExchangeData.VERSION_V2):
             settlement = self.calc_univ2_lp_settlement(lp, tkn, itkn_amt)
         elif(lp.version == UniswapExchangeData.VERSION_V3):   
@@ -48,8 +50,34 @@ class SettlementLPToken():
 
         (x, y) = self.get_reserves(lp, token_in)
         L = lp.get_liquidity()
+        return self.calc_univ2_settlement(x, y, L, itkn_amt)
+
+    def calc_univ2_settlement(self, x, y, L, itkn_amt):
+    
+        """ calc_univ2_settlement
+
+            V2 settlement from given reserves and liquidity, so callers which track the pool state 
+            themselves skip the reserve lookups; itkn_amt may be an array
+                
+            Parameters
+            -----------------
+            x : float
+                Reserve of the opposing token 
+            y : float
+                Reserve of the settled token       
+            L : float
+                Pool liquidity
+            itkn_amt: float
+                Token reserve amount to be priced in terms of liquidity                 
+
+            Returns
+            -----------------
+            lp_amount: float
+                Liquidity amount given reserve token amount
+        """  
+
         if(L == 0): 
-            return 0
+            return 0 if np.isscalar(itkn_amt) else np.zeros(np.shape(itkn_amt))
         else:
             gamma = 997
 
@@ -84,7 +112,7 @@ class SettlementLPToken():
         b = -fee*dPy*sqrtp_cur*itkn_amt + 1000*itkn_amt*(sqrtp_cur**2) + L*fee*dPy + 1000*L*dPx*(sqrtp_cur**2)
         c = -1000*L*itkn_amt*(sqrtp_cur**2)
     
-        return (-b + math.sqrt(b*b - 4*a*c)) / (2*a)  
+        return (-b + np.sqrt(b*b - 4*a*c)) / (2*a)  
 
     def get_reserves(self, lp, token_in):
         tokens = lp.factory.token_from_exchange[lp.name]
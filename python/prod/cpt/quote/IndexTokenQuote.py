@@ -3,6 +3,7 @@
 # Email: defipy.devs@gmail.com
 
 from .LPQuote import LPQuote
+from .QuoteCache import QUOTE_CACHE
 
 class IndexTokenQuote():
     
@@ -13,12 +14,15 @@ class IndexTokenQuote():
         -----------------
         quote_native_tokens : boolean
             Quote LP amount of base pool, otherwise quote indexed pool      
+        cache : QuoteCache
+            Memo of quotes on unchanged pools; shared QUOTE_CACHE by default
     """        
     
-    def __init__(self, lwr_tick = None, upr_tick = None, quote_native_tokens = True):
+    def __init__(self, lwr_tick = None, upr_tick = None, quote_native_tokens = True, cache = None):
         self.quote_native_tokens = quote_native_tokens    
         self.lwr_tick = lwr_tick
         self.upr_tick = upr_tick        
+        self.cache = QUOTE_CACHE if cache == None else cache
 
     def get_x(self, lp, amt_lp): 
         
@@ -39,14 +43,18 @@ class IndexTokenQuote():
                 Amount of x reserve from CPT pair     
         """          
         
+        key = ('index_x', self.quote_native_tokens, amt_lp, self.lwr_tick, self.upr_tick)
+        return self.cache.quote([lp], key, self._get_x, lp, amt_lp)
+        
+    def _get_x(self, lp, amt_lp):
         tkn_x = lp.factory.token_from_exchange[lp.name][lp.token0]  
         if(tkn_x.type == 'standard'):
-            x_amt = LPQuote(False).get_amount_from_lp(lp, tkn_x, amt_lp, self.lwr_tick, self.upr_tick)
+            x_amt = LPQuote(False, self.cache).get_amount_from_lp(lp, tkn_x, amt_lp, self.lwr_tick, self.upr_tick)
         else: 
             parent_x_tkn = tkn_x.parent_tkn
             parent_lp = self.get_base_lp(lp, tkn_x)
-            itkn_lp = LPQuote(False).get_amount_from_lp(lp, tkn_x, amt_lp)
-            x_amt = LPQuote(False).get_amount_from_lp(parent_lp, parent_x_tkn, itkn_lp, self.lwr_tick, self.upr_tick)        
+            itkn_lp = LPQuote(False, self.cache).get_amount_from_lp(lp, tkn_x, amt_lp)
+            x_amt = LPQuote(False, self.cache).get_amount_from_lp(parent_lp, parent_x_tkn, itkn_lp, self.lwr_tick, self.upr_tick)        
         return self.get_native_x(lp, tkn_x, x_amt) if self.quote_native_tokens else x_amt           
         
     def get_y(self, lp, amt_lp): 
@@ -68,14 +76,18 @@ class IndexTokenQuote():
                 Amount of y reserve from CPT pair     
         """        
     
+        key = ('index_y', self.quote_native_tokens, amt_lp, self.lwr_tick, self.upr_tick)
+        return self.cache.quote([lp], key, self._get_y, lp, amt_lp)
+        
+    def _get_y(self, lp, amt_lp):
         tkn_y = lp.factory.token_from_exchange[lp.name][lp.token1]  
         if(tkn_y.type == 'standard'):
-            y_amt = LPQuote(False).get_amount_from_lp(lp, tkn_y, amt_lp, self.lwr_tick, self.upr_tick)
+            y_amt = LPQuote(False, self.cache).get_amount_from_lp(lp, tkn_y, amt_lp, self.lwr_tick, self.upr_tick)
         else:           
             parent_y_tkn = tkn_y.parent_tkn
             parent_lp = self.get_base_lp(lp, tkn_y)
-            itkn_lp = LPQuote(False).get_amount_from_lp(lp, tkn_y, amt_lp, self.lwr_tick, self.upr_tick)
-            y_amt = LPQuote(False).get_amount_from_lp(parent_lp, parent_y_tkn, itkn_lp, self.lwr_tick, self.upr_tick)        
+            itkn_lp = LPQuote(False, self.cache).get_amount_from_lp(lp, tkn_y, amt_lp, self.lwr_tick, self.upr_tick)
+            y_amt = LPQuote(False, self.cache).get_amount_from_lp(parent_lp, parent_y_tkn, itkn_lp, self.lwr_tick, self.upr_tick)        
 
         return self.get_native_y(lp, tkn_y, y_amt) if self.quote_native_tokens else y_amt     
    
@@ -155,7 +167,7 @@ class IndexTokenQuote():
         parent_x_tkn = tkn_x.parent_tkn if tkn_x.type == 'index' else tkn_x
 
         if(parent_x_tkn.token_name != parent_lp_x_tkn.token_name):
-            x_amt = LPQuote().get_amount(parent_lp, parent_x_tkn, x_amt, self.lwr_tick, self.upr_tick) 
+            x_amt = LPQuote(cache = self.cache).get_amount(parent_lp, parent_x_tkn, x_amt, self.lwr_tick, self.upr_tick) 
 
         return x_amt
 
@@ -185,7 +197,7 @@ class IndexTokenQuote():
         parent_y_tkn = tkn_y.parent_tkn if tkn_y.type == 'index' else tkn_y
 
         if(parent_y_tkn.token_name != parent_lp_y_tkn.token_name):
-            y_amt = LPQuote().get_amount(parent_lp, parent_y_tkn, y_amt, self.lwr_tick, self.upr_tick) 
+            y_amt = LPQuote(cache = self.cache).get_amount(parent_lp, parent_y_tkn, y_amt, self.lwr_tick, self.upr_tick) 
 
         return y_amt
     
@@ -6,6 +6,7 @@ from ..index import RebaseIndexToken
 from ..index import SettlementLPToken
 from ...utils.data import UniswapExchangeData
 from ...utils.tools.v3 import UniV3Helper
+from .QuoteCache import QUOTE_CACHE
 
 class LPQuote():
     
@@ -16,11 +17,14 @@ class LPQuote():
         -----------------
         quote_opposing : boolean
             Quote the opposing token amount by default, given LP and a token    
+        cache : QuoteCache
+            Memo of quotes on unchanged pools; shared QUOTE_CACHE by default
     """      
     
-    def __init__(self, quote_opposing = True):
+    def __init__(self, quote_opposing = True, cache = None):
         self.quote_opposing = quote_opposing
         self.price_tkn = True
+        self.cache = QUOTE_CACHE if cache == None else cache
         
     def get_opposing_token(self, lp, tkn):
         
@@ -62,6 +66,12 @@ class LPQuote():
             reserve: float
                 Reserve amount from token asset     
         """             
+        
+        self._quote_index(lp, token)
+        key = ('reserve', token.token_name, lwr_tick, upr_tick)
+        return self.cache.quote([lp], key, self._get_reserve, lp, token, lwr_tick, upr_tick)
+        
+    def _get_reserve(self, lp, token, lwr_tick, upr_tick):
         if(lp.version == UniswapExchangeData.VERSION_V2):
             if(token.token_name == lp.token0):        
                 reserve_out = lp.reserve0 
@@ -69,7 +79,6 @@ class LPQuote():
                 reserve_out = lp.reserve1   
 
             if token.type == 'index':
-                self.quote_opposing = False
                 parent_lp = token.parent_lp
                 parent_token = token.parent_tkn
                 reserve_out = self.get_amount_from_lp(parent_lp, parent_token, reserve_out)  
@@ -81,7 +90,6 @@ class LPQuote():
             else:    
                 reserve_out = lp.get_virtual_reserve(token) 
                 if token.type == 'index':
-                    self.quote_opposing = False
                     parent_lp = token.parent_lp
                     parent_token = token.parent_tkn
                     p = parent_lp.get_price(parent_token)
@@ -110,6 +118,12 @@ class LPQuote():
                 Token price with respect to opposing token    
         """           
            
+        self._quote_index(lp, tkn)
+        self._quote_index(lp, self.get_opposing_token(lp, tkn))
+        key = ('price', tkn.token_name, self.price_tkn, lwr_tick, upr_tick)
+        return self.cache.quote([lp], key, self._get_price, lp, tkn, lwr_tick, upr_tick)
+        
+    def _get_price(self, lp, tkn, lwr_tick, upr_tick):
         opposing_tkn = self.get_opposing_token(lp, tkn)
 
         if(tkn.token_name == lp.token0):
@@ -182,6 +196,13 @@ class LPQuote():
         if (amount_in == 0):
             return 0
 
+        if not self.quote_opposing:
+            return amount_in
+
+        key = ('amount', tkn.token_name, amount_in, lwr_tick, upr_tick)
+        return self.cache.quote([lp], key, self._get_amount, lp, tkn, amount_in, lwr_tick, upr_tick)
+        
+    def _get_amount(self, lp, tkn, amount_in, lwr_tick, upr_tick):
         if(lp.version == UniswapExchangeData.VERSION_V2):
             if(tkn.token_name == lp.token0):
                 amt_out = lp.get_amount_out0(amount_in)
@@ -191,7 +212,7 @@ class LPQuote():
             quote_out = UniV3Helper().quote(lp, tkn, amount_in, lwr_tick, upr_tick)
             amt_out = quote_out[0]
     
-        return amt_out if self.quote_opposing else amount_in 
+        return amt_out 
     
     def get_amount_from_lp(self, lp, tkn, amount_lp_in, lwr_tick = None, upr_tick = None):
         
@@ -215,12 +236,16 @@ class LPQuote():
         """           
         
         if(amount_lp_in > 0):
-            itkn_amt = RebaseIndexToken().apply(lp, tkn, amount_lp_in, lwr_tick, upr_tick)
-            amt_out = self.get_amount(lp, tkn, itkn_amt, lwr_tick, upr_tick) if self.quote_opposing else itkn_amt
+            key = ('amount_from_lp', tkn.token_name, self.quote_opposing, amount_lp_in, lwr_tick, upr_tick)
+            amt_out = self.cache.quote([lp], key, self._get_amount_from_lp, lp, tkn, amount_lp_in, lwr_tick, upr_tick)
         else:
             amt_out = 0
         return amt_out   
     
+    def _get_amount_from_lp(self, lp, tkn, amount_lp_in, lwr_tick, upr_tick):
+        itkn_amt = RebaseIndexToken().apply(lp, tkn, amount_lp_in, lwr_tick, upr_tick)
+        return self.get_amount(lp, tkn, itkn_amt, lwr_tick, upr_tick) if self.quote_opposing else itkn_amt
+    
     
     def get_lp_from_amount(self, lp, tkn, amount_in, lwr_tick = None, upr_tick = None):
         
@@ -244,8 +269,14 @@ class LPQuote():
         """         
         
         if(amount_in > 0):
-            lp_amt = SettlementLPToken().apply(lp, tkn, amount_in, lwr_tick, upr_tick)
+            key = ('lp_from_amount', tkn.token_name, amount_in, lwr_tick, upr_tick)
+            lp_amt = self.cache.quote([lp], key, SettlementLPToken().apply, lp, tkn, amount_in, lwr_tick, upr_tick)
         else:
             lp_amt = 0
-        return lp_amt   
-         
\ No newline at end of file
+        return lp_amt
+
+    def _quote_index(self, lp, token):
+        # Index reserves are quoted in the parent token itself; kept outside of the cached
+        # quotes so a cache hit leaves the same quote_opposing as a recomputed quote
+        if token.type == 'index' and (lp.version == UniswapExchangeData.VERSION_V2 or lp.total_supply != 0):
+            self.quote_opposing = False
@@ -0,0 +1,181 @@
+# Copyright [2024] [Ian Moore]
+# Distributed under the MIT License (license terms are at http://opensource.org/licenses/MIT).
+# Email: defipy.devs@gmail.com
+
+import weakref
+from collections import OrderedDict
+
+DEFAULT_MAXSIZE = 4096
+
+class QuoteCache():
+
+    """ QuoteCache
+
+        Bounded LRU memo behind LPQuote, IndexTokenQuote and TreeAmountQuote. A quote is keyed on
+        the state version of every pool it can read (the quoted pool, its factory parent pool and
+        the parent pools of its index tokens, recursively) along with the quote arguments (token,
+        amount, ticks). Exchanges bump their state version on mint, burn and swap, so an entry can
+        only be hit while none of those pools has changed, and stale entries simply age out.
+        Pools are keyed on their id and only weakly referenced: once a pool is garbage collected,
+        the quotes which read it are evicted, so the cache never keeps a dropped pool alive (and
+        its id can not be reused while a quote still refers to it). Quotes on pools without a
+        state version, or with unhashable arguments (eg. arrays), are computed without the cache.
+
+        Parameters
+        -----------------
+        maxsize : int
+            Number of quotes kept, least recently used dropped first; 0 disables the cache
+    """
+
+    def __init__(self, maxsize = DEFAULT_MAXSIZE):
+        assert maxsize >= 0, 'QuoteCache: INVALID_SIZE'
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.pool_keys = {}
+        self.hits = 0
+        self.misses = 0
+
+    def quote(self, lps, key, fn, *args):
+
+        """ quote
+
+            Return the cached quote for key on the current state of the pools, or compute it
+            as fn(*args) and cache it
+
+            Parameters
+            -----------------
+            lps : list
+                Pools read by the quote; their parent pools are added
+            key : tuple
+                Quote name and arguments
+            fn : function
+                Computes the quote
+            args : tuple
+                Arguments of fn
+
+            Returns
+            -------
+            quote : float
+                Quote from fn
+        """
+
+        if self.maxsize == 0:
+            return fn(*args)
+        pools = self._pools(lps)
+        if pools == None:
+            return fn(*args)
+
+        key = (self._versions(pools),) + key
+        try:
+            quote = self.entries[key]
+        except KeyError:
+            pass
+        except TypeError:
+            return fn(*args)
+        else:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return quote
+
+        self.misses += 1
+        quote = fn(*args)
+        self.entries[key] = quote
+        for lp in pools.values():
+            self._track(lp, key)
+        if len(self.entries) > self.maxsize:
+            (old_key, _) = self.entries.popitem(last = False)
+            self._untrack(old_key)
+        return quote
+
+    def versions(self, lps):
+
+        """ versions
+
+            State versions of the pools a quote can read
+
+            Parameters
+            -----------------
+            lps : list
+                Pools read by the quote; their parent pools are added
+
+            Returns
+            -------
+            versions : tuple
+                (pool id, state version) pairs, or None if a pool has no state version
+        """
+
+        pools = self._pools(lps)
+        return None if pools == None else self._versions(pools)
+
+    def clear(self):
+
+        """ clear
+
+            Drop every cached quote and reset the counters
+        """
+
+        self.entries.clear()
+        self.pool_keys.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def info(self):
+
+        """ info
+
+            Cache statistics
+
+            Returns
+            -------
+            info : dict
+                hits, misses, size and maxsize
+        """
+
+        return {'hits' : self.hits, 'misses' : self.misses,
+                'size' : len(self.entries), 'maxsize' : self.maxsize}
+
+    def _pools(self, lps):
+        # Pools read by a quote, by id: the pools themselves, their factory parent pools and the
+        # parent pools of their index tokens, recursively; None if a pool has no state version
+        pools = {}
+        stack = list(lps)
+        while stack:
+            lp = stack.pop()
+            if lp == None or id(lp) in pools:
+                continue
+            if getattr(lp, 'state_version', None) == None:
+                return None
+            pools[id(lp)] = lp
+            stack.append(lp.factory.parent_lp)
+            for tkn in lp.factory.token_from_exchange[lp.name].values():
+                if tkn.type == 'index':
+                    stack.append(tkn.parent_lp)
+        return pools
+
+    def _versions(self, pools):
+        return tuple((pool_id, lp.state_version) for (pool_id, lp) in pools.items())
+
+    def _track(self, lp, key):
+        pool_id = id(lp)
+        if pool_id not in self.pool_keys:
+            # The callback runs before the id of a collected pool can be reused
+            ref = weakref.ref(lp, lambda ref, pool_id = pool_id: self._evict(pool_id))
+            self.pool_keys[pool_id] = (ref, set())
+        self.pool_keys[pool_id][1].add(key)
+
+    def _untrack(self, key):
+        for (pool_id, _) in key[0]:
+            tracked = self.pool_keys.get(pool_id)
+            if tracked != None:
+                tracked[1].discard(key)
+                if not tracked[1]:
+                    del self.pool_keys[pool_id]
+
+    def _evict(self, pool_id):
+        (_, keys) = self.pool_keys.pop(pool_id, (None, ()))
+        for key in list(keys):
+            self.entries.pop(key, None)
+            self._untrack(key)
+
+# Shared by the quote classes unless they are given their own cache
+QUOTE_CACHE = QuoteCache()
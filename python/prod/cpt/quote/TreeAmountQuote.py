@@ -4,23 +4,33 @@
 
 from ..index import RebaseIndexToken
 from .LPQuote import LPQuote
+from .QuoteCache import QUOTE_CACHE
 import math
 
 class TreeAmountQuote():
     
-    def __init__(self, lwr_tick = None, upr_tick = None, quote_native_token = True, exchg_price = 1):
+    def __init__(self, lwr_tick = None, upr_tick = None, quote_native_token = True, exchg_price = 1, cache = None):
         self.exchg_price = exchg_price if exchg_price != 1 else exchg_price
         self.quote_native_token = quote_native_token 
         self.lwr_tick = lwr_tick
         self.upr_tick = upr_tick
+        self.cache = QUOTE_CACHE if cache == None else cache
 
     def get_tot_x(self, lp, amt0, amt1):
+        key = ('tot_x', self.quote_native_token, amt0, amt1, self.lwr_tick, self.upr_tick)
+        return self.cache.quote([lp], key, self._get_tot_x, lp, amt0, amt1)
+
+    def _get_tot_x(self, lp, amt0, amt1):
         tkn_x = lp.factory.token_from_exchange[lp.name][lp.token0]
         tkn_y = lp.factory.token_from_exchange[lp.name][lp.token1]
         amt_in_x =  self.get_x(lp, tkn_x, amt0) + self.get_x(lp, tkn_y, amt1)
         return self.get_native_x(lp, tkn_x, amt_in_x) if self.quote_native_token else amt_in_x
 
     def get_tot_y(self, lp, amt0, amt1):
+        key = ('tot_y', self.quote_native_token, amt0, amt1, self.lwr_tick, self.upr_tick)
+        return self.cache.quote([lp], key, self._get_tot_y, lp, amt0, amt1)
+
+    def _get_tot_y(self, lp, amt0, amt1):
         tkn_x = lp.factory.token_from_exchange[lp.name][lp.token0]
         tkn_y = lp.factory.token_from_exchange[lp.name][lp.token1]
         amt_in_y = self.get_y(lp, tkn_x, amt0) + self.get_y(lp, tkn_y, amt1)
@@ -31,10 +41,10 @@ class TreeAmountQuote():
         if(tkn.type == 'standard'):
             x_tkn = self.base_x_asset_nm(lp) == tkn.token_name
             base_lp = self.get_base_lp(lp, tkn)
-            amt_in_x = LPQuote(not x_tkn).get_amount(base_lp, tkn, amt)
+            amt_in_x = LPQuote(not x_tkn, self.cache).get_amount(base_lp, tkn, amt)
         elif(tkn.type == 'index'):
             x_tkn = self.base_x_asset_nm(lp) == tkn.parent_tkn.token_name
-            amt_in_x = LPQuote(not x_tkn).get_amount_from_lp(tkn.parent_lp, tkn.parent_tkn, amt, self.lwr_tick, self.upr_tick)
+            amt_in_x = LPQuote(not x_tkn, self.cache).get_amount_from_lp(tkn.parent_lp, tkn.parent_tkn, amt, self.lwr_tick, self.upr_tick)
 
         return amt_in_x
 
@@ -43,10 +53,10 @@ class TreeAmountQuote():
         if(tkn.type == 'standard'):
             y_tkn = self.base_y_asset_nm(lp) == tkn.token_name
             base_lp = self.get_base_lp(lp, tkn)
-            amt_in_y = LPQuote(not y_tkn).get_amount(base_lp, tkn, amt, self.lwr_tick, self.upr_tick)
+            amt_in_y = LPQuote(not y_tkn, self.cache).get_amount(base_lp, tkn, amt, self.lwr_tick, self.upr_tick)
         elif(tkn.type == 'index'):
             y_tkn = self.base_y_asset_nm(lp) == tkn.parent_tkn.token_name
-            amt_in_y = LPQuote(not y_tkn).get_amount_from_lp(tkn.parent_lp, tkn.parent_tkn, amt, self.lwr_tick, self.upr_tick)
+            amt_in_y = LPQuote(not y_tkn, self.cache).get_amount_from_lp(tkn.parent_lp, tkn.parent_tkn, amt, self.lwr_tick, self.upr_tick)
             
         return amt_in_y  
     
@@ -56,7 +66,7 @@ class TreeAmountQuote():
         parent_x_tkn = tkn_x.parent_tkn if tkn_x.type == 'index' else tkn_x
 
         if(parent_x_tkn.token_name != parent_lp_x_tkn.token_name):
-            x_amt = LPQuote().get_amount(parent_lp, parent_x_tkn, x_am, self.lwr_tick, self.upr_tickt) 
+            x_amt = LPQuote(cache = self.cache).get_amount(parent_lp, parent_x_tkn, x_am, self.lwr_tick, self.upr_tickt) 
 
         return x_amt
 
@@ -66,7 +76,7 @@ class TreeAmountQuote():
         parent_y_tkn = tkn_y.parent_tkn if tkn_y.type == 'index' else tkn_y
 
         if(parent_y_tkn.token_name != parent_lp_y_tkn.token_name):
-            y_amt = LPQuote().get_amount(parent_lp, parent_y_tkn, y_amt, self.lwr_tick, self.upr_tick) 
+            y_amt = LPQuote(cache = self.cache).get_amount(parent_lp, parent_y_tkn, y_amt, self.lwr_tick, self.upr_tick) 
 
         return y_amt    
     
@@ -1,4 +1,5 @@
 from .LPQuote import LPQuote
 from .LPTokenQuote import LPTokenQuote
 from .TreeAmountQuote import TreeAmountQuote
-from .IndexTokenQuote import IndexTokenQuote
\ No newline at end of file
+from .IndexTokenQuote import IndexTokenQuote
+from .QuoteCache import QuoteCache
@@ -173,12 +173,12 @@ class IndexVault(Vault):
                 LP token
             token : ERC20
                 parent pairing token                
-            liq : float
-                amount of LP to be burned   
+            liq : float or list
+                amount of LP to be burned, or amounts priced at once   
                 
             Returns
             -------
-            amt : float
+            amt : float or np.array
                 amount of specified token from pairing                 
         """          
         amt = RebaseIndexToken().apply(lp_tkn, token, liq, lwr_tick, upr_tick)
@@ -203,7 +203,7 @@ class IndexVault(Vault):
         
         return token.__class__.__name__   
     
-    def update_accounts(self, lp_tkn, tkn, lwr_tick, upr_tick): 
+    def update_accounts(self, lp_tkn, tkn, lwr_tick = None, upr_tick = None): 
 
         """ update_accounts
 
@@ -228,13 +228,17 @@ class IndexVault(Vault):
         
         self.update_index_tkn(lp_tkn, tkn, lwr_tick, upr_tick)
         
-        new_total = 0
         tkn_nm = tkn.token_name
-        for account in self.lp_providers:
-            amt = self.lp_providers[account][exchange]['amount']
-            exch_tkn = lp_tkn.factory.token_from_exchange[lp_tkn.name][tkn_nm]
-            self.lp_providers[account][index_tokens[tkn_nm]] = {}
-            self.lp_providers[account][index_tokens[tkn_nm]]['amount'] = self.get_tkn_pair_amount(lp_tkn, exch_tkn, amt, lwr_tick, upr_tick)             
+        exch_tkn = lp_tkn.factory.token_from_exchange[lp_tkn.name][tkn_nm]
+        accounts = list(self.lp_providers)
+        if len(accounts) == 0:
+            return
+
+        # One rebase over the LP amounts of all accounts, against the same pool state
+        amts = [self.lp_providers[account][exchange]['amount'] for account in accounts]
+        tkn_amts = self.get_tkn_pair_amount(lp_tkn, exch_tkn, amts, lwr_tick, upr_tick).tolist()
+        for (account, tkn_amt) in zip(accounts, tkn_amts):
+            self.lp_providers[account][index_tokens[tkn_nm]] = {'amount' : tkn_amt}
                   
     def update_account(self, lp_tkn, tkn, _from): 
         
@@ -354,8 +358,9 @@ class IndexVault(Vault):
         if mint_tkn_name in self.index_tokens:  
             liq = self.lp_tokens[lp_token.token_name]['total_amount']
             last_liq = self.lp_tokens[lp_token.token_name]['last_deposit']
-            self.index_tokens[mint_tkn_name]['total'] = self.get_tkn_pair_amount(lp_token, token, liq, lwr_tick, upr_tick)  
-            self.index_tokens[mint_tkn_name]['last_deposit'] = self.get_tkn_pair_amount(lp_token, token, last_liq, lwr_tick, upr_tick)  
+            (total, last_deposit) = self.get_tkn_pair_amount(lp_token, token, [liq, last_liq], lwr_tick, upr_tick).tolist()
+            self.index_tokens[mint_tkn_name]['total'] = total  
+            self.index_tokens[mint_tkn_name]['last_deposit'] = last_deposit  
             self.index_tokens[mint_tkn_name]['total_lp'] = liq  
             self.index_tokens[mint_tkn_name]['last_lp_deposit'] = last_liq             
             
@@ -3,6 +3,7 @@
 # Email: defipy.devs@gmail.com
 
 import math
+import numpy as np
 from scipy import optimize
 from ..Process import Process
 from ..liquidity import AddLiquidity
@@ -13,6 +14,8 @@ from ...utils.data import UniswapExchangeData
 from ...utils.tools.v3 import UniV3Helper
 from ...utils.tools.v3 import TickMath
 
+GAMMA = 997/1000
+
 class SwapDeposit(Process):
     
     """ Process to swap approx. half of single token X for token Y (and vice verse) and deposit proceeds
@@ -61,45 +64,46 @@ class SwapDeposit(Process):
         amount_in = tDel.delta() if amount_in == None else amount_in    
         trading_token = self.get_trading_token(lp, token_in)
 
-        # Step 2: deposit   
-        if(lp.version == UniswapExchangeData.VERSION_V2):
+        with lp.transaction():
+            # Step 2: deposit   
+            if(lp.version == UniswapExchangeData.VERSION_V2):
 
-            # Step 1: swap 
-            p_in = self._calc_univ2_deposit_portion(lp, token_in, amount_in)
-            amount_out = Swap().apply(lp, token_in, user_nm, p_in*amount_in)
+                # Step 1: swap 
+                p_in = self._calc_univ2_deposit_portion(lp, token_in, amount_in)
+                amount_out = Swap().apply(lp, token_in, user_nm, p_in*amount_in)
 
-            # Step 2: deposit   
-            if(token_in.token_name == lp.token1):
-                balance0 = amount_out 
-                balance1 = lp.quote(balance0, lp.reserve0, lp.reserve1)
-                deposited = balance1 + p_in*amount_in
-            elif(token_in.token_name == lp.token0):
-                balance1 = amount_out
-                balance0 = lp.quote(balance1, lp.reserve1, lp.reserve0)
-                deposited = balance0 + p_in*amount_in
-            lp.add_liquidity(user_nm, balance0, balance1, balance0, balance1) 
+                # Step 2: deposit   
+                if(token_in.token_name == lp.token1):
+                    balance0 = amount_out 
+                    balance1 = lp.quote(balance0, lp.reserve0, lp.reserve1)
+                    deposited = balance1 + p_in*amount_in
+                elif(token_in.token_name == lp.token0):
+                    balance1 = amount_out
+                    balance0 = lp.quote(balance1, lp.reserve1, lp.reserve0)
+                    deposited = balance0 + p_in*amount_in
+                lp.add_liquidity(user_nm, balance0, balance1, balance0, balance1) 
             
-        elif(lp.version == UniswapExchangeData.VERSION_V3):  
+            elif(lp.version == UniswapExchangeData.VERSION_V3):  
 
-            # Step 1: swap 
-            p_in = self._calc_univ3_deposit_portion(lp, token_in, amount_in, lwr_tick, upr_tick)
-            amount_out = Swap().apply(lp, token_in, user_nm, p_in*amount_in)
+                # Step 1: swap 
+                p_in = self._calc_univ3_deposit_portion(lp, token_in, amount_in, lwr_tick, upr_tick)
+                amount_out = Swap().apply(lp, token_in, user_nm, p_in*amount_in)
             
-            sqrt_P = lp.slot0.sqrtPriceX96/2**96
-            tokens = lp.factory.token_from_exchange[lp.name] 
+                sqrt_P = lp.slot0.sqrtPriceX96/2**96
+                tokens = lp.factory.token_from_exchange[lp.name] 
 
-            # Step 2: deposit 
-            if(token_in.token_name == lp.token0):
-                balance1 = abs(amount_out) 
-                liq = UniV3Helper().calc_Ly(sqrt_P, balance1, lwr_tick, upr_tick)
-                deposited = liq/sqrt_P + p_in*amount_in
+                # Step 2: deposit 
+                if(token_in.token_name == lp.token0):
+                    balance1 = abs(amount_out) 
+                    liq = UniV3Helper().calc_Ly(sqrt_P, balance1, lwr_tick, upr_tick)
+                    deposited = liq/sqrt_P + p_in*amount_in
                                 
-            elif(token_in.token_name == lp.token1): 
-                balance0 = abs(amount_out) 
-                liq = UniV3Helper().calc_Lx(sqrt_P, balance0, lwr_tick, upr_tick)
-                deposited = liq*sqrt_P + p_in*amount_in
+                elif(token_in.token_name == lp.token1): 
+                    balance0 = abs(amount_out) 
+                    liq = UniV3Helper().calc_Lx(sqrt_P, balance0, lwr_tick, upr_tick)
+                    deposited = liq*sqrt_P + p_in*amount_in
                 
-            lp.mint(user_nm, lwr_tick, upr_tick, liq)  
+                lp.mint(user_nm, lwr_tick, upr_tick, liq)  
                             
         return deposited  
 
@@ -127,7 +131,74 @@ class SwapDeposit(Process):
         return trading_token       
 
 
+    def calc_univ3_deposit_portions(self, lp, token_in, amts_in, lwr_ticks, upr_ticks):
+
+        """ calc_univ3_deposit_portions
+
+            Portions of each amount of token_in to swap before depositing the proceeds plus the 
+            remainder in a V3 position. Within the active liquidity range the portion is the root of 
+            a quadratic in the sqrt price reached by the swap, solved for all deposits at once; 
+            deposits whose swap would cross an initialized tick, or whose position is not in range, 
+            fall back to the Nelder-Mead search. The pool is not updated.
+                
+            Parameters
+            -------
+            lp : UniswapV3Exchange
+                LP exchange
+            token_in : ERC20
+                specified ERC20 token               
+            amts_in : np.array
+                token amounts to be deposited
+            lwr_ticks : np.array
+                lower ticks of the positions
+            upr_ticks : np.array
+                upper ticks of the positions
+                
+            Returns
+            -------
+            portions : np.array
+                portions of amts_in to be swapped                
+        """  
+
+        amts_in = np.asarray(amts_in, dtype=float)
+        lwr_ticks = np.broadcast_to(lwr_ticks, amts_in.shape)
+        upr_ticks = np.broadcast_to(upr_ticks, amts_in.shape)
+        sqrtp_pa = np.array([TickMath.getSqrtRatioAtTick(int(tick))/2**96 for tick in lwr_ticks.ravel()])
+        sqrtp_pb = np.array([TickMath.getSqrtRatioAtTick(int(tick))/2**96 for tick in upr_ticks.ravel()])
+        sqrtp_pa = sqrtp_pa.reshape(amts_in.shape)
+        sqrtp_pb = sqrtp_pb.reshape(amts_in.shape)
+        sqrtp_cur = lp.slot0.sqrtPriceX96/2**96
+        L = lp.get_liquidity()
+
+        # A token0 deposit moves the price down: solve it in the frame of 1/sqrt price, where it 
+        # moves up like a token1 deposit, with the bounds of the position swapped
+        zero_for_one = token_in.token_name == lp.token0
+        (next_tick, _) = lp.nextTick(lp.slot0.tick, zero_for_one)
+        sqrtp_next = TickMath.getSqrtRatioAtTick(next_tick)/2**96
+        if zero_for_one:
+            (sqrtp_cur, sqrtp_next) = (1/sqrtp_cur, 1/sqrtp_next)
+            (sqrtp_pa, sqrtp_pb) = (1/sqrtp_pb, 1/sqrtp_pa)
+        
+        # alpha*amt_in swapped in moves the sqrt price to u = sqrtp_cur + GAMMA*alpha*amt_in/L; the
+        # swap proceeds and the remainder fill the position at u when
+        # a*u^2 + b*u + c = 0, taking the root in (sqrtp_cur, sqrtp_pb)
+        (s, sa, sb) = (sqrtp_cur, sqrtp_pa, sqrtp_pb)
+        a = L*(GAMMA*sb - s)
+        b = GAMMA*s*amts_in + L*s*sb + L*s**2 - GAMMA*L*sb*(sa + s)
+        c = s*sb*(GAMMA*L*sa - GAMMA*amts_in - L*s)
+        u = 2*c/(-b - np.sqrt(b*b - 4*a*c))
+        portions = L*(u - s)/(GAMMA*amts_in)
+
+        fallback = ~((sa < s) & (s < sb) & (u < sqrtp_next) & (0 < portions) & (portions < 1))
+        for k in zip(*np.nonzero(fallback)):
+            portions[k] = self._calc_univ3_deposit_portion_opt(lp, token_in, amts_in[k], 
+                                                               int(lwr_ticks[k]), int(upr_ticks[k]))
+        return portions
+
     def _calc_univ3_deposit_portion(self, lp, tkn, amt_tkn_in, lwr_tick, upr_tick):
+        return self.calc_univ3_deposit_portions(lp, tkn, [amt_tkn_in], [lwr_tick], [upr_tick])[0]
+
+    def _calc_univ3_deposit_portion_opt(self, lp, tkn, amt_tkn_in, lwr_tick, upr_tick):
         bnds = [(0.35, 0.65)]
         opt_tol = 1e-8
         res = optimize.minimize(self._obj_func, x0 = 0.5, bounds=bnds, 
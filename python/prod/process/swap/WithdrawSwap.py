@@ -9,8 +9,11 @@ from ...math.model import TokenDeltaModel
 from ...math.model import EventSelectionModel
 from ...utils.data import UniswapExchangeData
 from ...cpt.index import SettlementLPToken
+import numpy as np
 import math
 
+GAMMA = 997/1000
+
 class WithdrawSwap(Process):
     
     """ Process to withdraw liquidity from LP and swap opposing token which is added to specifed token to receive         
@@ -59,30 +62,31 @@ class WithdrawSwap(Process):
         amount_out = tDel.delta() if amount_out == None else amount_out
     
         
-        if(lp.version == UniswapExchangeData.VERSION_V2):
-            # Step 1: withdrawal
-            p_out = self._calc_withdraw_portion(lp, token_out, amount_out, lwr_tick, upr_tick)
-            removeLiq = RemoveLiquidity()
-            res = removeLiq.apply(lp, token_out, user_nm, p_out*amount_out)
+        with lp.transaction():
+            if(lp.version == UniswapExchangeData.VERSION_V2):
+                # Step 1: withdrawal
+                p_out = self._calc_withdraw_portion(lp, token_out, amount_out, lwr_tick, upr_tick)
+                removeLiq = RemoveLiquidity()
+                res = removeLiq.apply(lp, token_out, user_nm, p_out*amount_out)
     
-            # Step 2: swap
-            trading_token = self.get_trading_token(lp, token_out)
-            out = Swap().apply(lp, trading_token, user_nm, res[trading_token.token_name])  
-            withdrawn = out + p_out*amount_out 
-            #withdrawn = p_out*amount_out 
+                # Step 2: swap
+                trading_token = self.get_trading_token(lp, token_out)
+                out = Swap().apply(lp, trading_token, user_nm, res[trading_token.token_name])  
+                withdrawn = out + p_out*amount_out 
+                #withdrawn = p_out*amount_out 
 
-        elif(lp.version == UniswapExchangeData.VERSION_V3): 
+            elif(lp.version == UniswapExchangeData.VERSION_V3): 
 
-            p_out = self._calc_withdraw_portion(lp, token_out, amount_out, lwr_tick, upr_tick)
+                p_out = self._calc_withdraw_portion(lp, token_out, amount_out, lwr_tick, upr_tick)
             
-             # Step 1: withdrawal
-            removeLiq = RemoveLiquidity()
-            res = removeLiq.apply(lp, token_out, user_nm, p_out*amount_out, lwr_tick, upr_tick)
+                 # Step 1: withdrawal
+                removeLiq = RemoveLiquidity()
+                res = removeLiq.apply(lp, token_out, user_nm, p_out*amount_out, lwr_tick, upr_tick)
         
-            # Step 2: swap
-            trading_token = self.get_trading_token(lp, token_out)
-            out = Swap().apply(lp, trading_token, user_nm, res[trading_token.token_name]) 
-            withdrawn = abs(out)  + p_out*amount_out 
+                # Step 2: swap
+                trading_token = self.get_trading_token(lp, token_out)
+                out = Swap().apply(lp, trading_token, user_nm, res[trading_token.token_name]) 
+                withdrawn = abs(out)  + p_out*amount_out 
 
         return withdrawn 
 
@@ -110,16 +114,111 @@ class WithdrawSwap(Process):
         trading_token = tokens[lp.token1] if token.token_name == lp.token0 else tokens[lp.token0]
         return trading_token        
  
+    def apply_batch(self, lp, token_out, user_nm, amounts_out, lwr_tick = None, upr_tick = None):    
+        
+        """ apply_batch
+
+            Apply several withdrawals of token_out in order, as successive calls to apply within one 
+            transaction (if one fails, none is applied). For a V2 pool the token lookups are done 
+            once and each withdrawal reads the reserves and liquidity straight from the pool.
+                
+            Parameters
+            -------
+            lp : Exchange
+                LP exchange
+            token_out : ERC20
+                specified ERC20 token               
+            user_nm : str
+                account name
+            amounts_out : np.array
+                token amounts to be withdrawn, in order
+            lwr_tick : int
+                lower tick of the position in which to add liquidity   
+            upr_tick : int
+                upper tick of the position in which to add liquidity                 
+                
+            Returns
+            -------
+            withdrawn : np.array
+                amounts of withdrawn token               
+        """          
+        
+        withdrawn = np.zeros(len(amounts_out))
+        with lp.transaction():
+            if(lp.version == UniswapExchangeData.VERSION_V2):
+                trading_token = self.get_trading_token(lp, token_out)
+                settlement = SettlementLPToken()
+                out_is_token0 = token_out.token_name == lp.token0
+                for k, amount_out in enumerate(amounts_out):
+                    (res0, res1, tot_liq) = (lp.reserve0, lp.reserve1, lp.total_supply)
+                    (x, y) = (res1, res0) if out_is_token0 else (res0, res1)
+                    
+                    # Step 1: withdrawal, as RemoveLiquidity
+                    dL = settlement.calc_univ2_settlement(x, y, tot_liq, amount_out)
+                    p_out = dL*y/tot_liq/amount_out
+                    amount_in = p_out*amount_out
+                    liq = amount_in*tot_liq/y
+                    if(out_is_token0):
+                        (_, amount_trade) = lp.remove_liquidity(user_nm, liq, amount_in, liq*res1/tot_liq)
+                    else:
+                        (amount_trade, _) = lp.remove_liquidity(user_nm, liq, liq*res0/tot_liq, amount_in)
+                    
+                    # Step 2: swap, as Swap
+                    amount_min = math.floor(lp.get_amount_out(amount_trade, trading_token))
+                    out = lp.swap_exact_tokens_for_tokens(amount_trade, amount_min, trading_token, to_addr=user_nm)
+                    withdrawn[k] = out + p_out*amount_out
+            else:
+                for k, amount_out in enumerate(amounts_out):
+                    withdrawn[k] = self.apply(lp, token_out, user_nm, amount_out, lwr_tick, upr_tick)
+        return withdrawn
+
+    def calc_withdraw_portions(self, lp, token_out, amounts_out, lwr_tick = None, upr_tick = None):
+
+        """ calc_withdraw_portions
+
+            Portions of each amount of token_out withdrawn as liquidity (the rest comes from swapping 
+            the opposing token withdrawn alongside), and the single token output expected from each 
+            withdrawal, all against the current pool state. The pool is not updated.
+                
+            Parameters
+            -------
+            lp : Exchange
+                LP exchange
+            token_out : ERC20
+                specified ERC20 token               
+            amounts_out : np.array
+                token amounts to be withdrawn
+            lwr_tick : int
+                lower tick of the position   
+            upr_tick : int
+                upper tick of the position                 
+                
+            Returns
+            -------
+            portions : np.array
+                portions of amounts_out withdrawn as liquidity
+            expected : np.array
+                expected amounts of withdrawn token               
+        """  
+
+        amounts_out = np.asarray(amounts_out, dtype=float)
+        (x, y) = self._get_reserves(lp, token_out)
+        L = lp.get_liquidity()
+
+        dL = SettlementLPToken().apply(lp, token_out, amounts_out, lwr_tick, upr_tick)
+        dx = dL*x/L
+        dy = dL*y/L
+        aswap = (GAMMA*dx)*(y-dy)/(x-dx+GAMMA*dx)
+
+        return dy/amounts_out, dy + aswap
+
     def _calc_withdraw_portion(self, lp, token_in, amt, lwr_tick, upr_tick):
 
         (x, y) = self._get_reserves(lp, token_in)
         L = lp.get_liquidity()
-        gamma = 997/1000
 
         dL = SettlementLPToken().apply(lp, token_in, amt, lwr_tick, upr_tick)
-        dx = dL*x/L
         dy = dL*y/L
-        aswap = (gamma*dx)*(y-dy)/(x-dx+gamma*dx)
 
         return dy/amt 
 
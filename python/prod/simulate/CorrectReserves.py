@@ -11,6 +11,8 @@ import numpy as np
 X0 = 1
 FAC = 1
 MAX_ATTEMPTS = 5
+# Deltas below this fraction of the x reserve are float noise: the pool is already at the price
+DELTA_TOL = 1e-12
 USER_NM = 'reserve_correction'
 
 class CorrectReserves:
@@ -27,11 +29,14 @@ class CorrectReserves:
             Initial market price at the beginning of the simulation 
         fac : float
             scipy.fsolve parameter for non-linear solver found in SolveDeltas class
+        method : str
+            SolveDeltas method, closed form SolveDeltas.ANALYTIC (default) or SolveDeltas.FSOLVE; 
+            x0 and fac only apply to FSOLVE
     """             
     
-    def __init__(self, lp, x0 = None, fac = None):
+    def __init__(self, lp, x0 = None, fac = None, method = None):
         self.lp = lp
-        self.sDel = SolveDeltas(lp)
+        self.sDel = SolveDeltas(lp, method)
         self.x0 = X0 if x0 == None else int(x0)
         self.fac = FAC if fac == None else fac
         self.swap_dx = 0
@@ -126,22 +131,25 @@ class CorrectReserves:
         tkn_x = self.get_x_tkn()
         tkn_y = self.get_y_tkn()
         self.swap_dx, self.swap_dy = self.sDel.calc(p, self.x0, self.fac)
+        if(abs(self.swap_dx) <= DELTA_TOL*self.sDel.x):
+            return
 
-        if(self.lp.version == UniswapExchangeData.VERSION_V2):
-            if(self.swap_dx >= 0):
-                expected_amount_dep = SwapDeposit().apply(self.lp, tkn_x, self.user_nm, abs(self.swap_dx))
-                expected_amount_out = WithdrawSwap().apply(self.lp, tkn_y, self.user_nm, abs(self.swap_dy))
-            elif(self.swap_dy >= 0):
-                expected_amount_dep = SwapDeposit().apply(self.lp, tkn_y, self.user_nm, abs(self.swap_dy))
-                expected_amount_out = WithdrawSwap().apply(self.lp, tkn_x, self.user_nm, abs(self.swap_dx)) 
+        with self.lp.transaction():
+            if(self.lp.version == UniswapExchangeData.VERSION_V2):
+                if(self.swap_dx >= 0):
+                    expected_amount_dep = SwapDeposit().apply(self.lp, tkn_x, self.user_nm, abs(self.swap_dx))
+                    expected_amount_out = WithdrawSwap().apply(self.lp, tkn_y, self.user_nm, abs(self.swap_dy))
+                elif(self.swap_dy >= 0):
+                    expected_amount_dep = SwapDeposit().apply(self.lp, tkn_y, self.user_nm, abs(self.swap_dy))
+                    expected_amount_out = WithdrawSwap().apply(self.lp, tkn_x, self.user_nm, abs(self.swap_dx)) 
                
-        elif(self.lp.version == UniswapExchangeData.VERSION_V3):
-            if(self.swap_dx >= 0):
-                expected_amount_dep = SwapDeposit().apply(self.lp, tkn_x, self.user_nm, abs(self.swap_dx), lwr_tick, upr_tick)
-                expected_amount_out = WithdrawSwap().apply(self.lp, tkn_y, self.user_nm, abs(self.swap_dy), lwr_tick, upr_tick)
-            elif(self.swap_dy >= 0):
-                expected_amount_dep = SwapDeposit().apply(self.lp, tkn_y, self.user_nm, abs(self.swap_dy), lwr_tick, upr_tick)
-                expected_amount_out = WithdrawSwap().apply(self.lp, tkn_x, self.user_nm, abs(self.swap_dx), lwr_tick, upr_tick)
+            elif(self.lp.version == UniswapExchangeData.VERSION_V3):
+                if(self.swap_dx >= 0):
+                    expected_amount_dep = SwapDeposit().apply(self.lp, tkn_x, self.user_nm, abs(self.swap_dx), lwr_tick, upr_tick)
+                    expected_amount_out = WithdrawSwap().apply(self.lp, tkn_y, self.user_nm, abs(self.swap_dy), lwr_tick, upr_tick)
+                elif(self.swap_dy >= 0):
+                    expected_amount_dep = SwapDeposit().apply(self.lp, tkn_y, self.user_nm, abs(self.swap_dy), lwr_tick, upr_tick)
+                    expected_amount_out = WithdrawSwap().apply(self.lp, tkn_x, self.user_nm, abs(self.swap_dx), lwr_tick, upr_tick)
 
 
     def get_ticks(self, tkn_x):
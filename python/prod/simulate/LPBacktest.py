@@ -0,0 +1,103 @@
+# Copyright [2024] [Ian Moore]
+# Distributed under the MIT License (license terms are at http://opensource.org/licenses/MIT).
+# Email: defipy.devs@gmail.com
+
+import numpy as np
+
+GAMMA = 997/1000
+
+class LPBacktest:
+
+    """
+        Closed-form backtest of a V2 (constant product) pool along external price paths. At every
+        step an arbitrageur trades the pool to the edge of its no-arbitrage band, ie. until the
+        marginal price of the next swap, net of the 0.3% fee, equals the external price; inside
+        the band there is no trade. That single optimal swap has a closed form (a quadratic in the
+        amount in, with the fee kept in the reserves as in UniswapExchange.swap), so a whole path,
+        or a matrix of paths, is backtested with NumPy array operations and no pool updates or
+        solver calls.
+
+        Parameters
+        -----------------
+        lp : UniswapExchange
+            V2 pool whose current reserves start every path; the pool itself is not changed
+    """
+
+    def __init__(self, lp):
+        self.reserve0 = float(lp.reserve0)
+        self.reserve1 = float(lp.reserve1)
+        assert self.reserve0 > 0 and self.reserve1 > 0, 'LPBacktest: NO_LIQUIDITY'
+
+    def run(self, p_paths):
+
+        """ run
+
+            Backtest price paths; the arbitrage swap is applied at every price of a path,
+            including the first
+
+            Parameters
+            -----------------
+            p_paths : np.array
+                Price path of token0 in token1 of shape (T,), or matrix of N paths of shape (N, T)
+
+            Returns
+            -----------------
+            backtest : dict
+                Arrays of the shape of p_paths, at each step after the arbitrage swap: reserve0,
+                reserve1, value (pool value in token1 at the external price), fee0 and fee1 (swap
+                fee paid at the step) and il (impermanent loss, pool value over the value of
+                holding the initial reserves, minus 1; fees included)
+        """
+
+        p_paths = np.asarray(p_paths, dtype=float)
+        assert np.all(p_paths > 0), 'LPBacktest: INVALID_PRICE'
+        prices = np.atleast_2d(p_paths)
+        (n_paths, n_steps) = prices.shape
+
+        x = np.full(n_paths, self.reserve0)
+        y = np.full(n_paths, self.reserve1)
+        reserve0 = np.empty((n_paths, n_steps))
+        reserve1 = np.empty((n_paths, n_steps))
+        fee0 = np.zeros((n_paths, n_steps))
+        fee1 = np.zeros((n_paths, n_steps))
+
+        for t in range(n_steps):
+            p = prices[:, t]
+
+            # Pool overprices token0: sell dx of token0 until GAMMA*y'/x' = p, where x' = x + dx
+            # and y' = xy/(x + GAMMA*dx), ie. p*GAMMA*dx^2 + p*x*(1 + GAMMA)*dx + p*x^2 - GAMMA*x*y = 0
+            sell0 = p*x < GAMMA*y
+            if np.any(sell0):
+                (xs, ys, ps) = (x[sell0], y[sell0], p[sell0])
+                disc = np.sqrt((ps*(1 - GAMMA))**2 + 4*ps*GAMMA**2*ys/xs)
+                dx = xs*(disc - (1 + GAMMA)*ps)/(2*GAMMA*ps)
+                y[sell0] = xs*ys/(xs + GAMMA*dx)
+                x[sell0] = xs + dx
+                fee0[sell0, t] = dx*(1 - GAMMA)
+
+            # Pool underprices token0: sell dy of token1 until y' = GAMMA*p*x', where y' = y + dy
+            # and x' = xy/(y + GAMMA*dy), ie. GAMMA*dy^2 + y*(1 + GAMMA)*dy + y^2 - GAMMA*p*x*y = 0
+            sell1 = GAMMA*p*x > y
+            if np.any(sell1):
+                (xs, ys, ps) = (x[sell1], y[sell1], p[sell1])
+                disc = np.sqrt((1 - GAMMA)**2 + 4*GAMMA**2*ps*xs/ys)
+                dy = ys*(disc - (1 + GAMMA))/(2*GAMMA)
+                x[sell1] = xs*ys/(ys + GAMMA*dy)
+                y[sell1] = ys + dy
+                fee1[sell1, t] = dy*(1 - GAMMA)
+
+            reserve0[:, t] = x
+            reserve1[:, t] = y
+
+        value = reserve0*prices + reserve1
+        hodl = self.reserve0*prices + self.reserve1
+        backtest = {'reserve0' : reserve0,
+                    'reserve1' : reserve1,
+                    'value' : value,
+                    'fee0' : fee0,
+                    'fee1' : fee1,
+                    'il' : value/hodl - 1}
+
+        if p_paths.ndim == 1:
+            backtest = {key : arr[0] for (key, arr) in backtest.items()}
+        return backtest
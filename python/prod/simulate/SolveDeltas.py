@@ -4,13 +4,37 @@
 
 from scipy.optimize import fsolve
 from ..utils.data import UniswapExchangeData
+import numpy as np
 import warnings
 warnings.filterwarnings("ignore")
 
 class SolveDeltas():
+
+    """ 
+        Solves for the x/y reserve deltas (dx, dy) of a trade at price p which moves the pool price 
+        to p, ie. dy = -p*dx and (y + dy)/(x + dx) = p, over the reserves of a V2 pool or the 
+        virtual reserves of the active range of a V3 pool. The system is linear in dx, so the 
+        default ANALYTIC method solves it in closed form:
+        
+            dx = (y - p*x)/(2*p),  dy = (p*x - y)/2
+            
+        The FSOLVE method keeps the original scipy.fsolve solver (x0 and fac are its starting 
+        point and step bound).
+        
+        Parameters
+        -----------------
+        lp : Exchange
+            Uniswap V2 or V3 exchange
+        method : str
+            ANALYTIC (default) or FSOLVE
+    """  
+
+    ANALYTIC = 'ANALYTIC'
+    FSOLVE = 'FSOLVE'
     
-    def __init__(self, lp):
+    def __init__(self, lp, method = None):
         self.lp = lp
+        self.method = self.ANALYTIC if method == None else method
         self.tkn_x = lp.factory.token_from_exchange[lp.name][lp.token0]
         self.tkn_y = lp.factory.token_from_exchange[lp.name][lp.token1]      
         self.x = self._get_reserve(self.tkn_x) 
@@ -33,11 +57,37 @@ class SolveDeltas():
                 abs(z[1])/abs(z[0]) - self.p]
         
     def calc(self, p, x0 = None, fac = None):
+
+        """ calc
+
+            Reserve deltas which move the pool from its current reserves to price p
+                
+            Parameters
+            -----------------
+            p : float
+                Target price of x in y
+            x0 : float
+                FSOLVE only: starting point of the solver (in y)
+            fac : float
+                FSOLVE only: step bound of the solver
+
+            Returns
+            -----------------
+            dx : float
+                Delta x reserve adjustment
+            dy : float
+                Delta y reserve adjustment
+        """  
+
         self.p = p
         self.p_prev = self.lp.get_price(self.tkn_x) 
         self.dp = p - self.p_prev
         self.x = self._get_reserve(self.tkn_x)
         self.y = self._get_reserve(self.tkn_y)   
+        if(self.method == self.ANALYTIC):
+            self.p_prev = p
+            return self._solve(p, self.x, self.y)
+        
         fac = 0.1 if fac == None else fac
         dx0 = 0.5 if x0 == None else x0/p
         dy0 = 0.5 if x0 == None else x0
@@ -50,6 +100,33 @@ class SolveDeltas():
             self.p_prev = p
             return dx, -dy  
 
+    def calc_batch(self, p_arr):
+
+        """ calc_batch
+
+            Reserve deltas which move the pool from its current reserves to each target price of 
+            an array; the targets are independent, the pool is not updated
+                
+            Parameters
+            -----------------
+            p_arr : np.array
+                Target prices of x in y
+
+            Returns
+            -----------------
+            dx : np.array
+                Delta x reserve adjustments
+            dy : np.array
+                Delta y reserve adjustments
+        """  
+
+        x = self._get_reserve(self.tkn_x)
+        y = self._get_reserve(self.tkn_y)
+        return self._solve(np.asarray(p_arr, dtype=float), x, y)
+
+    def _solve(self, p, x, y):
+        return (y - p*x)/(2*p), (p*x - y)/2
+
     def _get_reserve(self, tkn):
         
         if(self.lp.version == UniswapExchangeData.VERSION_V2):
@@ -0,0 +1,296 @@
+# Copyright [2024] [Ian Moore]
+# Distributed under the MIT License (license terms are at http://opensource.org/licenses/MIT).
+# Email: defipy.devs@gmail.com
+
+import copy
+import numpy as np
+from ..utils.data import UniswapExchangeData
+from ..utils.tools.v3.Shared import *
+from ..utils.tools.v3 import TickMath, Precision, FloatMath
+
+Q96 = FloatMath.Q96
+Q128 = FloatMath.Q128
+MIN_SQRT_PRICE_LIMIT = (TickMath.MIN_SQRT_RATIO + 1) / FixedPoint96_Q96
+MAX_SQRT_PRICE_LIMIT = (TickMath.MAX_SQRT_RATIO - 1) / FixedPoint96_Q96
+
+class UniswapV3Batch():
+
+    """ UniswapV3Batch
+
+        N independent replicas of a V3 pool (one per Monte Carlo path) held in NumPy arrays and
+        swapped in lock-step. Each replica starts from the state of a template pool: its sqrt
+        price, tick, liquidity in range, reserves, protocol fees and fee growth (global, and outside of every
+        initialized tick) are rows of arrays of length N (N x K for the K initialized ticks).
+        The initialized ticks and their liquidityNet are shared, since replicas only swap.
+        One call to swap applies one exact input swap per replica, each with its own amount and
+        direction; the tick walk runs the FloatMath steps over all replicas at once, so its cost
+        grows with the number of ticks crossed rather than with N Python pool objects. Results
+        match UniswapV3FloatExchange to float64 rounding, except that the tick after a partial
+        step is taken from the log of the price (it may differ by one from the pool tick when
+        the price is within 1e-15 of a tick boundary).
+
+        Parameters
+        -----------------
+        lp : UniswapV3Exchange
+            Initialized template pool (exact or float engine); it is not modified
+        n_replicas : int
+            Number of replicas
+    """
+
+    def __init__(self, lp, n_replicas):
+        assert n_replicas > 0, 'UniswapV3Batch: INVALID_REPLICAS'
+        assert lp.slot0.sqrtPriceX96 != 0, 'UniswapV3Batch: NOT_INITIALIZED'
+        self.lp = lp
+        self.n_replicas = n_replicas
+        self.token0 = lp.token0
+        self.token1 = lp.token1
+        self.fee = lp.fee
+        self.scale = 1.0 if lp.precision == UniswapExchangeData.TYPE_GWEI else Precision.FLOAT_SCALES[Precision.GWEI_PRECISION]
+        self.feeProtocol0 = lp.slot0.feeProtocol % 16
+        self.feeProtocol1 = lp.slot0.feeProtocol >> 4
+
+        # Initialized ticks padded with the tick range boundaries, which are never crossed
+        ticks = sorted(lp.ticks)
+        self.ticks = np.array([MIN_TICK] + ticks + [MAX_TICK], dtype=np.int64)
+        self.sqrtPriceTicks = np.array([FloatMath.getSqrtPriceAtTick(tick) for tick in [MIN_TICK] + ticks + [MAX_TICK]])
+        self.liquidityNet = np.array([0.0] + [float(lp.ticks[tick].liquidityNet) for tick in ticks] + [0.0])
+        self.initialized = np.ones(len(self.ticks), dtype=bool)
+        self.initialized[[0, -1]] = False
+        outside0 = np.array([0.0] + [float(lp.ticks[tick].feeGrowthOutside0X128) for tick in ticks] + [0.0])
+        outside1 = np.array([0.0] + [float(lp.ticks[tick].feeGrowthOutside1X128) for tick in ticks] + [0.0])
+
+        # pos: padded index of the greatest initialized tick lower or equal to the current tick
+        tick0 = lp.slot0.tick
+        pos0 = int(np.searchsorted(self.ticks[1:-1], tick0, side='right'))
+        self.sqrtPrice = np.full(n_replicas, float(lp.slot0.sqrtPriceX96) / Q96)
+        self.tick = np.full(n_replicas, tick0, dtype=np.int64)
+        self.pos = np.full(n_replicas, pos0, dtype=np.int64)
+        self.liquidity = np.full(n_replicas, float(sum(lp.ticks[tick].liquidityNet for tick in ticks[:pos0])))
+        self.reserve0 = np.full(n_replicas, float(lp.reserve0))
+        self.reserve1 = np.full(n_replicas, float(lp.reserve1))
+        self.protocolFees0 = np.full(n_replicas, float(lp.protocolFees.token0))
+        self.protocolFees1 = np.full(n_replicas, float(lp.protocolFees.token1))
+        self.feeGrowthGlobal0X128 = np.full(n_replicas, float(lp.feeGrowthGlobal0X128))
+        self.feeGrowthGlobal1X128 = np.full(n_replicas, float(lp.feeGrowthGlobal1X128))
+        self.feeGrowthOutside0X128 = np.tile(outside0, (n_replicas, 1))
+        self.feeGrowthOutside1X128 = np.tile(outside1, (n_replicas, 1))
+
+        # Template state, to value the fees positions earn on each replica from here on
+        self._tick0 = tick0
+        self._feeGrowthGlobal0X128 = float(lp.feeGrowthGlobal0X128)
+        self._feeGrowthGlobal1X128 = float(lp.feeGrowthGlobal1X128)
+        self._feeGrowthOutside0X128 = outside0
+        self._feeGrowthOutside1X128 = outside1
+
+    def swap(self, token_in_flags, amounts):
+
+        """ swap
+
+            One exact input swap per replica, all replicas stepping through their ticks together;
+            a replica stops when its amount is used up or its price reaches the price limit
+
+            Parameters
+            -----------------
+            token_in_flags : numpy.ndarray
+                Per replica: True swaps token0 in for token1, False token1 in for token0
+            amounts : numpy.ndarray
+                Per replica amount of the input token (human units, 0 leaves the replica unchanged)
+
+            Returns
+            -------
+            swapped : dict
+                numpy arrays 'amount_in' (including fees) and 'amount_out', human units
+        """
+
+        n = self.n_replicas
+        zeroForOne = np.broadcast_to(np.asarray(token_in_flags, dtype=bool), (n,))
+        amounts = np.broadcast_to(np.asarray(amounts, dtype=float), (n,))
+        assert np.all(np.isfinite(amounts)) and np.all(amounts >= 0), 'UniswapV3Batch: INVALID_AMOUNT'
+
+        (ticks, sqrtPriceTicks, liquidityNet, initialized) = (self.ticks, self.sqrtPriceTicks,
+                                                              self.liquidityNet, self.initialized)
+        rows = np.arange(n)
+        fee = self.fee
+        feeProtocol = np.where(zeroForOne, self.feeProtocol0, self.feeProtocol1)
+        sqrtPriceLimit = np.where(zeroForOne, MIN_SQRT_PRICE_LIMIT, MAX_SQRT_PRICE_LIMIT)
+
+        (sqrtPrice, liquidity, pos) = (self.sqrtPrice, self.liquidity, self.pos)
+        remaining = amounts * self.scale
+        amountIn = np.zeros(n)
+        amountOut = np.zeros(n)
+        active = (remaining > 0) & (sqrtPrice != sqrtPriceLimit)
+
+        while active.any():
+            ## next initialized tick (or range boundary) in the direction of each swap
+            nxt = np.where(zeroForOne, pos, pos + 1)
+            sqrtPriceNext = sqrtPriceTicks[nxt]
+            sqrtPriceTarget = np.where(zeroForOne, np.maximum(sqrtPriceNext, sqrtPriceLimit),
+                                       np.minimum(sqrtPriceNext, sqrtPriceLimit))
+
+            ## FloatMath.computeSwapStep, exact input
+            liquiditySafe = np.where(liquidity > 0, liquidity, 1.0)
+            remainingLessFee = remaining * (ONE_IN_PIPS - fee) / ONE_IN_PIPS
+            amountInMax = np.where(zeroForOne,
+                                   liquidity * (sqrtPrice - sqrtPriceTarget) / (sqrtPrice * sqrtPriceTarget),
+                                   liquidity * (sqrtPriceTarget - sqrtPrice))
+            sqrtPricePartial = np.where(zeroForOne,
+                                        liquidity * sqrtPrice / (liquiditySafe + remainingLessFee * sqrtPrice),
+                                        sqrtPrice + remainingLessFee / liquiditySafe)
+            sqrtPriceReached = np.where(remainingLessFee >= amountInMax, sqrtPriceTarget, sqrtPricePartial)
+            sqrtPriceReached = np.where(zeroForOne, np.maximum(sqrtPriceReached, sqrtPriceTarget),
+                                        np.minimum(sqrtPriceReached, sqrtPriceTarget))
+            sqrtPriceReached = np.where(active, sqrtPriceReached, sqrtPrice)
+            max_ = active & (sqrtPriceReached == sqrtPriceTarget)
+            partial = active & ~max_
+
+            meanPrice = sqrtPrice * sqrtPriceReached
+            stepIn = np.where(max_, amountInMax, np.where(partial, remainingLessFee, 0.0))
+            stepOut = np.where(max_, np.where(zeroForOne, liquidity * (sqrtPrice - sqrtPriceTarget),
+                                              liquidity * (sqrtPriceTarget - sqrtPrice) / (sqrtPrice * sqrtPriceTarget)),
+                               np.where(zeroForOne, stepIn * meanPrice, stepIn / meanPrice))
+            stepOut = np.where(active, stepOut, 0.0)
+            feeAmount = np.where(max_, stepIn * fee / (ONE_IN_PIPS - fee), np.where(partial, remaining - stepIn, 0.0))
+
+            remaining = np.where(max_, np.maximum(remaining - stepIn - feeAmount, 0.0),
+                                 np.where(partial, 0.0, remaining))
+            amountIn += stepIn + feeAmount
+            amountOut += stepOut
+
+            ## protocol fee, then fee growth of the input token
+            protocolFee = np.where(feeProtocol > 0, feeAmount / np.where(feeProtocol > 0, feeProtocol, 1), 0.0)
+            feeGrowth = np.where(liquidity > 0, (feeAmount - protocolFee) * Q128 / liquiditySafe, 0.0)
+            self.protocolFees0 += np.where(zeroForOne, protocolFee, 0.0)
+            self.protocolFees1 += np.where(zeroForOne, 0.0, protocolFee)
+            self.feeGrowthGlobal0X128 += np.where(zeroForOne, feeGrowth, 0.0)
+            self.feeGrowthGlobal1X128 += np.where(zeroForOne, 0.0, feeGrowth)
+
+            ## cross the initialized ticks reached (Tick.cross)
+            reached = max_ & (sqrtPriceReached == sqrtPriceNext)
+            crossed = reached & initialized[nxt]
+            (r, k) = (rows[crossed], nxt[crossed])
+            self.feeGrowthOutside0X128[r, k] = self.feeGrowthGlobal0X128[r] - self.feeGrowthOutside0X128[r, k]
+            self.feeGrowthOutside1X128[r, k] = self.feeGrowthGlobal1X128[r] - self.feeGrowthOutside1X128[r, k]
+            net = np.where(crossed, liquidityNet[nxt], 0.0)
+            liquidity = liquidity + np.where(zeroForOne, -net, net)
+            pos = pos + np.where(crossed, np.where(zeroForOne, -1, 1), 0)
+
+            ## new tick: next tick (minus one going down) when reached, else recomputed from the price
+            tickNext = ticks[nxt]
+            tickPartial = np.floor(np.log(sqrtPriceReached) * FloatMath.TICKS_PER_LOG_SQRT_PRICE).astype(np.int64)
+            tickPartial = np.clip(tickPartial, ticks[pos], ticks[pos + 1] - 1)
+            self.tick = np.where(reached, np.where(zeroForOne, tickNext - 1, tickNext),
+                                 np.where(sqrtPriceReached != sqrtPrice, tickPartial, self.tick))
+            sqrtPrice = sqrtPriceReached
+            active = (remaining > 0) & (sqrtPrice != sqrtPriceLimit)
+
+        (self.sqrtPrice, self.liquidity, self.pos) = (sqrtPrice, liquidity, pos)
+        self.reserve0 += np.where(zeroForOne, amountIn, -amountOut)
+        self.reserve1 += np.where(zeroForOne, -amountOut, amountIn)
+        return {'amount_in' : amountIn / self.scale, 'amount_out' : amountOut / self.scale}
+
+    def get_price(self, token):
+
+        """ get_price
+
+            Price of select token in the exchange pair, per replica
+
+            Parameters
+            -----------------
+            token : ERC20
+                ERC20 token
+
+            Returns
+            -------
+            price : numpy.ndarray
+                Price of token in the other token, one entry per replica
+        """
+
+        if(token.token_name == self.token0):
+            return self.sqrtPrice**2
+        elif(token.token_name == self.token1):
+            return 1/self.sqrtPrice**2
+        else:
+            assert False, 'UniswapV3Batch: WRONG_INPUT_TOKEN'
+
+    def get_reserve(self, token):
+
+        """ get_reserve
+
+            Reserve amount of select token in the exchange pair, per replica
+
+            Parameters
+            -----------------
+            token : ERC20
+                ERC20 token
+
+            Returns
+            -------
+            reserve : numpy.ndarray
+                Reserve in human units, one entry per replica
+        """
+
+        if(token.token_name == self.token0):
+            return self.reserve0 / self.scale
+        elif(token.token_name == self.token1):
+            return self.reserve1 / self.scale
+        else:
+            assert False, 'UniswapV3Batch: WRONG_INPUT_TOKEN'
+
+    def get_liquidity(self):
+
+        """ get_liquidity
+
+            Liquidity in range of each replica (human units)
+        """
+
+        return self.liquidity / Precision.FLOAT_SCALES[Precision.GWEI_PRECISION]
+
+    def get_position_fees(self, owner, tickLower, tickUpper):
+
+        """ get_position_fees
+
+            Uncollected fees of a template position on each replica: what it was owed in the
+            template when the batch was created plus the fees earned on the replica since
+
+            Parameters
+            -----------------
+            owner : str
+                Position owner
+            tickLower : int
+                Lower tick of the position
+            tickUpper : int
+                Upper tick of the position
+
+            Returns
+            -------
+            fees : tuple
+                numpy arrays of fees in token0 and token1 (human units), one entry per replica
+        """
+
+        key = (owner, tickLower, tickUpper)
+        assert key in self.lp.positions, 'UniswapV3Batch: POSITION_NOT_FOUND'
+        position = copy.copy(self.lp.positions[key])
+        if position.liquidity > 0:
+            ## fees owed in the template, as poke_all would credit them
+            self.lp._credit_position(position, 0, *self.lp._fee_growth_inside(tickLower, tickUpper, self._tick0))
+        (lower, upper) = (int(np.searchsorted(self.ticks, tickLower)), int(np.searchsorted(self.ticks, tickUpper)))
+        liquidity = float(position.liquidity)
+
+        (inside0Start, inside1Start) = self._fee_growth_inside(
+            lower, upper, tickLower, tickUpper, self._tick0, self._feeGrowthGlobal0X128, self._feeGrowthGlobal1X128,
+            self._feeGrowthOutside0X128, self._feeGrowthOutside1X128)
+        (inside0, inside1) = self._fee_growth_inside(
+            lower, upper, tickLower, tickUpper, self.tick, self.feeGrowthGlobal0X128, self.feeGrowthGlobal1X128,
+            self.feeGrowthOutside0X128.T, self.feeGrowthOutside1X128.T)
+
+        fees0 = (float(position.tokensOwed0) + (inside0 - inside0Start) * liquidity / Q128) / self.scale
+        fees1 = (float(position.tokensOwed1) + (inside1 - inside1Start) * liquidity / Q128) / self.scale
+        return (fees0, fees1)
+
+    def _fee_growth_inside(self, lower, upper, tickLower, tickUpper, tick, global0, global1, outside0, outside1):
+        ## FloatMath.getFeeGrowthInside over arrays; outside is indexed by padded tick position first
+        below0 = np.where(tick >= tickLower, outside0[lower], global0 - outside0[lower])
+        below1 = np.where(tick >= tickLower, outside1[lower], global1 - outside1[lower])
+        above0 = np.where(tick < tickUpper, outside0[upper], global0 - outside0[upper])
+        above1 = np.where(tick < tickUpper, outside1[upper], global1 - outside1[upper])
+        return (global0 - below0 - above0, global1 - below1 - above1)
@@ -4,3 +4,5 @@ from .MarkovState import MarkovState
 from .Arbitrage import Arbitrage
 from .CorrectReserves import CorrectReserves
 from .QuantTerminal import QuantTerminal
+from .UniswapV3Batch import UniswapV3Batch
+from .LPBacktest import LPBacktest
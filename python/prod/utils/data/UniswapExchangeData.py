@@ -8,6 +8,10 @@ from ...erc import ERC20
 
 DEFAULT_VERSION = 'V2'
 DEFAULT_TYPE = 'DEC'
+DEFAULT_TICK_STORE = 'DICT'
+DEFAULT_OBSERVATION_CARDINALITY = 1
+DEFAULT_FEE_HISTORY = 4096
+DEFAULT_ENGINE = 'EXACT'
 
 @dataclass
 class UniswapExchangeData(ExchangeData):
@@ -17,10 +21,22 @@ class UniswapExchangeData(ExchangeData):
 
     TYPE_DEC = DEFAULT_TYPE
     TYPE_GWEI = 'GWEI'    
+
+    TICK_STORE_DICT = DEFAULT_TICK_STORE
+    TICK_STORE_ARRAY = 'ARRAY'
+
+    ENGINE_EXACT = DEFAULT_ENGINE
+    ENGINE_FLOAT = 'FLOAT'
+    ENGINE_INTEGER = 'INTEGER'
         
     tkn0: ERC20
     tkn1: ERC20 
     version: str = DEFAULT_VERSION
     precision: str = DEFAULT_TYPE
     tick_spacing: int = None   
-    fee: int = None
\ No newline at end of file
+    fee: int = None
+    trusted: bool = False
+    tick_store: str = DEFAULT_TICK_STORE
+    observation_cardinality: int = DEFAULT_OBSERVATION_CARDINALITY
+    engine: str = DEFAULT_ENGINE
+    fee_history: int = DEFAULT_FEE_HISTORY
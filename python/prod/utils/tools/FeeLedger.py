@@ -0,0 +1,246 @@
+# Copyright [2024] [Ian Moore]
+# Distributed under the MIT License (license terms are at http://opensource.org/licenses/MIT).
+# Email: defipy.devs@gmail.com
+
+import numpy as np
+
+INITIAL_CAPACITY = 256
+
+# Columns of a history row
+TIMESTAMP = 0
+FEE0 = 1
+FEE1 = 2
+CUMULATIVE_FEE0 = 3
+CUMULATIVE_FEE1 = 4
+N_COLUMNS = 5
+
+class FeeLedger():
+
+    """ FeeLedger
+
+        Swap fee history behind the V2 exchange fee API. Every swap adds a (timestamp, fee0, fee1)
+        row along with the running (prefix) sums of the fees, so the total fees are O(1) and the
+        fees over the last n swaps, or since a timestamp, are a difference of two prefix sums. Rows
+        live in a NumPy array which grows in chunks up to size rows and then becomes a ring where
+        the oldest row is overwritten; with size = None the history is kept in full.
+
+        Parameters
+        -----------------
+        size : int
+            Number of swaps kept in the history, or None for no limit
+        dtype : type
+            Row type; float, or object to keep integer (wei) fees exact
+    """
+
+    def __init__(self, size, dtype = float):
+        assert size == None or size > 0, 'FeeLedger: INVALID_SIZE'
+        self.size = size
+        self.dtype = dtype
+        capacity = INITIAL_CAPACITY if size == None else min(size, INITIAL_CAPACITY)
+        self.history = np.zeros((capacity, N_COLUMNS), dtype=dtype)
+        self.index = -1
+        self.cardinality = 0
+        self.count = 0
+        self.total0 = 0
+        self.total1 = 0
+
+    def write(self, timestamp, fee0, fee1):
+
+        """ write
+
+            Add the fees of one swap
+
+            Parameters
+            -----------------
+            timestamp : int
+                Block timestamp of the swap
+            fee0 : float
+                Fee from reserve0
+            fee1 : float
+                Fee from reserve1
+        """
+
+        self._reserve(self.cardinality + 1)
+        self.total0 += fee0
+        self.total1 += fee1
+        self.index = (self.index + 1) % len(self.history)
+        self.history[self.index] = (timestamp, fee0, fee1, self.total0, self.total1)
+        self.cardinality = min(self.cardinality + 1, len(self.history))
+        self.count += 1
+
+    def extend(self, timestamp, fees0, fees1):
+
+        """ extend
+
+            Add the fees of several swaps at once; same running sums, in the same order, as
+            calling write for each swap
+
+            Parameters
+            -----------------
+            timestamp : int
+                Block timestamp of the swaps
+            fees0 : list
+                Fees from reserve0
+            fees1 : list
+                Fees from reserve1
+        """
+
+        n = len(fees0)
+        if n == 0:
+            return
+
+        rows = np.empty((n, N_COLUMNS), dtype=self.dtype)
+        rows[:, TIMESTAMP] = timestamp
+        rows[:, FEE0] = fees0
+        rows[:, FEE1] = fees1
+        rows[:, CUMULATIVE_FEE0] = np.cumsum(np.concatenate(([self.total0], rows[:, FEE0])))[1:]
+        rows[:, CUMULATIVE_FEE1] = np.cumsum(np.concatenate(([self.total1], rows[:, FEE1])))[1:]
+        self.total0 = rows[-1, CUMULATIVE_FEE0]
+        self.total1 = rows[-1, CUMULATIVE_FEE1]
+
+        self._reserve(self.cardinality + n)
+        capacity = len(self.history)
+        slots = (self.index + 1 + np.arange(n)) % capacity
+        # Rows which would be overwritten within the batch itself are dropped
+        self.history[slots[-capacity:]] = rows[-capacity:]
+        self.index = int(slots[-1])
+        self.cardinality = min(self.cardinality + n, capacity)
+        self.count += n
+
+    def slots(self, n):
+
+        """ slots
+
+            Slots of the ring overwritten by the next n rows, oldest first; empty until the ring
+            is full
+
+            Parameters
+            -----------------
+            n : int
+                Number of rows about to be added
+
+            Returns
+            -------
+            slots : list
+                Indices into history
+        """
+
+        if self.size == None:
+            return []
+        n_overwritten = min(self.cardinality + n - self.size, self.size)
+        return [(self.index + 1 + k) % self.size for k in range(max(n_overwritten, 0))]
+
+    def fees(self):
+
+        """ fees
+
+            Per swap fees kept in the history, oldest first
+
+            Returns
+            -------
+            fees0 : np.array
+                Fees from reserve0
+            fees1 : np.array
+                Fees from reserve1
+        """
+
+        rows = self.history[self._chronological(np.arange(self.cardinality))]
+        return rows[:, FEE0], rows[:, FEE1]
+
+    def latest(self):
+
+        """ latest
+
+            Fees of the most recent swap, read from a single row of the history
+
+            Returns
+            -------
+            fee0 : float
+                Fee from reserve0
+            fee1 : float
+                Fee from reserve1
+        """
+
+        assert self.cardinality > 0, 'FeeLedger: EMPTY'
+        row = self.history[self.index]
+        return row[FEE0], row[FEE1]
+
+    def window(self, n_swaps):
+
+        """ window
+
+            Fees over the last n_swaps swaps
+
+            Parameters
+            -----------------
+            n_swaps : int
+                Number of swaps, no more than the number kept in the history
+
+            Returns
+            -------
+            fee0 : float
+                Fees from reserve0
+            fee1 : float
+                Fees from reserve1
+        """
+
+        assert 0 <= n_swaps <= self.cardinality, 'FeeLedger: OLD'
+        if n_swaps == 0:
+            return 0, 0
+        return self._fees_from(self.cardinality - n_swaps)
+
+    def since(self, timestamp):
+
+        """ since
+
+            Fees of the swaps made at or after a timestamp; binary search over the timestamps of
+            the history
+
+            Parameters
+            -----------------
+            timestamp : int
+                Block timestamp, after the oldest swap kept once older swaps have been dropped
+
+            Returns
+            -------
+            fee0 : float
+                Fees from reserve0
+            fee1 : float
+                Fees from reserve1
+        """
+
+        # First chronological position at or after timestamp, over [0, cardinality]
+        lo = 0
+        hi = self.cardinality
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.history[self._chronological(mid), TIMESTAMP] < timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == self.cardinality:
+            return 0, 0
+        # Dropped swaps may be as recent as the oldest one kept
+        assert lo > 0 or self.count == self.cardinality, 'FeeLedger: OLD'
+        return self._fees_from(lo)
+
+    def _fees_from(self, position):
+        row = self.history[self._chronological(position)]
+        return (self.total0 - (row[CUMULATIVE_FEE0] - row[FEE0]),
+                self.total1 - (row[CUMULATIVE_FEE1] - row[FEE1]))
+
+    def _chronological(self, position):
+        # Oldest row sits right after the newest one once the ring is full
+        capacity = len(self.history)
+        oldest = (self.index + 1) % capacity if self.cardinality == capacity else 0
+        return (oldest + position) % capacity
+
+    def _reserve(self, n):
+        capacity = len(self.history)
+        if n <= capacity or capacity == self.size:
+            return
+        capacity = max(n, 2*capacity) if self.size == None else min(max(n, 2*capacity), self.size)
+        # Not full before, so rows are in chronological order from slot 0
+        history = np.zeros((capacity, N_COLUMNS), dtype=self.dtype)
+        history[:self.cardinality] = self.history[:self.cardinality]
+        self.history = history
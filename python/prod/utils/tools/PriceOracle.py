@@ -0,0 +1,109 @@
+# Copyright [2024] [Ian Moore]
+# Distributed under the MIT License (license terms are at http://opensource.org/licenses/MIT).
+# Email: defipy.devs@gmail.com
+
+class PriceOracle():
+
+    """ PriceOracle
+
+        Ring buffer of (timestamp, price0 cumulative, price1 cumulative) observations behind the V2
+        exchange observe() API. The ring is preallocated with a fixed number of slots, so memory is
+        bounded and writes are O(1); once full the oldest observation is overwritten. The cumulative
+        prices are piecewise linear between observations, so a lookup is a binary search over the
+        ring followed by a linear interpolation.
+
+        Parameters
+        -----------------
+        size : int
+            Number of observations kept in the ring
+    """
+
+    def __init__(self, size):
+        assert size > 0, 'PriceOracle: INVALID_SIZE'
+        self.size = size
+        self.observations = [None]*size
+        self.index = size - 1
+        self.cardinality = 0
+
+    def write(self, timestamp, price0_cumulative, price1_cumulative):
+
+        """ write
+
+            Write an observation after the newest one; at most one observation is kept per timestamp
+
+            Parameters
+            -----------------
+            timestamp : int
+                Block timestamp of the observation
+            price0_cumulative : float
+                Cumulative token0 price (in token1) at timestamp
+            price1_cumulative : float
+                Cumulative token1 price (in token0) at timestamp
+        """
+
+        if self.cardinality > 0 and self.observations[self.index][0] == timestamp:
+            return
+        self.index = (self.index + 1) % self.size
+        self.observations[self.index] = (timestamp, price0_cumulative, price1_cumulative)
+        self.cardinality = min(self.cardinality + 1, self.size)
+
+    def observe(self, now, seconds_agos, price0_cumulative, price1_cumulative):
+
+        """ observe
+
+            Cumulative prices as of each `seconds_ago` before now
+
+            Parameters
+            -----------------
+            now : int
+                Current block timestamp
+            seconds_agos : list
+                How long ago each cumulative price should be returned
+            price0_cumulative : float
+                Current (counterfactual) cumulative token0 price, at now
+            price1_cumulative : float
+                Current (counterfactual) cumulative token1 price, at now
+
+            Returns
+            -------
+            price0_cumulatives : list
+                Cumulative token0 prices as of each seconds_ago
+            price1_cumulatives : list
+                Cumulative token1 prices as of each seconds_ago
+        """
+
+        assert self.cardinality > 0, 'PriceOracle: NOT_INITIALIZED'
+        current = (now, price0_cumulative, price1_cumulative)
+        price0_cumulatives = [0]*len(seconds_agos)
+        price1_cumulatives = [0]*len(seconds_agos)
+        for k, seconds_ago in enumerate(seconds_agos):
+            target = now - seconds_ago
+            (before, after) = self._surrounding(target, current)
+            if after[0] == before[0]:
+                (price0_cumulatives[k], price1_cumulatives[k]) = (before[1], before[2])
+            else:
+                w = (target - before[0])/(after[0] - before[0])
+                price0_cumulatives[k] = before[1] + w*(after[1] - before[1])
+                price1_cumulatives[k] = before[2] + w*(after[2] - before[2])
+        return price0_cumulatives, price1_cumulatives
+
+    def _surrounding(self, target, current):
+        newest = self.observations[self.index]
+        if newest[0] <= target:
+            return (newest, current)
+
+        # Oldest observation sits right after the newest one once the ring has wrapped
+        oldest = (self.index + 1) % self.size if self.cardinality == self.size else 0
+        assert self.observations[oldest][0] <= target, 'PriceOracle: OLD'
+
+        # Last observation at or before target, over chronological positions [0, cardinality)
+        lo = 0
+        hi = self.cardinality - 1
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if self.observations[(oldest + mid) % self.size][0] <= target:
+                lo = mid
+            else:
+                hi = mid - 1
+        return (self.observations[(oldest + lo) % self.size],
+                self.observations[(oldest + lo + 1) % self.size])
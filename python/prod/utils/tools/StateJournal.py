@@ -0,0 +1,164 @@
+# Copyright [2024] [Ian Moore]
+# Distributed under the MIT License (license terms are at http://opensource.org/licenses/MIT).
+# Email: defipy.devs@gmail.com
+
+from contextlib import contextmanager
+from copy import copy
+
+MISSING = object()
+
+class Savepoint():
+
+    def __init__(self, fields, structs, logs, tokens):
+        self.fields = fields
+        self.structs = structs
+        self.logs = logs
+        self.tokens = tokens
+        self.entries = {}
+
+class StateJournal():
+
+    """ StateJournal
+
+        Undo journal behind the exchange transaction() API. Opening a transaction snapshots a fixed
+        set of scalar fields, in-place dataclasses, append-only logs and the ERC20 totals of the pool
+        (constant cost). Entries of the pool mappings (ticks, positions, liquidity providers) are
+        recorded by the exchange right before it changes them, so the cost of a transaction scales
+        with what it touches and not with the size of the pool. Transactions nest as savepoints.
+
+        Parameters
+        -----------------
+        lp : Exchange
+            Pool whose state is journaled
+        fields : list
+            Names of the scalar attributes of lp
+        structs : list
+            Names of the dataclass attributes of lp which are updated in place
+        logs : list
+            Names of the append-only list attributes of lp
+    """
+
+    def __init__(self, lp, fields, structs = None, logs = None):
+        self.lp = lp
+        self.fields = fields
+        self.structs = [] if structs == None else structs
+        self.logs = [] if logs == None else logs
+        self.savepoints = []
+
+    @contextmanager
+    def transaction(self):
+
+        """ transaction
+
+            Context manager that commits the enclosed pool updates, or rolls them back and re-raises
+            if the block raises (eg. a failed assert)
+        """
+
+        self.begin()
+        try:
+            yield self.lp
+        except BaseException:
+            self.rollback()
+            raise
+        self.commit()
+
+    def begin(self):
+
+        """ begin
+
+            Open a savepoint
+        """
+
+        lp = self.lp
+        fields = [getattr(lp, name, MISSING) for name in self.fields]
+        structs = [(name, getattr(lp, name)) for name in self.structs]
+        structs = [(name, struct, dict(struct.__dict__)) for (name, struct) in structs]
+        logs = [(name, getattr(lp, name)) for name in self.logs]
+        logs = [(name, log, len(log)) for (name, log) in logs]
+        tokens = lp.factory.token_from_exchange[lp.name].values()
+        tokens = [(tkn, tkn.token_total) for tkn in tokens]
+        self.savepoints.append(Savepoint(fields, structs, logs, tokens))
+
+    def record(self, mapping, key):
+
+        """ record
+
+            Record mapping[key] before it is changed; only the first change of a key within a
+            savepoint is recorded. Should only be called while a transaction is open
+
+            Parameters
+            -----------------
+            mapping : dict
+                Pool mapping (eg. ticks or positions), or preallocated list
+            key : hashable
+                Key which is about to be inserted, updated or deleted
+        """
+
+        entries = self.savepoints[-1].entries
+        ref = (id(mapping), key)
+        if ref not in entries:
+            # Preallocated lists (eg. the oracle ring) always hold a value at key
+            value = mapping.get(key, MISSING) if hasattr(mapping, 'get') else mapping[key]
+            state = None if value is MISSING else copy(value)
+            entries[ref] = (mapping, key, value, state)
+
+    def commit(self):
+
+        """ commit
+
+            Close the innermost savepoint and keep its updates; its records move to the enclosing
+            savepoint so they can still be undone there
+        """
+
+        savepoint = self.savepoints.pop()
+        if self.savepoints:
+            entries = self.savepoints[-1].entries
+            for ref, entry in savepoint.entries.items():
+                entries.setdefault(ref, entry)
+
+    def rollback(self):
+
+        """ rollback
+
+            Close the innermost savepoint and undo every update made since it was opened
+        """
+
+        savepoint = self.savepoints.pop()
+        lp = self.lp
+
+        for (mapping, key, value, state) in savepoint.entries.values():
+            if getattr(mapping, 'liquidityIndex', None) != None:
+                # Derived index of the mapping; rebuilt from the restored entries when next used
+                mapping.liquidityIndex = None
+            if value is MISSING:
+                mapping.pop(key, None)
+            elif hasattr(value, '__dict__'):
+                # Objects held by reference (eg. TickInfo, PositionInfo) are restored in place
+                value.__dict__.update(state.__dict__)
+                mapping[key] = value
+            else:
+                # Immutable values, and views into array-backed storage which copy to a detached value
+                mapping[key] = state
+
+        for (name, value) in zip(self.fields, savepoint.fields):
+            if value is MISSING:
+                if hasattr(lp, name):
+                    delattr(lp, name)
+            else:
+                setattr(lp, name, value)
+
+        for (name, struct, state) in savepoint.structs:
+            struct.__dict__.update(state)
+            setattr(lp, name, struct)
+
+        for (name, log, n) in savepoint.logs:
+            del log[n:]
+            setattr(lp, name, log)
+
+        for (tkn, token_total) in savepoint.tokens:
+            tkn.token_total = token_total
+
+        # Not restored: the state version only moves forward, so quotes cached on the rolled
+        # back state are not mistaken for quotes on the restored one
+        if hasattr(lp, 'state_version'):
+            lp.state_version += 1
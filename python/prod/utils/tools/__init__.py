@@ -1 +1,4 @@
-from .MockAddress import MockAddress
\ No newline at end of file
+from .MockAddress import MockAddress
+from .StateJournal import StateJournal
+from .PriceOracle import PriceOracle
+from .FeeLedger import FeeLedger
@@ -0,0 +1,235 @@
+# Copyright [2024] [Ian Moore]
+# Distributed under the MIT License (license terms are at http://opensource.org/licenses/MIT).
+# Email: defipy.devs@gmail.com
+
+import math
+from functools import lru_cache
+from . import TickMath
+from .Shared import *
+
+### @title FloatMath
+### @notice Float64 counterparts of the SqrtPriceMath, SwapMath, Tick and Position kernels, used by the
+### approximate V3 engine (UniswapV3FloatExchange)
+### @dev Sqrt prices are plain floats (sqrtPriceX96 / 2**96), amounts and liquidity are floats in machine
+### units and fee growth is a float scaled by 2**128 like its integer counterpart. Nothing is rounded in
+### favour of the pool, so every operation carries a relative error of the order of 2**-53 instead.
+
+Q96 = float(FixedPoint96_Q96)
+Q128 = float(FixedPoint128_Q128)
+SQRT_PRICE_CACHE_SIZE = 4096
+
+## 2 / ln(1.0001): tick of a sqrt price is floor(ln(sqrtPrice) * TICKS_PER_LOG_SQRT_PRICE)
+TICKS_PER_LOG_SQRT_PRICE = 2 / math.log(1.0001)
+
+
+### @notice Sqrt price at a tick, the float of TickMath.getSqrtRatioAtTick / 2**96
+### @param tick The tick
+### @return sqrtPrice The sqrt price (cached)
+@lru_cache(maxsize=SQRT_PRICE_CACHE_SIZE)
+def getSqrtPriceAtTick(tick):
+    return TickMath.getSqrtRatioAtTick(tick) / FixedPoint96_Q96
+
+
+### @notice Greatest tick whose sqrt price is lower or equal to a sqrt price
+### @dev Estimated from the log of the price then corrected against getSqrtPriceAtTick, so the tick
+### boundaries are the same as in the integer engine
+### @param sqrtPrice The sqrt price
+### @return tick The tick
+def getTickAtSqrtPrice(sqrtPrice):
+    tick = math.floor(math.log(sqrtPrice) * TICKS_PER_LOG_SQRT_PRICE)
+    tick = min(max(tick, MIN_TICK), MAX_TICK - 1)
+    if tick < MAX_TICK - 1 and getSqrtPriceAtTick(tick + 1) <= sqrtPrice:
+        return tick + 1
+    if tick > MIN_TICK and getSqrtPriceAtTick(tick) > sqrtPrice:
+        return tick - 1
+    return tick
+
+
+### @notice Amount of token0 between two sqrt prices, liquidity / sqrtPriceA - liquidity / sqrtPriceB
+### @param sqrtPriceA A sqrt price
+### @param sqrtPriceB Another sqrt price
+### @param liquidity The liquidity (signed)
+### @return amount0 The amount of token0, with the sign of liquidity
+def getAmount0Delta(sqrtPriceA, sqrtPriceB, liquidity):
+    if sqrtPriceA > sqrtPriceB:
+        (sqrtPriceA, sqrtPriceB) = (sqrtPriceB, sqrtPriceA)
+    return liquidity * (sqrtPriceB - sqrtPriceA) / (sqrtPriceA * sqrtPriceB)
+
+
+### @notice Amount of token1 between two sqrt prices, liquidity * (sqrtPriceB - sqrtPriceA)
+### @param sqrtPriceA A sqrt price
+### @param sqrtPriceB Another sqrt price
+### @param liquidity The liquidity (signed)
+### @return amount1 The amount of token1, with the sign of liquidity
+def getAmount1Delta(sqrtPriceA, sqrtPriceB, liquidity):
+    return liquidity * abs(sqrtPriceB - sqrtPriceA)
+
+
+### @notice Sqrt price after adding an amount of token0 (zeroForOne) or token1
+### @param sqrtPrice The starting sqrt price
+### @param liquidity The liquidity in range
+### @param amountIn How much of token0 or token1 is swapped in
+### @param zeroForOne Whether the amount in is token0 or token1
+### @return sqrtPriceNext The sqrt price after adding the amount
+def getNextSqrtPriceFromInput(sqrtPrice, liquidity, amountIn, zeroForOne):
+    assert sqrtPrice > 0
+    assert liquidity > 0
+    if zeroForOne:
+        return liquidity * sqrtPrice / (liquidity + amountIn * sqrtPrice)
+    return sqrtPrice + amountIn / liquidity
+
+
+### @notice Sqrt price after removing an amount of token1 (zeroForOne) or token0
+### @param sqrtPrice The starting sqrt price
+### @param liquidity The liquidity in range
+### @param amountOut How much of token1 or token0 is swapped out
+### @param zeroForOne Whether the amount out is token1 or token0
+### @return sqrtPriceNext The sqrt price after removing the amount
+def getNextSqrtPriceFromOutput(sqrtPrice, liquidity, amountOut, zeroForOne):
+    assert sqrtPrice > 0
+    assert liquidity > 0
+    if zeroForOne:
+        sqrtPriceNext = sqrtPrice - amountOut / liquidity
+        assert sqrtPriceNext > 0
+        return sqrtPriceNext
+    denominator = liquidity - amountOut * sqrtPrice
+    assert denominator > 0
+    return liquidity * sqrtPrice / denominator
+
+
+### @notice Computes the result of swapping some amount in, or amount out, within a single tick range
+### @dev Same steps as SwapMath.computeSwapStep; the price reached is clamped to the target, so float
+### rounding never moves the price past a tick that is not crossed
+### @param sqrtPriceCurrent The current sqrt price of the pool
+### @param sqrtPriceTarget The sqrt price that cannot be exceeded, from which the direction of the swap is inferred
+### @param liquidity The usable liquidity
+### @param amountRemaining How much input (positive) or output (negative) amount is remaining to be swapped
+### @param feePips The fee taken from the input amount, expressed in hundredths of a bip
+### @return sqrtPriceNext The sqrt price after swapping the amount in#out, not to exceed the target
+### @return amountIn The amount to be swapped in
+### @return amountOut The amount to be received
+### @return feeAmount The amount of input that will be taken as a fee
+def computeSwapStep(sqrtPriceCurrent, sqrtPriceTarget, liquidity, amountRemaining, feePips):
+    zeroForOne = sqrtPriceCurrent >= sqrtPriceTarget
+    exactIn = amountRemaining >= 0
+
+    if exactIn:
+        amountRemainingLessFee = amountRemaining * (ONE_IN_PIPS - feePips) / ONE_IN_PIPS
+        amountIn = (
+            getAmount0Delta(sqrtPriceTarget, sqrtPriceCurrent, liquidity)
+            if zeroForOne
+            else getAmount1Delta(sqrtPriceCurrent, sqrtPriceTarget, liquidity)
+        )
+        if amountRemainingLessFee >= amountIn:
+            sqrtPriceNext = sqrtPriceTarget
+        else:
+            sqrtPriceNext = getNextSqrtPriceFromInput(
+                sqrtPriceCurrent, liquidity, amountRemainingLessFee, zeroForOne
+            )
+    else:
+        amountOut = (
+            getAmount1Delta(sqrtPriceTarget, sqrtPriceCurrent, liquidity)
+            if zeroForOne
+            else getAmount0Delta(sqrtPriceCurrent, sqrtPriceTarget, liquidity)
+        )
+        if -amountRemaining >= amountOut:
+            sqrtPriceNext = sqrtPriceTarget
+        else:
+            sqrtPriceNext = getNextSqrtPriceFromOutput(
+                sqrtPriceCurrent, liquidity, -amountRemaining, zeroForOne
+            )
+
+    if zeroForOne:
+        sqrtPriceNext = max(sqrtPriceNext, sqrtPriceTarget)
+    else:
+        sqrtPriceNext = min(sqrtPriceNext, sqrtPriceTarget)
+    max_ = sqrtPriceTarget == sqrtPriceNext
+
+    ## get the input#output amounts
+    if max_:
+        if zeroForOne:
+            if not exactIn:
+                amountIn = getAmount0Delta(sqrtPriceNext, sqrtPriceCurrent, liquidity)
+            else:
+                amountOut = getAmount1Delta(sqrtPriceNext, sqrtPriceCurrent, liquidity)
+        else:
+            if not exactIn:
+                amountIn = getAmount1Delta(sqrtPriceCurrent, sqrtPriceNext, liquidity)
+            else:
+                amountOut = getAmount0Delta(sqrtPriceCurrent, sqrtPriceNext, liquidity)
+    else:
+        ## the amount remaining is used up: convert it at the mean price of the step (amount1 = amount0 *
+        ## sqrtPriceCurrent * sqrtPriceNext) rather than from the difference of two close sqrt prices
+        meanPrice = sqrtPriceCurrent * sqrtPriceNext
+        if exactIn:
+            amountIn = amountRemainingLessFee
+            amountOut = amountIn * meanPrice if zeroForOne else amountIn / meanPrice
+        else:
+            amountOut = -amountRemaining
+            amountIn = amountOut / meanPrice if zeroForOne else amountOut * meanPrice
+
+    ## cap the output amount to not exceed the remaining output amount
+    if (not exactIn) and (amountOut > -amountRemaining):
+        amountOut = -amountRemaining
+
+    if exactIn and not max_:
+        ## we didn't reach the target, so take the remainder of the maximum input as fee
+        feeAmount = amountRemaining - amountIn
+    else:
+        feeAmount = amountIn * feePips / (ONE_IN_PIPS - feePips)
+
+    return (sqrtPriceNext, amountIn, amountOut, feeAmount)
+
+
+### @notice Fee growth inside a tick range, as Tick.getFeeGrowthInside over float fee growth values
+### @dev Float fee growth does not wrap, so there is no modular reduction
+### @param self The mapping containing all tick information for initialized ticks
+### @param tickLower The lower tick boundary of the position
+### @param tickUpper The upper tick boundary of the position
+### @param tickCurrent The current tick
+### @param feeGrowthGlobal0X128 The all-time global fee growth, per unit of liquidity, in token0
+### @param feeGrowthGlobal1X128 The all-time global fee growth, per unit of liquidity, in token1
+### @return feeGrowthInside0X128 The all-time fee growth in token0, per unit of liquidity, inside the range
+### @return feeGrowthInside1X128 The all-time fee growth in token1, per unit of liquidity, inside the range
+def getFeeGrowthInside(self, tickLower, tickUpper, tickCurrent, feeGrowthGlobal0X128, feeGrowthGlobal1X128):
+    lower = self[tickLower]
+    upper = self[tickUpper]
+
+    if tickCurrent >= tickLower:
+        feeGrowthBelow0X128 = lower.feeGrowthOutside0X128
+        feeGrowthBelow1X128 = lower.feeGrowthOutside1X128
+    else:
+        feeGrowthBelow0X128 = feeGrowthGlobal0X128 - lower.feeGrowthOutside0X128
+        feeGrowthBelow1X128 = feeGrowthGlobal1X128 - lower.feeGrowthOutside1X128
+
+    if tickCurrent < tickUpper:
+        feeGrowthAbove0X128 = upper.feeGrowthOutside0X128
+        feeGrowthAbove1X128 = upper.feeGrowthOutside1X128
+    else:
+        feeGrowthAbove0X128 = feeGrowthGlobal0X128 - upper.feeGrowthOutside0X128
+        feeGrowthAbove1X128 = feeGrowthGlobal1X128 - upper.feeGrowthOutside1X128
+
+    return (
+        feeGrowthGlobal0X128 - feeGrowthBelow0X128 - feeGrowthAbove0X128,
+        feeGrowthGlobal1X128 - feeGrowthBelow1X128 - feeGrowthAbove1X128,
+    )
+
+
+### @notice Credits accumulated fees to a position, as Position.update over float fee growth values
+### @param self The individual position to update
+### @param liquidityDelta The change in pool liquidity as a result of the position update (int)
+### @param feeGrowthInside0X128 The all-time fee growth in token0, per unit of liquidity, inside the range
+### @param feeGrowthInside1X128 The all-time fee growth in token1, per unit of liquidity, inside the range
+def updatePosition(self, liquidityDelta, feeGrowthInside0X128, feeGrowthInside1X128):
+    tokensOwed0 = (feeGrowthInside0X128 - self.feeGrowthInside0LastX128) * self.liquidity / Q128
+    tokensOwed1 = (feeGrowthInside1X128 - self.feeGrowthInside1LastX128) * self.liquidity / Q128
+
+    if liquidityDelta != 0:
+        self.liquidity += liquidityDelta
+        assert self.liquidity >= 0, "LS"
+    self.feeGrowthInside0LastX128 = feeGrowthInside0X128
+    self.feeGrowthInside1LastX128 = feeGrowthInside1X128
+
+    if tokensOwed0 > 0 or tokensOwed1 > 0:
+        self.tokensOwed0 += tokensOwed0
+        self.tokensOwed1 += tokensOwed1
@@ -0,0 +1,81 @@
+# Copyright [2024] [Ian Moore]
+# Distributed under the MIT License (license terms are at http://opensource.org/licenses/MIT).
+# Email: defipy.devs@gmail.com
+
+from . import TickMath
+from .Shared import *
+
+## Fenwick positions are 1 + tick - MIN_TICK
+INDEX_SIZE = MAX_TICK - MIN_TICK + 1
+Q192 = 2**192
+
+### @title LiquidityIndex
+### @notice Fenwick tree over the tick range, for the liquidity active at a tick and the token amounts
+### held between two ticks in O(log n)
+### @dev Three trees are kept over liquidityNet: the plain values, and the values weighted by the Q96 sqrt
+### price (token1) and its Q96 inverse (token0) at the tick. The trees are sparse (dicts), so memory
+### scales with the initialized ticks and not with the 1.7M ticks of the range. Tick.update and Tick.clear
+### maintain the index of a tick mapping which has one (mapping.liquidityIndex).
+class LiquidityIndex:
+    def __init__(self, ticks=None):
+        self.net = {}
+        self.net0 = {}
+        self.net1 = {}
+        if ticks != None:
+            for tick in ticks:
+                self.add(tick, ticks[tick].liquidityNet)
+
+    ### @notice Adds to the liquidityNet of a tick
+    ### @param tick The tick
+    ### @param liquidityNetDelta The change of the liquidityNet of the tick
+    def add(self, tick, liquidityNetDelta):
+        if liquidityNetDelta == 0:
+            return
+        sqrtRatioX96 = TickMath.getSqrtRatioAtTick(tick)
+        delta0 = liquidityNetDelta * (Q192 // sqrtRatioX96)
+        delta1 = liquidityNetDelta * sqrtRatioX96
+        (net, net0, net1) = (self.net, self.net0, self.net1)
+        i = tick - MIN_TICK + 1
+        while i <= INDEX_SIZE:
+            net[i] = net.get(i, 0) + liquidityNetDelta
+            net0[i] = net0.get(i, 0) + delta0
+            net1[i] = net1.get(i, 0) + delta1
+            i += i & -i
+
+    ### @notice Sum of a tree over the ticks lower or equal to tick
+    def prefix(self, tree, tick):
+        i = min(max(tick - MIN_TICK + 1, 0), INDEX_SIZE)
+        total = 0
+        while i > 0:
+            total += tree.get(i, 0)
+            i -= i & -i
+        return total
+
+    ### @notice Liquidity in range when the current tick is tick
+    ### @param tick The tick
+    ### @return liquidity The sum of the liquidityNet of the ticks lower or equal to tick
+    def liquidityAt(self, tick):
+        return self.prefix(self.net, tick)
+
+    ### @notice Token amounts held by the liquidity between two ticks
+    ### @dev Computed from the Q96 sqrt price of each initialized tick and its Q96 inverse, rounded down;
+    ### within one unit per initialized tick in range of the sum of SqrtPriceMath amounts
+    ### @param tickLower The lower tick of the range
+    ### @param tickUpper The upper tick of the range
+    ### @return amount0 The amount of token0 needed to move the price from tickLower to tickUpper
+    ### @return amount1 The amount of token1 needed to move the price from tickUpper to tickLower
+    def amountsInRange(self, tickLower, tickUpper):
+        assert tickLower < tickUpper, "TLU"
+        sqrtRatioAX96 = TickMath.getSqrtRatioAtTick(tickLower)
+        sqrtRatioBX96 = TickMath.getSqrtRatioAtTick(tickUpper)
+        (inverseA, inverseB) = (Q192 // sqrtRatioAX96, Q192 // sqrtRatioBX96)
+
+        ## liquidity entering at or below tickLower spans the whole range, the rest from its own tick
+        liquidityBelow = self.prefix(self.net, tickLower)
+        liquidityInside = self.prefix(self.net, tickUpper - 1) - liquidityBelow
+        weighted0 = self.prefix(self.net0, tickUpper - 1) - self.prefix(self.net0, tickLower)
+        weighted1 = self.prefix(self.net1, tickUpper - 1) - self.prefix(self.net1, tickLower)
+
+        amount0 = liquidityBelow * (inverseA - inverseB) + weighted0 - liquidityInside * inverseB
+        amount1 = liquidityBelow * (sqrtRatioBX96 - sqrtRatioAX96) + liquidityInside * sqrtRatioBX96 - weighted1
+        return (amount0 >> 96, amount1 >> 96)
@@ -0,0 +1,241 @@
+# Copyright [2024] [Ian Moore]
+# Distributed under the MIT License (license terms are at http://opensource.org/licenses/MIT).
+# Email: defipy.devs@gmail.com
+
+# Port of the original MIT licenced Oracle library from Uniswap v3-core
+# - https://github.com/Uniswap/v3-core/blob/main/contracts/libraries/Oracle.sol
+
+from .Shared import *
+
+### @title Oracle
+### @notice Provides price and liquidity data useful for a wide variety of system designs
+### @dev Instances of stored oracle data, "observations", are collected in the oracle array, a ring buffer
+### that is preallocated with a fixed size (see newObservations). Timestamps are python ints, so unlike the
+### Solidity library there is no uint32 overflow to handle.
+@dataclass
+class Observation:
+    ## the block timestamp of the observation
+    blockTimestamp: int
+    ## the tick accumulator, i.e. tick * time elapsed since the pool was first initialized
+    tickCumulative: int
+    ## the seconds per liquidity, i.e. seconds elapsed / max(1, liquidity) since the pool was first initialized
+    secondsPerLiquidityCumulativeX128: int
+    ## whether or not the observation is initialized
+    initialized: bool
+
+
+EMPTY_OBSERVATION = Observation(0, 0, 0, False)
+
+
+### @notice Preallocates the ring buffer
+### @dev Slots are replaced on write, never updated in place, so they can share one empty observation
+### @param cardinality The fixed number of populated observations the ring can hold
+### @return self The observation ring
+def newObservations(cardinality):
+    assert cardinality > 0, "I"
+    return [EMPTY_OBSERVATION] * cardinality
+
+
+### @notice Transforms a previous observation into a new observation, given the passage of time and the current tick and liquidity values
+### @param last The specified observation to be transformed
+### @param blockTimestamp The timestamp of the new observation
+### @param tick The active tick at the time of the new observation
+### @param liquidity The total in-range liquidity at the time of the new observation
+### @return Observation The newly populated observation
+def transform(last, blockTimestamp, tick, liquidity):
+    delta = blockTimestamp - last.blockTimestamp
+    return Observation(
+        blockTimestamp,
+        last.tickCumulative + tick * delta,
+        last.secondsPerLiquidityCumulativeX128
+        + ((delta << 128) // (liquidity if liquidity > 0 else 1)),
+        True,
+    )
+
+
+### @notice Initialize the oracle array by writing the first slot. Called once for the lifecycle of the observations array
+### @param self The stored oracle array
+### @param time The time of the oracle initialization
+### @return cardinality The number of populated elements in the oracle array
+### @return cardinalityNext The new length of the oracle array, independent of population
+def initialize(self, time):
+    self[0] = Observation(time, 0, 0, True)
+    return (1, len(self))
+
+
+### @notice Writes an oracle observation to the array
+### @dev Writable at most once per block. Index represents the most recently written element. cardinality and index must be tracked externally.
+### If the index is at the end of the allowable array length (according to cardinality), and the next cardinality
+### is greater than the current one, cardinality may be increased. This restriction is created to preserve ordering.
+### @param self The stored oracle array
+### @param index The index of the observation that was most recently written to the observations array
+### @param blockTimestamp The timestamp of the new observation
+### @param tick The active tick at the time of the new observation
+### @param liquidity The total in-range liquidity at the time of the new observation
+### @param cardinality The number of populated elements in the oracle array
+### @param cardinalityNext The new length of the oracle array, independent of population
+### @return indexUpdated The new index of the most recently written element in the oracle array
+### @return cardinalityUpdated The new cardinality of the oracle array
+def write(self, index, blockTimestamp, tick, liquidity, cardinality, cardinalityNext):
+    last = self[index]
+
+    ## early return if we've already written an observation this block
+    if last.blockTimestamp == blockTimestamp:
+        return (index, cardinality)
+
+    ## if the conditions are right, we can bump the cardinality
+    if cardinalityNext > cardinality and index == (cardinality - 1):
+        cardinalityUpdated = cardinalityNext
+    else:
+        cardinalityUpdated = cardinality
+
+    indexUpdated = (index + 1) % cardinalityUpdated
+    self[indexUpdated] = transform(last, blockTimestamp, tick, liquidity)
+    return (indexUpdated, cardinalityUpdated)
+
+
+### @notice Fetches the observations beforeOrAt and atOrAfter a target, i.e. where [beforeOrAt, atOrAfter] is satisfied.
+### The result may be the same observation, or adjacent observations.
+### @dev The answer must be contained in the array, used when the target is located within the stored observation
+### boundaries: older than the most recent observation and younger, or the same age as, the oldest observation
+### @param self The stored oracle array
+### @param target The timestamp at which the reserved observation should be for
+### @param index The index of the observation that was most recently written to the observations array
+### @param cardinality The number of populated elements in the oracle array
+### @return beforeOrAt The observation recorded before, or at, the target
+### @return atOrAfter The observation recorded at, or after, the target
+def binarySearch(self, target, index, cardinality):
+    l = (index + 1) % cardinality  ## oldest observation
+    r = l + cardinality - 1  ## newest observation
+    while True:
+        i = (l + r) // 2
+
+        beforeOrAt = self[i % cardinality]
+
+        ## we've landed on an uninitialized tick, keep searching higher (more recently)
+        if not beforeOrAt.initialized:
+            l = i + 1
+            continue
+
+        atOrAfter = self[(i + 1) % cardinality]
+
+        targetAtOrAfter = beforeOrAt.blockTimestamp <= target
+
+        ## check if we've found the answer!
+        if targetAtOrAfter and target <= atOrAfter.blockTimestamp:
+            return (beforeOrAt, atOrAfter)
+
+        if not targetAtOrAfter:
+            r = i - 1
+        else:
+            l = i + 1
+
+
+### @notice Fetches the observations beforeOrAt and atOrAfter a given target, i.e. where [beforeOrAt, atOrAfter] is satisfied
+### @dev Assumes there is at least 1 initialized observation.
+### Used by observeSingle() to compute the counterfactual accumulator values as of a given block timestamp.
+### @param self The stored oracle array
+### @param target The timestamp at which the reserved observation should be for
+### @param tick The active tick at the time of the returned or simulated observation
+### @param index The index of the observation that was most recently written to the observations array
+### @param liquidity The total pool liquidity at the time of the call
+### @param cardinality The number of populated elements in the oracle array
+### @return beforeOrAt The observation which occurred at, or before, the given timestamp
+### @return atOrAfter The observation which occurred at, or after, the given timestamp
+def getSurroundingObservations(self, target, tick, index, liquidity, cardinality):
+    ## optimistically set before to the newest observation
+    beforeOrAt = self[index]
+
+    ## if the target is chronologically at or after the newest observation, we can early return
+    if beforeOrAt.blockTimestamp <= target:
+        if beforeOrAt.blockTimestamp == target:
+            ## if newest observation equals target, we're in the same block, so we can ignore atOrAfter
+            return (beforeOrAt, beforeOrAt)
+        else:
+            ## otherwise, we need to transform
+            return (beforeOrAt, transform(beforeOrAt, target, tick, liquidity))
+
+    ## now, set before to the oldest observation
+    beforeOrAt = self[(index + 1) % cardinality]
+    if not beforeOrAt.initialized:
+        beforeOrAt = self[0]
+
+    ## ensure that the target is chronologically at or after the oldest observation
+    assert beforeOrAt.blockTimestamp <= target, "OLD"
+
+    ## if we've reached this point, we have to binary search
+    return binarySearch(self, target, index, cardinality)
+
+
+### @dev Reverts if an observation at or before the desired observation timestamp does not exist.
+### 0 may be passed as `secondsAgo' to return the current cumulative values.
+### If called with a timestamp falling between two observations, returns the counterfactual accumulator values
+### at exactly the timestamp between the two observations.
+### @param self The stored oracle array
+### @param time The current block timestamp
+### @param secondsAgo The amount of time to look back, in seconds, at which point to return an observation
+### @param tick The current tick
+### @param index The index of the observation that was most recently written to the observations array
+### @param liquidity The current in-range pool liquidity
+### @param cardinality The number of populated elements in the oracle array
+### @return tickCumulative The tick * time elapsed since the pool was first initialized, as of `secondsAgo`
+### @return secondsPerLiquidityCumulativeX128 The time elapsed / max(1, liquidity) since the pool was first initialized, as of `secondsAgo`
+def observeSingle(self, time, secondsAgo, tick, index, liquidity, cardinality):
+    if secondsAgo == 0:
+        last = self[index]
+        if last.blockTimestamp != time:
+            last = transform(last, time, tick, liquidity)
+        return (last.tickCumulative, last.secondsPerLiquidityCumulativeX128)
+
+    target = time - secondsAgo
+
+    (beforeOrAt, atOrAfter) = getSurroundingObservations(
+        self, target, tick, index, liquidity, cardinality
+    )
+
+    if target == beforeOrAt.blockTimestamp:
+        ## we're at the left boundary
+        return (beforeOrAt.tickCumulative, beforeOrAt.secondsPerLiquidityCumulativeX128)
+    elif target == atOrAfter.blockTimestamp:
+        ## we're at the right boundary
+        return (atOrAfter.tickCumulative, atOrAfter.secondsPerLiquidityCumulativeX128)
+    else:
+        ## we're in the middle
+        observationTimeDelta = atOrAfter.blockTimestamp - beforeOrAt.blockTimestamp
+        targetDelta = target - beforeOrAt.blockTimestamp
+        # Solidity int56 division truncates towards zero
+        tickCumulativeDelta = atOrAfter.tickCumulative - beforeOrAt.tickCumulative
+        tickStep = abs(tickCumulativeDelta) // observationTimeDelta
+        tickStep = tickStep if tickCumulativeDelta >= 0 else -tickStep
+        return (
+            beforeOrAt.tickCumulative + tickStep * targetDelta,
+            beforeOrAt.secondsPerLiquidityCumulativeX128
+            + (
+                (atOrAfter.secondsPerLiquidityCumulativeX128 - beforeOrAt.secondsPerLiquidityCumulativeX128)
+                * targetDelta
+            )
+            // observationTimeDelta,
+        )
+
+
+### @notice Returns the accumulator values as of each time seconds ago from the given time in the array of `secondsAgos`
+### @dev Reverts if `secondsAgos` > oldest observation
+### @param self The stored oracle array
+### @param time The current block timestamp
+### @param secondsAgos Each amount of time to look back, in seconds, at which point to return an observation
+### @param tick The current tick
+### @param index The index of the observation that was most recently written to the observations array
+### @param liquidity The current in-range pool liquidity
+### @param cardinality The number of populated elements in the oracle array
+### @return tickCumulatives The tick * time elapsed since the pool was first initialized, as of each `secondsAgo`
+### @return secondsPerLiquidityCumulativeX128s The cumulative seconds / max(1, liquidity) since the pool was first initialized, as of each `secondsAgo`
+def observe(self, time, secondsAgos, tick, index, liquidity, cardinality):
+    assert cardinality > 0, "I"
+
+    tickCumulatives = [0] * len(secondsAgos)
+    secondsPerLiquidityCumulativeX128s = [0] * len(secondsAgos)
+    for i in range(len(secondsAgos)):
+        (tickCumulatives[i], secondsPerLiquidityCumulativeX128s[i]) = observeSingle(
+            self, time, secondsAgos[i], tick, index, liquidity, cardinality
+        )
+    return (tickCumulatives, secondsPerLiquidityCumulativeX128s)
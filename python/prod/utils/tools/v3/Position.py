@@ -24,6 +24,96 @@ class PositionInfo:
     tokensOwed1: int
 
 
+### @notice Key of a position in the positions mapping
+### @dev The exact (owner, tickLower, tickUpper) tuple, so keys cannot collide and can be enumerated
+### @param owner The address of the position owner
+### @param tickLower The lower tick boundary of the position
+### @param tickUpper The upper tick boundary of the position
+### @return key The position key
+def positionKey(owner, tickLower, tickUpper):
+    return (owner, tickLower, tickUpper)
+
+
+### @notice Positions mapping with secondary indexes by owner and by tick range
+### @dev byOwner maps an owner, and byRange a (tickLower, tickUpper) pair, to the keys of its positions
+### (dicts used as insertion ordered sets); they are kept in step by every insert and delete.
+class PositionRegistry(dict):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.byOwner = {}
+        self.byRange = {}
+        for key in dict.keys(self):
+            self._index(key)
+
+    def __setitem__(self, key, info):
+        if not dict.__contains__(self, key):
+            self._index(key)
+        dict.__setitem__(self, key, info)
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self._unindex(key)
+
+    def __reduce__(self):
+        # Rebuild from a plain dict so copies (i.e. copy.deepcopy of a pool) rebuild the indexes
+        return (self.__class__, (dict(self),))
+
+    def copy(self):
+        return self.__class__(self)
+
+    def update(self, *args, **kwargs):
+        for key, info in dict(*args, **kwargs).items():
+            self[key] = info
+
+    def setdefault(self, key, info=None):
+        if not dict.__contains__(self, key):
+            self[key] = info
+        return dict.__getitem__(self, key)
+
+    def pop(self, key, *default):
+        if dict.__contains__(self, key):
+            info = dict.__getitem__(self, key)
+            del self[key]
+            return info
+        return dict.pop(self, key, *default)
+
+    def popitem(self):
+        (key, info) = dict.popitem(self)
+        self._unindex(key)
+        return (key, info)
+
+    def clear(self):
+        dict.clear(self)
+        self.byOwner.clear()
+        self.byRange.clear()
+
+    ### @notice Keys of the positions of an owner
+    ### @param owner The address of the position owner
+    ### @return keys The (owner, tickLower, tickUpper) keys, in creation order
+    def ownerPositions(self, owner):
+        return list(self.byOwner.get(owner, ()))
+
+    ### @notice Keys of the positions over a tick range
+    ### @param tickLower The lower tick boundary of the positions
+    ### @param tickUpper The upper tick boundary of the positions
+    ### @return keys The (owner, tickLower, tickUpper) keys, in creation order
+    def rangePositions(self, tickLower, tickUpper):
+        return list(self.byRange.get((tickLower, tickUpper), ()))
+
+    def _index(self, key):
+        (owner, tickLower, tickUpper) = key
+        self.byOwner.setdefault(owner, {})[key] = None
+        self.byRange.setdefault((tickLower, tickUpper), {})[key] = None
+
+    def _unindex(self, key):
+        (owner, tickLower, tickUpper) = key
+        for (index, indexKey) in ((self.byOwner, owner), (self.byRange, (tickLower, tickUpper))):
+            keys = index[indexKey]
+            del keys[key]
+            if not keys:
+                del index[indexKey]
+
+
 ### @notice Returns the Info struct of a position, given an owner and position boundaries
 ### @param self The mapping containing all user positions
 ### @param owner The address of the position owner
@@ -31,10 +121,11 @@ class PositionInfo:
 ### @param tickUpper The upper tick boundary of the position
 ### @return position The position info struct of the given owners' position
 def get(self, owner, tickLower, tickUpper):
-    checkInputTypes(account=owner, int24=(tickLower, tickUpper))
+    if kernelMode.checked:
+        checkInputTypes(account=owner, int24=(tickLower, tickUpper))
 
     # Need to handle non-existing positions in Python
-    key = hash((owner, tickLower, tickUpper))
+    key = positionKey(owner, tickLower, tickUpper)
     if not self.__contains__(key):
         # We don't want to create a new position if it doesn't exist!
         # In the case of collect we add an assert after that so it reverts.
@@ -45,7 +136,8 @@ def get(self, owner, tickLower, tickUpper):
 
 
 def assertPositionExists(self, owner, tickLower, tickUpper):
-    checkInputTypes(account=owner, int24=(tickLower, tickLower))
+    if kernelMode.checked:
+        checkInputTypes(account=owner, int24=(tickLower, tickLower))
     positionInfo = get(self, owner, tickLower, tickUpper)
     assert positionInfo != PositionInfo(0, 0, 0, 0, 0), "Position doesn't exist"
     return positionInfo
@@ -57,9 +149,10 @@ def assertPositionExists(self, owner, tickLower, tickUpper):
 ### @param feeGrowthInside0X128 The all-time fee growth in token0, per unit of liquidity, inside the position's tick boundaries
 ### @param feeGrowthInside1X128 The all-time fee growth in token1, per unit of liquidity, inside the position's tick boundaries
 def update(self, liquidityDelta, feeGrowthInside0X128, feeGrowthInside1X128):
-    checkInputTypes(
-        int128=(liquidityDelta), uint256=(feeGrowthInside0X128, feeGrowthInside1X128)
-    )
+    if kernelMode.checked:
+        checkInputTypes(
+            int128=(liquidityDelta), uint256=(feeGrowthInside0X128, feeGrowthInside1X128)
+        )
 
     if liquidityDelta == 0:
         # Removed because a check is added for burn 0 uninitialized position
@@ -0,0 +1,107 @@
+# Copyright [2024] [Ian Moore]
+# Distributed under the MIT License (license terms are at http://opensource.org/licenses/MIT).
+# Email: defipy.devs@gmail.com
+
+import numpy as np
+
+GWEI_PRECISION = 18
+
+### @title Precision
+### @notice Conversions between human (decimal) token amounts and machine (gwei) integer amounts
+### @dev Scale factors are precomputed once per precision. The exact functions give the same results
+### as the Decimal(str(x)) round trip they replace without building Decimal objects: the decimal string
+### of the amount is parsed into an integer mantissa and a power of ten, and the rest is integer arithmetic
+### (int / int true division is correctly rounded in python).
+
+## 10**p as int, and as float64 (exact up to p = 22)
+SCALES = [10**p for p in range(78)]
+FLOAT_SCALES = [float(10**p) for p in range(78)]
+
+
+### @notice Power of ten lookup
+### @param exponent Non-negative exponent
+### @return 10**exponent
+def scale(exponent):
+    return SCALES[exponent] if exponent < 78 else 10**exponent
+
+
+### @notice Parses the decimal string of an amount (int, float, numpy scalar or Decimal)
+### @param amount The amount to parse
+### @return digits Signed integer mantissa
+### @return exponent Power of ten, amount == digits * 10**exponent
+def parseDecimal(amount):
+    mantissa = str(amount)
+    exponent = 0
+    if "e" in mantissa or "E" in mantissa:
+        (mantissa, _, exponent) = mantissa.replace("E", "e").partition("e")
+        exponent = int(exponent)
+    (whole, _, fraction) = mantissa.partition(".")
+    return (int(whole + fraction), exponent - len(fraction))
+
+
+### @notice Exact human to machine conversion, truncated towards zero
+### @param amount The human amount
+### @param precision The number of decimals of the machine amount
+### @return The machine amount as an int
+def decToGwei(amount, precision=GWEI_PRECISION):
+    if type(amount) == int:
+        return amount * scale(precision)
+    (digits, exponent) = parseDecimal(amount)
+    exponent += precision
+    if exponent >= 0:
+        return digits * scale(exponent)
+    truncated = abs(digits) // scale(-exponent)
+    return truncated if digits >= 0 else -truncated
+
+
+### @notice Exact machine to human conversion, correctly rounded to the nearest float
+### @param amount The machine amount
+### @param precision The number of decimals of the machine amount
+### @return The human amount as a float
+def gweiToDec(amount, precision=GWEI_PRECISION):
+    if type(amount) == int:
+        return amount / scale(precision)
+    (digits, exponent) = parseDecimal(amount)
+    exponent -= precision
+    if exponent >= 0:
+        return float(digits * scale(exponent))
+    return digits / scale(-exponent)
+
+
+### @notice Float64 human to machine conversion
+### @dev One rounding of amount * 10**precision (exact scale for precision <= 22) before truncation:
+### the result is within |amount| * 10**precision * 2**-53 + 1 of decToGwei
+### @param amount The human amount
+### @param precision The number of decimals of the machine amount
+### @return The machine amount as an int
+def decToGweiFloat(amount, precision=GWEI_PRECISION):
+    return int(amount * FLOAT_SCALES[precision])
+
+
+### @notice Float64 machine to human conversion
+### @dev At most two roundings (int amounts above 2**53 are rounded to float first): the relative error
+### to gweiToDec is below 2**-52 for precision <= 22
+### @param amount The machine amount
+### @param precision The number of decimals of the machine amount
+### @return The human amount as a float
+def gweiToDecFloat(amount, precision=GWEI_PRECISION):
+    return amount / FLOAT_SCALES[precision]
+
+
+### @notice Vectorized decToGweiFloat
+### @dev Same error bound as decToGweiFloat; machine amounts do not fit int64 in general, so they are
+### returned as whole float64 values
+### @param amounts Array-like of human amounts
+### @param precision The number of decimals of the machine amounts
+### @return numpy float64 array of truncated machine amounts
+def decToGweiArray(amounts, precision=GWEI_PRECISION):
+    return np.trunc(np.asarray(amounts, dtype=float) * FLOAT_SCALES[precision])
+
+
+### @notice Vectorized gweiToDecFloat
+### @dev Same error bound as gweiToDecFloat
+### @param amounts Array-like of machine amounts (ints of any size, or floats)
+### @param precision The number of decimals of the machine amounts
+### @return numpy float64 array of human amounts
+def gweiToDecArray(amounts, precision=GWEI_PRECISION):
+    return np.asarray(amounts, dtype=float) / FLOAT_SCALES[precision]
@@ -16,7 +16,8 @@ from . import TickMath
 ### @param y The addend
 ### @return z The sum of x and y
 def add(x, y):
-    checkInputTypes(uint256=(x, y))
+    if kernelMode.checked:
+        checkInputTypes(uint256=(x, y))
     z = x + y
     assert z <= TickMath.MAX_UINT256
     return z
@@ -27,7 +28,8 @@ def add(x, y):
 ### @param y The subtrahend
 ### @return z The difference of x and y
 def sub(x, y):
-    checkInputTypes(uint256=(x, y))
+    if kernelMode.checked:
+        checkInputTypes(uint256=(x, y))
     z = x - y
     assert z >= 0
     return z
@@ -38,7 +40,8 @@ def sub(x, y):
 ### @param y The multiplier
 ### @return z The product of x and y
 def mul(x, y):
-    checkInputTypes(uint256=(x, y))
+    if kernelMode.checked:
+        checkInputTypes(uint256=(x, y))
     z = x * y
     assert z <= TickMath.MAX_UINT256
     return z
@@ -49,7 +52,8 @@ def mul(x, y):
 ### @param y The addend
 ### @return z The sum of x and y
 def addInts(x, y):
-    checkInputTypes(int256=(x, y))
+    if kernelMode.checked:
+        checkInputTypes(int256=(x, y))
     z = x + y
     assert z >= TickMath.MIN_INT256 and z <= TickMath.MAX_UINT256
     return z
@@ -60,7 +64,8 @@ def addInts(x, y):
 ### @param y The subtrahend
 ### @return z The difference of x and y
 def subInts(x, y):
-    checkInputTypes(int256=(x, y))
+    if kernelMode.checked:
+        checkInputTypes(int256=(x, y))
     z = x - y
     assert z >= TickMath.MIN_INT256 and z <= TickMath.MAX_UINT256
     return z
@@ -7,6 +7,11 @@
 
 from decimal import *
 from dataclasses import dataclass
+from bisect import bisect_left, bisect_right, insort
+from heapq import merge
+from contextlib import contextmanager
+from collections.abc import Mapping, MutableMapping
+from functools import wraps
 
 # ------------------ Constants ------------------ #
 
@@ -54,6 +59,286 @@ class TickInfo:
     feeGrowthOutside1X128: int
 
 
+# ------------------ Shared containers ------------------ #
+
+
+### @notice Mapping of initialized ticks (tick => TickInfo) that keeps its keys in sorted order
+### @dev Behaves as a regular dict; every insertion and deletion (e.g. from Tick.update and Tick.clear)
+### also updates sortedTicks, so the next initialized tick is found by bisection in O(log n) instead
+### of sorting all the keys on every swap step.
+class TickMap(dict):
+    ## optional LiquidityIndex maintained by Tick.update and Tick.clear
+    liquidityIndex = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sortedTicks = sorted(dict.keys(self))
+
+    def __setitem__(self, tick, info):
+        if not dict.__contains__(self, tick):
+            insort(self.sortedTicks, tick)
+        dict.__setitem__(self, tick, info)
+
+    def __delitem__(self, tick):
+        dict.__delitem__(self, tick)
+        del self.sortedTicks[bisect_left(self.sortedTicks, tick)]
+
+    def __reduce__(self):
+        # Rebuild from a plain dict so copies (i.e. copy.deepcopy of a pool) rebuild the sorted keys
+        return (self.__class__, (dict(self),))
+
+    def copy(self):
+        return self.__class__(self)
+
+    def update(self, *args, **kwargs):
+        for tick, info in dict(*args, **kwargs).items():
+            self[tick] = info
+
+    def setdefault(self, tick, info=None):
+        if not dict.__contains__(self, tick):
+            self[tick] = info
+        return dict.__getitem__(self, tick)
+
+    def pop(self, tick, *default):
+        if dict.__contains__(self, tick):
+            info = dict.__getitem__(self, tick)
+            del self[tick]
+            return info
+        return dict.pop(self, tick, *default)
+
+    def popitem(self):
+        (tick, info) = dict.popitem(self)
+        del self.sortedTicks[bisect_left(self.sortedTicks, tick)]
+        return (tick, info)
+
+    def clear(self):
+        dict.clear(self)
+        self.sortedTicks.clear()
+
+    ### @notice Inserts many new ticks with one merge of the sorted keys
+    ### @param ticks The new ticks, ascending and none of them in the mapping
+    ### @param infos Their TickInfo, in the same order
+    def insertMany(self, ticks, infos):
+        for tick, info in zip(ticks, infos):
+            dict.__setitem__(self, tick, info)
+        self.sortedTicks = list(merge(self.sortedTicks, ticks))
+
+    ### @notice Returns the next initialized tick to the left (lte) or to the right of the given tick
+    ### @dev If there is no initialized tick in the search direction the corresponding boundary tick is
+    ### returned together with initialized = False
+    ### @param tick The starting tick
+    ### @param lte Whether to search to the left (less than or equal to the starting tick)
+    ### @return next The next initialized tick, or MIN_TICK#MAX_TICK
+    ### @return initialized Whether the returned tick is initialized
+    def nextInitializedTick(self, tick, lte):
+        sortedTicks = self.sortedTicks
+        if lte:
+            if dict.__contains__(self, tick):
+                return tick, True
+            index = bisect_left(sortedTicks, tick)
+            if index == 0:
+                return MIN_TICK, False
+            return sortedTicks[index - 1], True
+        else:
+            index = bisect_right(sortedTicks, tick)
+            if index == len(sortedTicks):
+                return MAX_TICK, False
+            return sortedTicks[index], True
+
+
+### @notice Tick mapping that stores the TickInfo fields in parallel (struct-of-arrays) lists
+### @dev sortedTicks holds the initialized ticks in ascending order and liquidityGross, liquidityNet,
+### feeGrowthOutside0X128 and feeGrowthOutside1X128 hold their fields at the same index, so no TickInfo
+### object is kept per tick. store[tick] returns a TickView that reads and writes the lists, which lets
+### Tick.update, Tick.cross and Tick.getFeeGrowthInside use it exactly like a TickMap.
+class TickArrayStore(MutableMapping):
+    FIELDS = ("liquidityGross", "liquidityNet", "feeGrowthOutside0X128", "feeGrowthOutside1X128")
+    ## optional LiquidityIndex maintained by Tick.update and Tick.clear
+    liquidityIndex = None
+
+    def __init__(self, ticks=None):
+        self.sortedTicks = []
+        self.liquidityGross = []
+        self.liquidityNet = []
+        self.feeGrowthOutside0X128 = []
+        self.feeGrowthOutside1X128 = []
+        if ticks != None:
+            self.update(ticks)
+
+    ### @notice Returns the array index of an initialized tick, raises KeyError if it is not initialized
+    def index(self, tick):
+        sortedTicks = self.sortedTicks
+        index = bisect_left(sortedTicks, tick)
+        if index == len(sortedTicks) or sortedTicks[index] != tick:
+            raise KeyError(tick)
+        return index
+
+    def __contains__(self, tick):
+        sortedTicks = self.sortedTicks
+        index = bisect_left(sortedTicks, tick)
+        return index != len(sortedTicks) and sortedTicks[index] == tick
+
+    def __getitem__(self, tick):
+        self.index(tick)
+        return TickView(self, tick)
+
+    def __setitem__(self, tick, info):
+        sortedTicks = self.sortedTicks
+        index = bisect_left(sortedTicks, tick)
+        if index == len(sortedTicks) or sortedTicks[index] != tick:
+            sortedTicks.insert(index, tick)
+            self.liquidityGross.insert(index, info.liquidityGross)
+            self.liquidityNet.insert(index, info.liquidityNet)
+            self.feeGrowthOutside0X128.insert(index, info.feeGrowthOutside0X128)
+            self.feeGrowthOutside1X128.insert(index, info.feeGrowthOutside1X128)
+        else:
+            self.liquidityGross[index] = info.liquidityGross
+            self.liquidityNet[index] = info.liquidityNet
+            self.feeGrowthOutside0X128[index] = info.feeGrowthOutside0X128
+            self.feeGrowthOutside1X128[index] = info.feeGrowthOutside1X128
+
+    def __delitem__(self, tick):
+        index = self.index(tick)
+        del self.sortedTicks[index]
+        del self.liquidityGross[index]
+        del self.liquidityNet[index]
+        del self.feeGrowthOutside0X128[index]
+        del self.feeGrowthOutside1X128[index]
+
+    ### @notice Same as TickMap.insertMany, merging the new rows into the field lists
+    def insertMany(self, ticks, infos):
+        FIELDS = self.FIELDS
+        rows = merge(
+            zip(self.sortedTicks, *(getattr(self, field) for field in FIELDS)),
+            ((tick,) + tuple(getattr(info, field) for field in FIELDS) for tick, info in zip(ticks, infos)),
+            key=lambda row: row[0],
+        )
+        columns = list(zip(*rows))
+        if not columns:
+            return
+        self.sortedTicks = list(columns[0])
+        for field, column in zip(FIELDS, columns[1:]):
+            setattr(self, field, list(column))
+
+    def __iter__(self):
+        return iter(list(self.sortedTicks))
+
+    def __len__(self):
+        return len(self.sortedTicks)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({dict(self.items())})"
+
+    ### @notice Same as TickMap.nextInitializedTick
+    def nextInitializedTick(self, tick, lte):
+        sortedTicks = self.sortedTicks
+        if lte:
+            index = bisect_right(sortedTicks, tick)
+            if index == 0:
+                return MIN_TICK, False
+            return sortedTicks[index - 1], True
+        else:
+            index = bisect_right(sortedTicks, tick)
+            if index == len(sortedTicks):
+                return MAX_TICK, False
+            return sortedTicks[index], True
+
+
+def tickViewField(name):
+    def getField(view):
+        store = view.store
+        return getattr(store, name)[store.index(view.tick)]
+
+    def setField(view, value):
+        store = view.store
+        getattr(store, name)[store.index(view.tick)] = value
+
+    return property(getField, setField)
+
+
+### @notice TickInfo-like accessor for one tick of a TickArrayStore
+### @dev The view only holds the tick, its fields are looked up on every access so it stays valid
+### while other ticks are inserted or removed. copy.copy(view) returns a detached TickInfo
+class TickView:
+    __slots__ = ("store", "tick")
+
+    liquidityGross = tickViewField("liquidityGross")
+    liquidityNet = tickViewField("liquidityNet")
+    feeGrowthOutside0X128 = tickViewField("feeGrowthOutside0X128")
+    feeGrowthOutside1X128 = tickViewField("feeGrowthOutside1X128")
+
+    def __init__(self, store, tick):
+        self.store = store
+        self.tick = tick
+
+    def __copy__(self):
+        store = self.store
+        index = store.index(self.tick)
+        return TickInfo(
+            store.liquidityGross[index],
+            store.liquidityNet[index],
+            store.feeGrowthOutside0X128[index],
+            store.feeGrowthOutside1X128[index],
+        )
+
+    def __eq__(self, other):
+        fields = TickArrayStore.FIELDS
+        try:
+            return all(getattr(self, name) == getattr(other, name) for name in fields)
+        except AttributeError:
+            return NotImplemented
+
+    def __repr__(self):
+        return repr(self.__copy__()).replace("TickInfo", "TickView", 1)
+
+
+# ------------------ Kernel validation mode ------------------ #
+
+
+### @notice Process-wide switch for the per-call input validation of the math kernels
+### @dev When checked is False the kernels (SwapMath, SqrtPriceMath, Tick, Position, TickMath, SafeMath)
+### skip checkInputTypes and run the same arithmetic, so results are unchanged for valid inputs.
+### Range asserts that mimic Solidity reverts (overflow, underflow, price limits) are always kept.
+@dataclass
+class KernelMode:
+    checked: bool = True
+
+
+kernelMode = KernelMode()
+
+
+### @notice Enables or disables kernel input validation for the whole process
+### @param checked Whether the kernels validate their inputs
+def setKernelChecks(checked):
+    kernelMode.checked = bool(checked)
+
+
+### @notice Runs the enclosed block with kernel input validation disabled
+### @dev The previous mode is restored on exit, also when the block reverts
+@contextmanager
+def trustedKernels():
+    checked = kernelMode.checked
+    kernelMode.checked = False
+    try:
+        yield
+    finally:
+        kernelMode.checked = checked
+
+
+### @notice Decorator for pool entry points (mint, burn, swap, collect)
+### @dev The entry point validates its own arguments; when the pool is trusted the kernels it calls
+### then run unchecked for the duration of the call
+def trustedEntryPoint(fcn):
+    @wraps(fcn)
+    def entryPoint(self, *args, **kwargs):
+        if not self.trusted or not kernelMode.checked:
+            return fcn(self, *args, **kwargs)
+        with trustedKernels():
+            return fcn(self, *args, **kwargs)
+
+    return entryPoint
+
+
 # ------------------ Shared typechecking ------------------ #
 
 
@@ -105,7 +390,7 @@ def checkDecimal(input):
 
 
 def checkDict(input):
-    assert type(input) == dict
+    assert isinstance(input, Mapping)
 
 
 def checkAccount(address):
@@ -25,7 +25,8 @@ from . import SafeMath, FullMath
 ### @param add Whether to add or remove the amount of token0
 ### @return The price after adding or removing amount, depending on add
 def getNextSqrtPriceFromAmount0RoundingUp(sqrtPX96, liquidity, amount, add):
-    checkInputTypes(uint160=sqrtPX96, uint128=liquidity, uint256=amount, bool=add)
+    if kernelMode.checked:
+        checkInputTypes(uint160=sqrtPX96, uint128=liquidity, uint256=amount, bool=add)
     ## we short circuit amount == 0 because the result is otherwise not guaranteed to equal the input price
     if amount == 0:
         return sqrtPX96
@@ -71,7 +72,8 @@ def getNextSqrtPriceFromAmount0RoundingUp(sqrtPX96, liquidity, amount, add):
 ### @param add Whether to add, or remove, the amount of token1
 ### @return The price after adding or removing `amount`
 def getNextSqrtPriceFromAmount1RoundingDown(sqrtPX96, liquidity, amount, add):
-    checkInputTypes(uint160=sqrtPX96, uint128=liquidity, uint256=amount, bool=add)
+    if kernelMode.checked:
+        checkInputTypes(uint160=sqrtPX96, uint128=liquidity, uint256=amount, bool=add)
     ## if we're adding (subtracting), rounding down requires rounding the quotient down (up)
     ## in both cases, avoid a mulDiv for most inputs
     if add:
@@ -108,9 +110,10 @@ def getNextSqrtPriceFromAmount1RoundingDown(sqrtPX96, liquidity, amount, add):
 ### @param zeroForOne Whether the amount in is token0 or token1
 ### @return sqrtQX96 The price after adding the input amount to token0 or token1
 def getNextSqrtPriceFromInput(sqrtPX96, liquidity, amountIn, zeroForOne):
-    checkInputTypes(
-        uint160=sqrtPX96, uint128=liquidity, uint256=amountIn, bool=zeroForOne
-    )
+    if kernelMode.checked:
+        checkInputTypes(
+            uint160=sqrtPX96, uint128=liquidity, uint256=amountIn, bool=zeroForOne
+        )
     assert sqrtPX96 > 0
     assert liquidity > 0
 
@@ -132,9 +135,10 @@ def getNextSqrtPriceFromInput(sqrtPX96, liquidity, amountIn, zeroForOne):
 ### @param zeroForOne Whether the amount out is token0 or token1
 ### @return sqrtQX96 The price after removing the output amount of token0 or token1
 def getNextSqrtPriceFromOutput(sqrtPX96, liquidity, amountOut, zeroForOne):
-    checkInputTypes(
-        uint160=sqrtPX96, uint128=liquidity, uint256=amountOut, bool=zeroForOne
-    )
+    if kernelMode.checked:
+        checkInputTypes(
+            uint160=sqrtPX96, uint128=liquidity, uint256=amountOut, bool=zeroForOne
+        )
     assert sqrtPX96 > 0
     assert liquidity > 0
 
@@ -159,9 +163,10 @@ def getAmount0Delta(sqrtRatioAX96, sqrtRatioBX96, liquidity, roundUp):
 
     #print('Delta X')
     
-    checkInputTypes(
-        uint160=(sqrtRatioAX96, sqrtRatioBX96), uint128=liquidity, bool=roundUp
-    )
+    if kernelMode.checked:
+        checkInputTypes(
+            uint160=(sqrtRatioAX96, sqrtRatioBX96), uint128=liquidity, bool=roundUp
+        )
     if sqrtRatioAX96 > sqrtRatioBX96:
         (sqrtRatioAX96, sqrtRatioBX96) = (sqrtRatioBX96, sqrtRatioAX96)
 
@@ -189,9 +194,10 @@ def getAmount1Delta(sqrtRatioAX96, sqrtRatioBX96, liquidity, roundUp):
 
     #print('Delta Y')
     
-    checkInputTypes(
-        uint160=(sqrtRatioAX96, sqrtRatioBX96), uint128=liquidity, bool=roundUp
-    )
+    if kernelMode.checked:
+        checkInputTypes(
+            uint160=(sqrtRatioAX96, sqrtRatioBX96), uint128=liquidity, bool=roundUp
+        )
     if sqrtRatioAX96 > sqrtRatioBX96:
         (sqrtRatioAX96, sqrtRatioBX96) = (sqrtRatioBX96, sqrtRatioAX96)
 
@@ -211,7 +217,8 @@ def getAmount1Delta(sqrtRatioAX96, sqrtRatioBX96, liquidity, roundUp):
 ### @param liquidity The change in liquidity for which to compute the amount0 delta
 ### @return amount0 Amount of token0 corresponding to the passed liquidityDelta between the two prices
 def getAmount0DeltaHelper(sqrtRatioAX96, sqrtRatioBX96, liquidity):
-    checkInputTypes(uint160=(sqrtRatioAX96, sqrtRatioBX96), int128=liquidity)
+    if kernelMode.checked:
+        checkInputTypes(uint160=(sqrtRatioAX96, sqrtRatioBX96), int128=liquidity)
     if liquidity < 0:
         return -getAmount0Delta(sqrtRatioAX96, sqrtRatioBX96, abs(liquidity), False)
     else:
@@ -224,7 +231,8 @@ def getAmount0DeltaHelper(sqrtRatioAX96, sqrtRatioBX96, liquidity):
 ### @param liquidity The change in liquidity for which to compute the amount1 delta
 ### @return amount1 Amount of token1 corresponding to the passed liquidityDelta between the two prices
 def getAmount1DeltaHelper(sqrtRatioAX96, sqrtRatioBX96, liquidity):
-    checkInputTypes(uint160=(sqrtRatioAX96, sqrtRatioBX96), int128=liquidity)
+    if kernelMode.checked:
+        checkInputTypes(uint160=(sqrtRatioAX96, sqrtRatioBX96), int128=liquidity)
     if liquidity < 0:
         return -getAmount1Delta(sqrtRatioAX96, sqrtRatioBX96, abs(liquidity), False)
     else:
@@ -25,12 +25,13 @@ from .Shared import *
 def computeSwapStep(
     sqrtRatioCurrentX96, sqrtRatioTargetX96, liquidity, amountRemaining, feePips
 ):
-    checkInputTypes(
-        uint160=(sqrtRatioCurrentX96, sqrtRatioTargetX96),
-        uint128=liquidity,
-        int256=amountRemaining,
-        uint24=feePips,
-    )
+    if kernelMode.checked:
+        checkInputTypes(
+            uint160=(sqrtRatioCurrentX96, sqrtRatioTargetX96),
+            uint128=liquidity,
+            int256=amountRemaining,
+            uint24=feePips,
+        )
 
     zeroForOne = sqrtRatioCurrentX96 >= sqrtRatioTargetX96
 
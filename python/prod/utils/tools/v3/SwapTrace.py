@@ -0,0 +1,137 @@
+# Copyright [2024] [Ian Moore]
+# Distributed under the MIT License (license terms are at http://opensource.org/licenses/MIT).
+# Email: defipy.devs@gmail.com
+
+import numpy as np
+
+TRACE_DTYPE = np.dtype([
+    ('swap', np.int64),
+    ('step', np.int32),
+    ('sqrtPriceStartX96', np.float64),
+    ('sqrtPriceNextX96', np.float64),
+    ('sqrtPriceX96', np.float64),
+    ('tickNext', np.int32),
+    ('initialized', np.bool_),
+    ('amountIn', np.float64),
+    ('amountOut', np.float64),
+    ('feeAmount', np.float64),
+    ('liquidity', np.float64),
+])
+
+class SwapTrace():
+
+    """ SwapTrace
+
+        Per-step record of the V3 swap loop, kept in one preallocated NumPy column per field of
+        TRACE_DTYPE. A row is written for every step of every traced swap: the sqrt price at the
+        start of the step, the price of the next tick, the price reached, the next tick and whether
+        it is initialized, the amounts swapped in and out, the fee and the liquidity in range during
+        the step. Prices, amounts and liquidity are stored as float64 (relative error 2**-53), which
+        is enough to diagnose slippage. Columns double when full; clear() keeps them for reuse.
+
+        Parameters
+        -----------------
+        capacity : int
+            Number of steps preallocated
+    """
+
+    def __init__(self, capacity = 256):
+        assert capacity > 0, 'SwapTrace: INVALID_CAPACITY'
+        self.columns = {name : np.zeros(capacity, dtype=TRACE_DTYPE[name]) for name in TRACE_DTYPE.names}
+        self.capacity = capacity
+        self.n_steps = 0
+        self.n_swaps = 0
+        self.step = 0
+
+    def __len__(self):
+        return self.n_steps
+
+    def begin_swap(self):
+
+        """ begin_swap
+
+            Start a new swap; its steps are numbered from 0
+        """
+
+        self.n_swaps += 1
+        self.step = 0
+
+    def record(self, sqrtPriceStartX96, sqrtPriceNextX96, sqrtPriceX96, tickNext, initialized,
+               amountIn, amountOut, feeAmount, liquidity):
+
+        """ record
+
+            Append one step of the current swap
+        """
+
+        k = self.n_steps
+        if k == self.capacity:
+            self._grow()
+        columns = self.columns
+        columns['swap'][k] = self.n_swaps - 1
+        columns['step'][k] = self.step
+        columns['sqrtPriceStartX96'][k] = sqrtPriceStartX96
+        columns['sqrtPriceNextX96'][k] = sqrtPriceNextX96
+        columns['sqrtPriceX96'][k] = sqrtPriceX96
+        columns['tickNext'][k] = tickNext
+        columns['initialized'][k] = initialized
+        columns['amountIn'][k] = amountIn
+        columns['amountOut'][k] = amountOut
+        columns['feeAmount'][k] = feeAmount
+        columns['liquidity'][k] = liquidity
+        self.n_steps = k + 1
+        self.step += 1
+
+    def clear(self):
+
+        """ clear
+
+            Drop the recorded steps, keeping the allocated columns
+        """
+
+        self.n_steps = 0
+        self.n_swaps = 0
+        self.step = 0
+
+    def column(self, name):
+
+        """ column
+
+            Recorded values of one field
+
+            Parameters
+            -----------------
+            name : str
+                Field of TRACE_DTYPE
+
+            Returns
+            -------
+            column : numpy.ndarray
+                View of the first len(self) values
+        """
+
+        return self.columns[name][:self.n_steps]
+
+    def to_records(self):
+
+        """ to_records
+
+            Export the recorded steps
+
+            Returns
+            -------
+            records : numpy.ndarray
+                Structured array of dtype TRACE_DTYPE, one row per step (a copy)
+        """
+
+        records = np.empty(self.n_steps, dtype=TRACE_DTYPE)
+        for name in TRACE_DTYPE.names:
+            records[name] = self.columns[name][:self.n_steps]
+        return records
+
+    def _grow(self):
+        for name, column in self.columns.items():
+            grown = np.zeros(2*self.capacity, dtype=column.dtype)
+            grown[:self.capacity] = column
+            self.columns[name] = grown
+        self.capacity *= 2
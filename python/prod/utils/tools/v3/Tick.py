@@ -37,11 +37,12 @@ def tickSpacingToMaxLiquidityPerTick(tickSpacing):
 def getFeeGrowthInside(
     self, tickLower, tickUpper, tickCurrent, feeGrowthGlobal0X128, feeGrowthGlobal1X128
 ):
-    checkInputTypes(
-        dict=self,
-        int24=(tickLower, tickUpper, tickCurrent),
-        uint256=(feeGrowthGlobal0X128, feeGrowthGlobal1X128),
-    )
+    if kernelMode.checked:
+        checkInputTypes(
+            dict=self,
+            int24=(tickLower, tickUpper, tickCurrent),
+            uint256=(feeGrowthGlobal0X128, feeGrowthGlobal1X128),
+        )
 
     # Assumption that the key (tick) exists
     lower = self[tickLower]
@@ -95,15 +96,17 @@ def update(
     upper,
     maxLiquidity,
 ):
-    checkInputTypes(
-        dict=self,
-        int24=(tick, tickCurrent),
-        int128=liquidityDelta,
-        uint256=(feeGrowthGlobal0X128, feeGrowthGlobal1X128),
-        bool=upper,
-        uint128=maxLiquidity,
-    )
+    if kernelMode.checked:
+        checkInputTypes(
+            dict=self,
+            int24=(tick, tickCurrent),
+            int128=liquidityDelta,
+            uint256=(feeGrowthGlobal0X128, feeGrowthGlobal1X128),
+            bool=upper,
+            uint128=maxLiquidity,
+        )
     # Tick might not exist - create it. Make sure tick is not created unless it is then initialized with liquidityDelta > 0
+    # (inserting into a TickMap also adds the tick to its sorted index)
     if not self.__contains__(tick):
         assert liquidityDelta > 0, "Avoid creating empty tick"
         insertUninitializedTickstoMapping(self, [tick])
@@ -133,16 +136,76 @@ def update(
         info.liquidityNet = SafeMath.addInts(info.liquidityNet, liquidityDelta)
         checkInt128(info.liquidityNet)
 
+    ## keep the active liquidity index of the mapping, if any, in step
+    liquidityIndex = getattr(self, "liquidityIndex", None)
+    if liquidityIndex != None:
+        liquidityIndex.add(tick, -liquidityDelta if upper else liquidityDelta)
+
     # No longer require flip to signal if it has been initialized but it is needed for when it is cleared
     return flipped
 
 
+### @notice Adds liquidity to many ticks, with the same end state as one update per tick and position
+### @dev Existing ticks are updated in place and the new ones are inserted with a single merge into the
+### sorted keys (TickMap.insertMany, TickArrayStore.insertMany) instead of one insertion each. Every delta
+### is validated before any tick is written, so a failing call leaves the mapping unchanged
+### @param self The mapping containing all tick information for initialized ticks
+### @param deltas Mapping tick => (liquidityGrossDelta, liquidityNetDelta), with liquidityGrossDelta > 0
+### @param tickCurrent The current tick
+### @param feeGrowthGlobal0X128 The all-time global fee growth, per unit of liquidity, in token0
+### @param feeGrowthGlobal1X128 The all-time global fee growth, per unit of liquidity, in token1
+### @param maxLiquidity The maximum liquidity allocation for a single tick
+### @return newTicks The ticks that were initialized, ascending
+def updateMany(self, deltas, tickCurrent, feeGrowthGlobal0X128, feeGrowthGlobal1X128, maxLiquidity):
+    newTicks = []
+    updates = []
+    for tick, (liquidityGrossDelta, liquidityNetDelta) in deltas.items():
+        assert liquidityGrossDelta > 0, "Avoid creating empty tick"
+        if not self.__contains__(tick):
+            assert liquidityGrossDelta <= maxLiquidity, "LO"
+            checkInt128(liquidityNetDelta)
+            newTicks.append(tick)
+            continue
+        info = self[tick]
+        liquidityGrossAfter = LiquidityMath.addDelta(info.liquidityGross, liquidityGrossDelta)
+        assert liquidityGrossAfter <= maxLiquidity, "LO"
+        liquidityNetAfter = SafeMath.addInts(info.liquidityNet, liquidityNetDelta)
+        checkInt128(liquidityNetAfter)
+        updates.append((info, liquidityGrossAfter, liquidityNetAfter))
+
+    for info, liquidityGrossAfter, liquidityNetAfter in updates:
+        info.liquidityGross = liquidityGrossAfter
+        info.liquidityNet = liquidityNetAfter
+
+    newTicks.sort()
+    newInfos = []
+    for tick in newTicks:
+        (liquidityGross, liquidityNet) = deltas[tick]
+        ## by convention, we assume that all growth before a tick was initialized happened _below_ the tick
+        if tick <= tickCurrent:
+            newInfos.append(TickInfo(liquidityGross, liquidityNet, feeGrowthGlobal0X128, feeGrowthGlobal1X128))
+        else:
+            newInfos.append(TickInfo(liquidityGross, liquidityNet, 0, 0))
+    self.insertMany(newTicks, newInfos)
+
+    liquidityIndex = getattr(self, "liquidityIndex", None)
+    if liquidityIndex != None:
+        for tick, (_, liquidityNetDelta) in deltas.items():
+            liquidityIndex.add(tick, liquidityNetDelta)
+    return newTicks
+
+
 ### @notice Clears tick data
+### @dev Deleting the key also removes the tick from the sorted index of a TickMap
 ### @param self The mapping containing all initialized tick information for initialized ticks
 ### @param tick The tick that will be cleared
 def clear(self, tick):
-    checkInputTypes(dict=self, int24=tick)
+    if kernelMode.checked:
+        checkInputTypes(dict=self, int24=tick)
     # Assumption that the key (tick) exists (it should)
+    liquidityIndex = getattr(self, "liquidityIndex", None)
+    if liquidityIndex != None:
+        liquidityIndex.add(tick, -self[tick].liquidityNet)
     del self[tick]
 
 
@@ -160,11 +223,12 @@ def cross(
     feeGrowthGlobal0X128,
     feeGrowthGlobal1X128,
 ):
-    checkInputTypes(
-        dict=tickBitmap,
-        int24=tick,
-        uint256=(feeGrowthGlobal0X128, feeGrowthGlobal1X128),
-    )
+    if kernelMode.checked:
+        checkInputTypes(
+            dict=tickBitmap,
+            int24=tick,
+            uint256=(feeGrowthGlobal0X128, feeGrowthGlobal1X128),
+        )
     ## TickBitMap is passed by reference so all changes will be applied to the original dict
     ## TickBitMap = dict(uint256 tick => TickInfo)
     info = tickBitmap[tick]
@@ -6,14 +6,49 @@
 # - https://github.com/chainflip-io/chainflip-uniswapV3-python
 
 from .Shared import *
+from functools import lru_cache
+
+### Maximum number of ticks kept in the getSqrtRatioAtTick cache (least recently used are evicted)
+SQRT_RATIO_CACHE_SIZE = 2**16
 
 ### @notice Calculates sqrt(1.0001^tick) * 2^96
-### @dev Throws if |tick| > max tick
+### @dev Throws if |tick| > max tick. Results are served from a bounded LRU cache keyed by tick, which
+### returns exactly the same integers as computeSqrtRatioAtTick
 ### @param tick The input tick for the above formula
 ### @return sqrtPriceX96 A Fixed point Q64.96 number representing the sqrt of the ratio of the two assets (token1/token0)
 ### at the given tick
 def getSqrtRatioAtTick(tick):
-    checkInt24(tick)
+    # Type check before the cache lookup, otherwise a float equal to a cached tick would hit the cache
+    if kernelMode.checked:
+        checkInt24(tick)
+    return cachedSqrtRatioAtTick(tick)
+
+
+@lru_cache(maxsize=SQRT_RATIO_CACHE_SIZE)
+def cachedSqrtRatioAtTick(tick):
+    return computeSqrtRatioAtTick(tick)
+
+
+### @notice Fills the getSqrtRatioAtTick cache for the given ticks, e.g. the initialized ticks of a pool
+### @param ticks Iterable of ticks
+def preloadSqrtRatios(ticks):
+    for tick in ticks:
+        getSqrtRatioAtTick(tick)
+
+
+### @notice Hits, misses and size of the getSqrtRatioAtTick cache
+def sqrtRatioCacheInfo():
+    return cachedSqrtRatioAtTick.cache_info()
+
+
+def clearSqrtRatioCache():
+    cachedSqrtRatioAtTick.cache_clear()
+
+
+### @notice Uncached sqrt(1.0001^tick) * 2^96 (see getSqrtRatioAtTick)
+def computeSqrtRatioAtTick(tick):
+    if kernelMode.checked:
+        checkInt24(tick)
     absTick = abs(tick)
     assert absTick <= MAX_TICK, "T"
 
@@ -82,7 +117,8 @@ def getSqrtRatioAtTick(tick):
 ### @param sqrtPriceX96 The sqrt ratio for which to compute the tick as a Q64.96
 ### @return tick The greatest tick for which the ratio is less than or equal to the input ratio
 def getTickAtSqrtRatio(sqrtPriceX96):
-    checkUInt160(sqrtPriceX96)
+    if kernelMode.checked:
+        checkUInt160(sqrtPriceX96)
     ## second inequality must be < because the price can never reach the price at the max tick
     assert sqrtPriceX96 >= MIN_SQRT_RATIO and sqrtPriceX96 < MAX_SQRT_RATIO, "R"
     ratio = sqrtPriceX96 << 32
@@ -3,8 +3,8 @@
 # Email: defipy.devs@gmail.com
 
 import math
-from decimal import Decimal
 from . import TickMath
+from . import Precision
 
 Q96 = 2**96
 GWEI_PRECISION = 18
@@ -76,11 +76,11 @@ class UniV3Helper():
 
     def dec2gwei(self, tkn_amt, precision=None):
         precision = GWEI_PRECISION if precision == None else precision
-        return int(Decimal(str(tkn_amt))*Decimal(str(10**precision)))
+        return Precision.decToGwei(tkn_amt, precision)
     
     def gwei2dec(self, tkn_amt, precision=None):   
         precision = GWEI_PRECISION if precision == None else precision
-        return float(Decimal(str(tkn_amt))/Decimal(str(10**precision)))      
+        return Precision.gweiToDec(tkn_amt, precision)      
     
     def calc_Lx(self, p_sqrt_human, dx, lwr_tick, upr_tick):
         pa_sqrt_human = TickMath.getSqrtRatioAtTick(lwr_tick)/Q96
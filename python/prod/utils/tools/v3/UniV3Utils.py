@@ -114,7 +114,7 @@ class UniV3Utils():
     
     
     def getPositionKey(address, lowerTick, upperTick):
-        return hash((address, lowerTick, upperTick))
+        return (address, lowerTick, upperTick)
     
     
     def getLimitPositionKey(address, tick, isToken0):
@@ -5,7 +5,9 @@
 TEST_PATH = "python/test/defi/process/liquidity"
 
 import os
+import gc
 import sys
+import weakref
 import unittest   
 sys.path.append(os.getcwd().replace(TEST_PATH,""))
 
@@ -13,6 +15,10 @@ from python.prod.cpt.factory import UniswapFactory
 from python.prod.erc import ERC20
 from python.prod.utils.data import UniswapExchangeData
 from python.prod.cpt.quote import LPQuote
+from python.prod.cpt.quote import QuoteCache
+from python.prod.cpt.index import RebaseIndexToken
+from python.prod.cpt.index import SettlementLPToken
+from python.prod.cpt.vault import IndexVault
 import numpy as np 
 
 USER_NM = 'user0'
@@ -44,9 +50,81 @@ class Test_LPTokenQuote(unittest.TestCase):
                
         amt_lp = LPQuote(False).get_lp_from_amount(lp, sys1, 100)        
         self.assertEqual(round(amt_lp,8), round(15.83908989, 8))         
-   
+
+    def test_rebase_settlement_arrays(self):
+        
+        sys1 = ERC20("SYS", "0x09") 
+        dai1 = ERC20("DAI", "0x111")
+        lp = self.setup(sys1, dai1)
+
+        amts = np.array([100, 2000, 0.5])
+        liqs = SettlementLPToken().apply(lp, sys1, amts)
+        self.assertEqual(list(liqs), [SettlementLPToken().apply(lp, sys1, amt) for amt in amts])
+        tkn_amts = RebaseIndexToken().apply(lp, sys1, liqs)
+        self.assertEqual(list(tkn_amts), [RebaseIndexToken().apply(lp, sys1, liq) for liq in liqs])
+        np.testing.assert_allclose(tkn_amts, amts)
+
+        ivault = IndexVault('iVault', "0x7")
+        ivault.deposit_lp_tkn(USER_NM, lp, 100)
+        ivault.deposit_lp_tkn('user1', lp, 250)
+        ivault.update_accounts(lp, sys1)
+        self.assertEqual([ivault.lp_providers[user]['iSYS']['amount'] for user in [USER_NM, 'user1']],
+                         [RebaseIndexToken().apply(lp, sys1, liq) for liq in [100, 250]])
+
+    def test_quote_cache(self):
+
+        sys1 = ERC20("SYS", "0x09")
+        dai1 = ERC20("DAI", "0x111")
+        lp = self.setup(sys1, dai1)
+        cache = QuoteCache(maxsize = 2)
+
+        price = LPQuote(cache = cache).get_price(lp, sys1)
+        self.assertEqual(LPQuote(cache = cache).get_price(lp, sys1), price)
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+
+        version = lp.state_version
+        lp.swap_exact_tokens_for_tokens(1000, 0, sys1, USER_NM)
+        self.assertGreater(lp.state_version, version)
+        price = LPQuote(cache = cache).get_price(lp, sys1)
+        self.assertEqual(price, LPQuote(cache = QuoteCache(0)).get_price(lp, sys1))
+        self.assertEqual((cache.hits, cache.misses), (1, 6))
+        self.assertEqual(cache.info()['size'], 2)
+
+        version = lp.state_version
+        with self.assertRaises(AssertionError):
+            with lp.transaction():
+                lp.swap_exact_tokens_for_tokens(1000, 0, sys1, USER_NM)
+                assert False
+        self.assertGreater(lp.state_version, version)
+        self.assertEqual(LPQuote(cache = cache).get_price(lp, sys1), price)
+
         
           
+
+    def test_quote_cache_releasesPools(self):
+
+        cache = QuoteCache()
+        sys1 = ERC20("SYS", "0x09")
+        dai1 = ERC20("DAI", "0x111")
+        lp = self.setup(sys1, dai1)
+        other = self.setup(ERC20("SYS", "0x09"), ERC20("DAI", "0x111"))
+        sizes = []
+        for pool in [lp, other]:
+            LPQuote(cache = cache).get_price(pool, pool.factory.token_from_exchange[pool.name][pool.token0])
+            LPQuote().get_price(pool, pool.factory.token_from_exchange[pool.name][pool.token0])
+            sizes.append(cache.info()['size'])
+        self.assertEqual(sizes[1], 2*sizes[0])
+
+        # Quoting a pool does not keep it alive, and its quotes go with it
+        ref = weakref.ref(lp)
+        del lp, pool, sys1, dai1
+        gc.collect()
+        self.assertEqual(ref(), None)
+        self.assertEqual(cache.info()['size'], sizes[0])
+        self.assertEqual(list(cache.pool_keys), [id(other)])
+        self.assertEqual(LPQuote(cache = cache).get_price(other, other.factory.token_from_exchange[other.name][other.token0]),
+                         LPQuote(cache = QuoteCache(0)).get_price(other, other.factory.token_from_exchange[other.name][other.token0]))
+        self.assertEqual(cache.hits, 1)
         
 if __name__ == '__main__':
     unittest.main()                  
\ No newline at end of file
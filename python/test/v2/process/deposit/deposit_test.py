@@ -52,6 +52,20 @@ class Test_SwapDeposit(unittest.TestCase):
         self.assertEqual(round(deposit_amt,6), 10)    
         self.assertEqual(round(lp_tkn.reserve0,6), 1010.0) 
         self.assertEqual(round(lp_tkn.reserve1,6), 100000.0)
+
+    def test_deposit_gweiPrecision(self):
+        tkn = ERC20("TKN", "0x111")
+        eth = ERC20("ETH", "0x09")        
+        factory = UniswapFactory("ETH pool factory", "0x2")
+        exchg_data = UniswapExchangeData(tkn0 = eth, tkn1 = tkn, symbol="LP", address="0x011", 
+                                         precision = UniswapExchangeData.TYPE_GWEI)
+        lp_tkn = factory.deploy(exchg_data)
+        lp_tkn.add_liquidity(USER0, 1000, 100000, 1000, 100000)
+        deposit_amt = SwapDeposit().apply(lp_tkn, eth, USER0, 10)
+
+        self.assertEqual(type(lp_tkn).__name__, 'UniswapExchange')
+        self.assertEqual(round(deposit_amt,6), 10)    
+        self.assertEqual(round(lp_tkn.reserve0,6), 1010.0) 
                
 if __name__ == '__main__':
     unittest.main()
@@ -13,6 +13,7 @@ from python.prod.erc import ERC20
 from python.prod.cpt.factory import UniswapFactory
 from python.prod.process.swap import Swap
 from python.prod.utils.data import UniswapExchangeData
+import numpy as np
 
 USER0 = 'user0'
 USER1 = 'user1' 
@@ -43,5 +44,185 @@ class Test_Swap(unittest.TestCase):
         out = Swap().apply(lp_tkn, eth, USER0, 10)
         self.assertEqual(round(lp_tkn.reserve1,6), 99012.841966)
 
+    def test_swap_batch(self):
+        flags = np.array([True, False, False, True, True])
+        amounts = np.array([10, 1000, 250.5, 0.75, 3])
+        lps = []
+        for k in range(2):
+            tkn = ERC20("TKN", "0x111")
+            eth = ERC20("ETH", "0x09")        
+            lps.append((self.setup_lp(eth, tkn), eth, tkn))
+            
+        (lp_tkn, eth, tkn) = lps[0]
+        out = [Swap().apply(lp_tkn, eth if flag else tkn, USER1, amt) for (flag, amt) in zip(flags, amounts)]
+        (batch_lp_tkn, batch_eth, batch_tkn) = lps[1]
+        res = batch_lp_tkn.swap_batch(flags, amounts, USER1)
+        
+        self.assertEqual(list(res['amount_out']), out)
+        self.assertEqual((res['reserve0'][-1], res['reserve1'][-1]), (lp_tkn.reserve0, lp_tkn.reserve1))
+        self.assertEqual(res['price'][-1], lp_tkn.get_price(eth))
+        self.assertEqual((batch_eth.token_total, batch_tkn.token_total), (eth.token_total, tkn.token_total))
+        self.assertEqual((batch_lp_tkn.fee0_arr, batch_lp_tkn.fee1_arr), (lp_tkn.fee0_arr, lp_tkn.fee1_arr))
+        self.assertEqual((batch_lp_tkn.aggr_fee0, batch_lp_tkn.aggr_fee1), (lp_tkn.aggr_fee0, lp_tkn.aggr_fee1))
+
+    def test_swap_integer(self):
+        eth_amount = 1000*10**18
+        tkn_amount = 100000*10**18
+        lps = []
+        for k in range(2):
+            tkn = ERC20("TKN", "0x111")
+            eth = ERC20("ETH", "0x09")        
+            factory = UniswapFactory("ETH pool factory", "0x2")
+            exchg_data = UniswapExchangeData(tkn0 = eth, tkn1 = tkn, symbol="LP", address="0x011", 
+                                             engine = UniswapExchangeData.ENGINE_INTEGER)
+            lp_tkn = factory.deploy(exchg_data)
+            lp_tkn.add_liquidity(USER0, eth_amount, tkn_amount, eth_amount, tkn_amount)
+            lps.append((lp_tkn, eth, tkn))
+            
+        (lp_tkn, eth, tkn) = lps[0]
+        self.assertEqual(type(lp_tkn).__name__, 'UniswapIntegerExchange')
+        self.assertEqual(lp_tkn.liquidity_providers[USER0], 10000*10**18 - 1000)
+        amt_in = 10*10**18
+        amt_out = lp_tkn.swap_exact_tokens_for_tokens(amt_in, 0, eth, USER1)
+        self.assertEqual(amt_out, amt_in*997*tkn_amount//(eth_amount*1000 + amt_in*997))
+        self.assertEqual((lp_tkn.reserve0, lp_tkn.reserve1), (eth_amount + amt_in, tkn_amount - amt_out))
+        self.assertGreaterEqual(lp_tkn.reserve0*lp_tkn.reserve1, eth_amount*tkn_amount)
+
+        flags = [True, False, True]
+        amounts = [3*10**18, 777*10**18, 5]
+        out = [amt_out] + [lp_tkn.swap_exact_tokens_for_tokens(amt, 0, eth if flag else tkn, USER1) 
+                           for (flag, amt) in zip(flags, amounts)]
+        (batch_lp_tkn, batch_eth, batch_tkn) = lps[1]
+        res = batch_lp_tkn.swap_batch([True] + flags, [amt_in] + amounts, USER1)
+        self.assertEqual(list(res['amount_out']), out)
+        self.assertEqual((batch_lp_tkn.reserve0, batch_lp_tkn.reserve1), (lp_tkn.reserve0, lp_tkn.reserve1))
+        self.assertEqual((batch_eth.token_total, batch_tkn.token_total), (eth.token_total, tkn.token_total))
+
+        (amountA, amountB) = lp_tkn.remove_liquidity(USER0, 10**18, 0, 0)
+        self.assertEqual((type(amountA), type(amountB)), (int, int))
+
+        # Removing less than the fee adjusted amount in breaks K
+        eth.token_total += 10**18
+        with self.assertRaises(AssertionError):
+            lp_tkn.swap(0, 100*10**18, USER1)
+
+        # A first deposit that mints no liquidity does not mint the locked MINIMUM_LIQUIDITY either
+        factory = UniswapFactory("ETH pool factory", "0x2")
+        exchg_data = UniswapExchangeData(tkn0 = ERC20("ETH", "0x09"), tkn1 = ERC20("TKN", "0x111"), symbol="LP", 
+                                         address="0x011", engine = UniswapExchangeData.ENGINE_INTEGER)
+        lp_small = factory.deploy(exchg_data)
+        with self.assertRaises(AssertionError):
+            lp_small.add_liquidity(USER0, 1000, 1000, 1000, 1000)
+        self.assertEqual(lp_small.total_supply, 0)
+
+    def test_swap_integer_reverts(self):
+        lps = []
+        for k in range(2):
+            tkn = ERC20("TKN", "0x111")
+            eth = ERC20("ETH", "0x09")        
+            factory = UniswapFactory("ETH pool factory", "0x2")
+            exchg_data = UniswapExchangeData(tkn0 = eth, tkn1 = tkn, symbol="LP", address="0x011", 
+                                             engine = UniswapExchangeData.ENGINE_INTEGER)
+            lp_tkn = factory.deploy(exchg_data)
+            lp_tkn.add_liquidity(USER0, 1000*10**18, 100000*10**18, 1000*10**18, 100000*10**18)
+            lps.append((lp_tkn, eth, tkn))
+        (lp_tkn, eth, tkn) = lps[0]
+        state = lambda: (lp_tkn.reserve0, lp_tkn.reserve1, eth.token_total, tkn.token_total, lp_tkn.get_fees())
+
+        # Nothing paid in
+        expected = state()
+        with self.assertRaisesRegex(AssertionError, 'INSUFFICIENT_INPUT_AMOUNT'):
+            lp_tkn.swap(0, 100*10**18, USER1)
+        self.assertEqual(state(), expected)
+
+        # Less than the fee adjusted amount paid in
+        eth.token_total += 10**18
+        expected = state()
+        with self.assertRaisesRegex(AssertionError, 'UniswapV2: K'):
+            lp_tkn.swap(0, 100*10**18, USER1)
+        self.assertEqual(state(), expected)
+        eth.token_total -= 10**18
+
+        # Balances past uint112, through swap and through swap_exact_tokens_for_tokens
+        eth.token_total += 2**112
+        expected = state()
+        with self.assertRaisesRegex(AssertionError, 'OVERFLOW'):
+            lp_tkn.swap(0, 10**18, USER1)
+        self.assertEqual(state(), expected)
+        eth.token_total -= 2**112
+        expected = state()
+        with self.assertRaisesRegex(AssertionError, 'OVERFLOW'):
+            lp_tkn.swap_exact_tokens_for_tokens(2**112, 0, eth, USER1)
+        self.assertEqual(state(), expected)
+
+        # Wei amounts on both sides of 2**63
+        amounts = [10**18, 10**19]
+        out = [lp_tkn.swap_exact_tokens_for_tokens(amt, 0, eth if flag else tkn, USER1) 
+               for (flag, amt) in zip([True, False], amounts)]
+        (batch_lp_tkn, batch_eth, batch_tkn) = lps[1]
+        res = batch_lp_tkn.swap_batch([True, False], amounts, USER1)
+        self.assertEqual(list(res['amount_out']), out)
+        self.assertEqual((batch_lp_tkn.reserve0, batch_lp_tkn.reserve1), (lp_tkn.reserve0, lp_tkn.reserve1))
+        self.assertEqual((batch_eth.token_total, batch_tkn.token_total), (eth.token_total, tkn.token_total))
+
+    def test_fee_ledger(self):
+        tkn = ERC20("TKN", "0x111")
+        eth = ERC20("ETH", "0x09")        
+        factory = UniswapFactory("ETH pool factory", "0x2")
+        exchg_data = UniswapExchangeData(tkn0 = eth, tkn1 = tkn, symbol="LP", address="0x011", 
+                                         fee_history = 3)
+        lp_tkn = factory.deploy(exchg_data)
+        lp_tkn.add_liquidity(USER0, 1000, 100000, 1000, 100000)
+
+        fees = []
+        for (t, tkn_in, amt) in [(10, eth, 10), (10, tkn, 5000), (20, eth, 20), (30, tkn, 100), (40, eth, 1)]:
+            lp_tkn.set_block_timestamp(t)
+            Swap().apply(lp_tkn, tkn_in, USER0, amt)
+            fees.append(lp_tkn.last_fees())
+        (fees0, fees1) = zip(*fees)
+
+        self.assertEqual((lp_tkn.fee0_arr, lp_tkn.fee1_arr), (list(fees0[-3:]), list(fees1[-3:])))
+        self.assertEqual(lp_tkn.get_fees(), (lp_tkn.aggr_fee0, lp_tkn.aggr_fee1))
+        self.assertAlmostEqual(lp_tkn.get_fees(n_swaps = 2)[0], sum(fees0[-2:]))
+        self.assertAlmostEqual(lp_tkn.get_fees(since = 25)[1], sum(fees1[-2:]))
+        self.assertEqual(lp_tkn.get_fees(since = 50), (0, 0))
+        with self.assertRaises(AssertionError):
+            lp_tkn.get_fees(n_swaps = 4)
+        with self.assertRaises(AssertionError):
+            lp_tkn.get_fees(since = 20)
+
+        # Ring slots overwritten within a rolled back transaction are restored
+        state = (lp_tkn.fee0_arr, lp_tkn.fee1_arr, lp_tkn.get_fees())
+        with self.assertRaises(AssertionError):
+            with lp_tkn.transaction():
+                lp_tkn.swap_batch(np.array([True, False]), np.array([1, 100]), USER1)
+                assert False
+        self.assertEqual(state, (lp_tkn.fee0_arr, lp_tkn.fee1_arr, lp_tkn.get_fees()))
+        self.assertEqual(lp_tkn.last_fees(), (fees0[-1], fees1[-1]))
+
+    def test_observe_twap(self):
+        tkn = ERC20("TKN", "0x111")
+        eth = ERC20("ETH", "0x09")        
+        factory = UniswapFactory("ETH pool factory", "0x2")
+        exchg_data = UniswapExchangeData(tkn0 = eth, tkn1 = tkn, symbol="LP", address="0x011", 
+                                         observation_cardinality = 3)
+        lp_tkn = factory.deploy(exchg_data)
+        lp_tkn.add_liquidity(USER0, 1000, 100000, 1000, 100000)
+
+        prices = [lp_tkn.get_price(eth)]
+        for (t, tkn_in, amt) in [(10, eth, 10), (25, tkn, 5000), (45, eth, 20)]:
+            lp_tkn.set_block_timestamp(t)
+            Swap().apply(lp_tkn, tkn_in, USER0, amt)
+            prices.append(lp_tkn.get_price(eth))
+
+        # The oldest observation (t = 0) has been overwritten by the ring
+        lp_tkn.set_block_timestamp(60)
+        (price0_cumulatives, _) = lp_tkn.observe([0, 20, 50])
+        twap = (price0_cumulatives[0] - price0_cumulatives[2])/50
+        self.assertAlmostEqual(twap, (prices[1]*15 + prices[2]*20 + prices[3]*15)/50)
+        self.assertAlmostEqual(price0_cumulatives[1], prices[0]*10 + prices[1]*15 + prices[2]*15)
+        with self.assertRaises(AssertionError):
+            lp_tkn.observe([55])
+
 if __name__ == '__main__':
     unittest.main()                  
\ No newline at end of file
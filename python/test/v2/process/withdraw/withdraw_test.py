@@ -7,6 +7,7 @@ TEST_PATH = "python/test/process/liquidity"
 import os
 import sys
 import unittest   
+import numpy as np
 sys.path.append(os.getcwd().replace(TEST_PATH,""))
 
 from python.prod.erc import ERC20
@@ -43,5 +44,43 @@ class Test_Withdraw(unittest.TestCase):
         expected_amount_out = WithdrawSwap().apply(lp_tkn, tkn, USER0, 100)
         self.assertEqual(round(expected_amount_out,6), 100)  
 
+    def test_withdraw_batch(self):
+        lps = []
+        for k in range(2):
+            tkn = ERC20("TKN", "0x111")
+            eth = ERC20("ETH", "0x09")        
+            lps.append((self.setup_lp(eth, tkn), eth, tkn))
+
+        # Portions and expected output against the current pool state
+        (lp_tkn, eth, tkn) = lps[0]
+        (portions, expected) = WithdrawSwap().calc_withdraw_portions(lp_tkn, eth, [1, 0.5])
+        self.assertEqual(portions[1], WithdrawSwap()._calc_withdraw_portion(lp_tkn, eth, 0.5, None, None))
+        self.assertAlmostEqual(expected[0], 1)
+
+        # Executing batch matches successive withdrawals
+        out = [WithdrawSwap().apply(lp_tkn, eth, USER0, amt) for amt in [1, 0.5, 20]]
+        out += [WithdrawSwap().apply(lp_tkn, tkn, USER0, amt) for amt in [250, 3000]]
+        (batch_lp_tkn, batch_eth, batch_tkn) = lps[1]
+        batch_out = list(WithdrawSwap().apply_batch(batch_lp_tkn, batch_eth, USER0, np.array([1, 0.5, 20])))
+        batch_out += list(WithdrawSwap().apply_batch(batch_lp_tkn, batch_tkn, USER0, np.array([250, 3000])))
+        self.assertEqual(batch_out, out)
+        self.assertEqual((batch_lp_tkn.reserve0, batch_lp_tkn.reserve1, batch_lp_tkn.total_supply), 
+                         (lp_tkn.reserve0, lp_tkn.reserve1, lp_tkn.total_supply))
+        self.assertEqual(batch_lp_tkn.liquidity_providers, lp_tkn.liquidity_providers)
+
+    def test_withdraw_rollback(self):
+        tkn = ERC20("TKN", "0x111")
+        eth = ERC20("ETH", "0x09")        
+        lp_tkn = self.setup_lp(eth, tkn)
+        state = (lp_tkn.reserve0, lp_tkn.reserve1, lp_tkn.total_supply, dict(lp_tkn.liquidity_providers), 
+                 eth.token_total, tkn.token_total, list(lp_tkn.fee0_arr), list(lp_tkn.fee1_arr))
+        with self.assertRaises(AssertionError):
+            with lp_tkn.transaction():
+                WithdrawSwap().apply(lp_tkn, eth, USER0, 1)
+                lp_tkn.add_liquidity(USER1, 10, 1000, 10, 1000)
+                assert False
+        self.assertEqual(state, (lp_tkn.reserve0, lp_tkn.reserve1, lp_tkn.total_supply, dict(lp_tkn.liquidity_providers), 
+                                 eth.token_total, tkn.token_total, lp_tkn.fee0_arr, lp_tkn.fee1_arr))
+
 if __name__ == '__main__':
     unittest.main()                  
\ No newline at end of file
@@ -0,0 +1,79 @@
+# Copyright [2024] [Ian Moore]
+# Distributed under the MIT License (license terms are at http://opensource.org/licenses/MIT).
+# Email: defipy.devs@gmail.com
+
+TEST_PATH = "python/test/v2/simulate"
+
+import os
+import sys
+import unittest  
+import pytest
+import numpy as np 
+sys.path.append(os.getcwd().replace(TEST_PATH,""))
+
+from python.prod.erc import ERC20
+from python.prod.cpt.factory import UniswapFactory
+from python.prod.process.swap import Swap
+from python.prod.simulate import LPBacktest
+from python.prod.utils.data import UniswapExchangeData
+
+USER0 = 'user0'
+USER1 = 'user1' 
+
+class Test_LPBacktest(unittest.TestCase):
+   
+    def setup_lp(self, eth, tkn):
+        eth_amount = 1000
+        tkn_amount = 100000
+        factory = UniswapFactory("ETH pool factory", "0x2")
+        exchg_data = UniswapExchangeData(tkn0 = eth, tkn1 = tkn, symbol="LP", address="0x011")
+        lp_tkn = factory.deploy(exchg_data)
+        lp_tkn.add_liquidity(USER0, eth_amount, tkn_amount, eth_amount, tkn_amount)
+        return lp_tkn
+
+    def test_backtest_matchesSwaps(self):
+        tkn = ERC20("TKN", "0x111")
+        eth = ERC20("ETH", "0x09")        
+        lp_tkn = self.setup_lp(eth, tkn)
+        p_path = np.array([100, 120, 119.9, 90, 90.1, 150])
+        res = LPBacktest(lp_tkn).run(p_path)
+
+        # Replaying the arbitrage swaps on the pool gives the same reserves and fees
+        for t in range(len(p_path)):
+            if res['fee0'][t] > 0:
+                Swap().apply(lp_tkn, eth, USER1, res['fee0'][t]/0.003)
+            elif res['fee1'][t] > 0:
+                Swap().apply(lp_tkn, tkn, USER1, res['fee1'][t]/0.003)
+            self.assertAlmostEqual(lp_tkn.reserve0/res['reserve0'][t], 1, places=9)
+            self.assertAlmostEqual(lp_tkn.reserve1/res['reserve1'][t], 1, places=9)
+        self.assertAlmostEqual(lp_tkn.get_fees()[0], res['fee0'].sum())
+
+        # No trade inside the fee band, and the marginal price net of fee ends on the external price
+        self.assertEqual((res['fee0'][0], res['fee1'][0], res['fee0'][2], res['fee1'][2]), (0, 0, 0, 0))
+        self.assertAlmostEqual(0.997*res['reserve1'][3]/res['reserve0'][3], 90)
+        self.assertAlmostEqual(res['reserve1'][5]/(0.997*res['reserve0'][5]), 150)
+        self.assertTrue(np.all(res['il'][1:] < 0))
+
+    def test_backtest_paths(self):
+        tkn = ERC20("TKN", "0x111")
+        eth = ERC20("ETH", "0x09")        
+        lp_tkn = self.setup_lp(eth, tkn)
+        rng = np.random.default_rng(3)
+        p_paths = 100*np.exp(np.cumsum(rng.normal(0, 0.02, size=(4, 50)), axis=1))
+        res = LPBacktest(lp_tkn).run(p_paths)
+        for k in range(4):
+            path_res = LPBacktest(lp_tkn).run(p_paths[k])
+            for key in res:
+                self.assertTrue(np.array_equal(res[key][k], path_res[key]))
+        self.assertEqual((lp_tkn.reserve0, lp_tkn.reserve1), (1000, 100000))
+
+    def test_backtest_noLiquidity(self):
+        factory = UniswapFactory("ETH pool factory", "0x2")
+        exchg_data = UniswapExchangeData(tkn0 = ERC20("ETH", "0x09"), tkn1 = ERC20("TKN", "0x111"), 
+                                         symbol="LP", address="0x011")
+        lp_tkn = factory.deploy(exchg_data)
+        with self.assertRaises(AssertionError):
+            LPBacktest(lp_tkn)
+        
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+# Copyright [2024] [Ian Moore]
+# Distributed under the MIT License (license terms are at http://opensource.org/licenses/MIT).
+# Email: defipy.devs@gmail.com
+
+TEST_PATH = "python/test/v2/simulate"
+
+import os
+import sys
+import unittest  
+import pytest
+import numpy as np 
+sys.path.append(os.getcwd().replace(TEST_PATH,""))
+
+from python.prod.erc import ERC20
+from python.prod.cpt.factory import UniswapFactory
+from python.prod.simulate import SolveDeltas
+from python.prod.simulate import CorrectReserves
+from python.prod.utils.data import UniswapExchangeData
+
+USER0 = 'user0'
+
+class Test_SolveDeltas(unittest.TestCase):
+   
+    def setup_lp(self, eth, tkn):
+        eth_amount = 1000
+        tkn_amount = 100000
+        factory = UniswapFactory("ETH pool factory", "0x2")
+        exchg_data = UniswapExchangeData(tkn0 = eth, tkn1 = tkn, symbol="LP", address="0x011")
+        lp_tkn = factory.deploy(exchg_data)
+        lp_tkn.add_liquidity(USER0, eth_amount, tkn_amount, eth_amount, tkn_amount)
+        return lp_tkn
+
+    def test_analytic_matchesFsolve(self):
+        tkn = ERC20("TKN", "0x111")
+        eth = ERC20("ETH", "0x09")        
+        lp_tkn = self.setup_lp(eth, tkn)
+        sDel = SolveDeltas(lp_tkn)
+        sDel_fsolve = SolveDeltas(lp_tkn, SolveDeltas.FSOLVE)
+        p_arr = np.array([50, 99, 100.5, 130])
+        (dx_arr, dy_arr) = sDel.calc_batch(p_arr)
+        for (p, dx, dy) in zip(p_arr, dx_arr, dy_arr):
+            self.assertEqual(sDel.calc(p), (dx, dy))
+            self.assertAlmostEqual((lp_tkn.reserve1 + dy)/(lp_tkn.reserve0 + dx), p)
+            (dx_fsolve, dy_fsolve) = sDel_fsolve.calc(p, p, 1)
+            self.assertAlmostEqual(dx, dx_fsolve, places=6)
+            self.assertAlmostEqual(dy, dy_fsolve, places=6)
+        self.assertEqual(sDel.calc(100), (0, 0))
+
+    def test_correct_reserves(self):
+        tkn = ERC20("TKN", "0x111")
+        eth = ERC20("ETH", "0x09")        
+        lp_tkn = self.setup_lp(eth, tkn)
+        arb = CorrectReserves(lp_tkn, x0 = 100)
+        for p in [104, 97.5, 97.5, 110]:
+            arb.apply(p)
+            self.assertAlmostEqual(lp_tkn.get_price(eth), p)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -14,6 +14,10 @@ from python.prod.erc import ERC20
 from python.prod.utils.data import UniswapExchangeData
 from python.prod.cpt.quote import LPQuote
 from python.test.v3.utilities import *
+from python.prod.process.swap import Swap
+from python.prod.utils.tools.v3 import SwapMath, SqrtPriceMath, TickMath
+from python.prod.simulate import UniswapV3Batch
+from python.prod.process.deposit import SwapDeposit
 import numpy as np 
 
 USER_ACCT0 = 'user0'
@@ -24,28 +28,30 @@ DAI_AMT = 1000
 class Test_UniV3Swaps(unittest.TestCase):
 
                       
-    def setup_deploy(self, factory, tkn1, tkn2, tick_spacing, fee):
+    def setup_deploy(self, factory, tkn1, tkn2, tick_spacing, fee, trusted = False, observation_cardinality = 1,
+                     engine = UniswapExchangeData.ENGINE_EXACT):
         exchg_data = UniswapExchangeData(tkn0 = tkn1, tkn1 = tkn2, symbol="LP", 
                                            address="0x011", version = UniswapExchangeData.VERSION_V3,
                                            precision = UniswapExchangeData.TYPE_GWEI, 
-                                           tick_spacing = tick_spacing, fee = fee)
+                                           tick_spacing = tick_spacing, fee = fee, trusted = trusted,
+                                           observation_cardinality = observation_cardinality, engine = engine)
         return factory.deploy(exchg_data)
               
     
-    def setup_lp(self, tkn1, tkn2):
+    def setup_lp(self, tkn1, tkn2, trusted = False, observation_cardinality = 1, engine = UniswapExchangeData.ENGINE_EXACT):
         fee = FeeAmount.MEDIUM
         tick_spacing = TICK_SPACINGS[FeeAmount.MEDIUM]
         factory = UniswapFactory("TEST pool factory", "0x2")
-        lp = self.setup_deploy(factory, tkn1, tkn2, tick_spacing, fee)  
+        lp = self.setup_deploy(factory, tkn1, tkn2, tick_spacing, fee, trusted, observation_cardinality, engine)  
         lp.initialize(encodePriceSqrt(1, 10))    
         return lp
 
-    def setup_lp_mint(self):  
+    def setup_lp_mint(self, trusted = False, observation_cardinality = 1, engine = UniswapExchangeData.ENGINE_EXACT):  
         lwr_tick = getMinTick(TICK_SPACINGS[FeeAmount.MEDIUM])
         upr_tick = getMaxTick(TICK_SPACINGS[FeeAmount.MEDIUM])
         usdc = ERC20("USDC", "0x09") 
         dai = ERC20("DAI", "0x111")
-        lp = self.setup_lp(usdc, dai)
+        lp = self.setup_lp(usdc, dai, trusted, observation_cardinality, engine)
         (amt0, amt1)  = lp.mint(USER_ACCT0, lwr_tick, upr_tick, 3161) 
         return (amt0, amt1, lp)   
 
@@ -121,8 +127,491 @@ class Test_UniV3Swaps(unittest.TestCase):
         assert position.feeGrowthInside1LastX128 == 10208471007628121634924383110460558
         assert position.tokensOwed0 == 3, "tokens owed 0 before"
         assert position.tokensOwed1 == 0, "tokens owed 1 before"                   
-          
 
+    def test_swapBatch_matchesSwaps(self):
+        tick_spacing = TICK_SPACINGS[FeeAmount.MEDIUM]
+        lwr_tick = getMinTick(TICK_SPACINGS[FeeAmount.MEDIUM])
+        upr_tick = getMaxTick(TICK_SPACINGS[FeeAmount.MEDIUM])
+        flags = np.array([False, True, False, True])
+        amounts = np.array([10**16, 10**16, 10**15, 10**17])
+        lps = []
+        for k in range(2):
+            (_, _, lp) = self.setup_lp_mint() 
+            lp.mint(USER_ACCT0, lwr_tick + tick_spacing, upr_tick - tick_spacing, expandTo18Decimals(1))
+            lp.mint(USER_ACCT1, -46080, -23040, expandTo18Decimals(1))
+            lps.append(lp)
+
+        (lp, batch_lp) = lps
+        tokens = lp.factory.token_from_exchange[lp.name]
+        out = [Swap().apply(lp, tokens[lp.token0] if flag else tokens[lp.token1], USER_ACCT0, amt) 
+               for (flag, amt) in zip(flags.tolist(), amounts.tolist())]
+        res = batch_lp.swap_batch(flags, amounts, USER_ACCT0)
+
+        assert list(res['amount_out']) == out
+        assert res['price'][-1] == lp.get_price(tokens[lp.token0])
+        assert (res['reserve0'][-1], res['reserve1'][-1]) == (lp.reserve0, lp.reserve1)
+        assert batch_lp.slot0 == lp.slot0 and batch_lp.ticks == lp.ticks
+        assert (batch_lp.feeGrowthGlobal0X128, batch_lp.feeGrowthGlobal1X128) == (lp.feeGrowthGlobal0X128, lp.feeGrowthGlobal1X128)
+
+        # Amounts on both sides of 2**63 stay exact ints
+        out = [Swap().apply(lp, tokens[lp.token0] if flag else tokens[lp.token1], USER_ACCT0, amt) 
+               for (flag, amt) in [(True, 10**18), (False, 10**19)]]
+        res = batch_lp.swap_batch([True, False], [10**18, 10**19], USER_ACCT0)
+        assert list(res['amount_out']) == out
+        assert batch_lp.slot0 == lp.slot0 and (batch_lp.reserve0, batch_lp.reserve1) == (lp.reserve0, lp.reserve1)
+
+    def test_transaction_rollback(self):
+        tick_spacing = TICK_SPACINGS[FeeAmount.MEDIUM]
+        lwr_tick = getMinTick(TICK_SPACINGS[FeeAmount.MEDIUM])
+        upr_tick = getMaxTick(TICK_SPACINGS[FeeAmount.MEDIUM])
+        (_, _, lp) = self.setup_lp_mint() 
+        lp.mint(USER_ACCT0, lwr_tick + tick_spacing, upr_tick - tick_spacing, expandTo18Decimals(1))
+        tokens = lp.factory.token_from_exchange[lp.name]
+        state = lambda lp: copy.deepcopy((lp.slot0, lp.ticks, lp.positions, lp.total_supply, lp.protocolFees,
+                                          lp.feeGrowthGlobal0X128, lp.feeGrowthGlobal1X128, lp.reserve0, lp.reserve1,
+                                          tokens.get(lp.token0).token_total, tokens.get(lp.token1).token_total))
+        before = state(lp)
+
+        with pytest.raises(AssertionError):
+            with lp.transaction():
+                lp.setFeeProtocol(6, 6)
+                lp.mint(USER_ACCT1, -46080, -23040, expandTo18Decimals(1))
+                lp.swapExact0For1(USER_ACCT0, expandTo18Decimals(1) // 10,  None)
+                with lp.transaction():
+                    lp.burn(USER_ACCT1, -46080, -23040, expandTo18Decimals(1))
+                    lp.collect(USER_ACCT1, -46080, -23040, MAX_UINT128, MAX_UINT128)
+                assert lp.ticks.sortedTicks == [lwr_tick, lwr_tick + tick_spacing, upr_tick - tick_spacing, upr_tick]
+                lp.swapExact1For0(USER_ACCT0, expandTo18Decimals(100), 0)
+
+        assert lp.journal.savepoints == []
+        assert state(lp) == before
+        assert lp.ticks.sortedTicks == sorted(lp.ticks.keys())
+
+        with lp.transaction():
+            lp.mint(USER_ACCT1, -46080, -23040, expandTo18Decimals(1))
+            with pytest.raises(AssertionError):
+                with lp.transaction():
+                    lp.burn(USER_ACCT1, -46080, -23040, expandTo18Decimals(1))
+                    assert False
+        assert lp.positions[getPositionKey(USER_ACCT1, -46080, -23040)].liquidity == expandTo18Decimals(1)
+
+    def test_trustedPool_matchesChecked(self):
+        tick_spacing = TICK_SPACINGS[FeeAmount.MEDIUM]
+        lwr_tick = getMinTick(TICK_SPACINGS[FeeAmount.MEDIUM])
+        upr_tick = getMaxTick(TICK_SPACINGS[FeeAmount.MEDIUM])
+        lps = []
+        for trusted in [False, True]:
+            (_, _, lp) = self.setup_lp_mint(trusted) 
+            lp.setFeeProtocol(6, 6)
+            lp.mint(USER_ACCT0, lwr_tick + tick_spacing, upr_tick - tick_spacing, expandTo18Decimals(1))
+            lp.mint(USER_ACCT1, -46080, -23040, expandTo18Decimals(1))
+            lp.swapExact0For1(USER_ACCT0, expandTo18Decimals(1) // 10,  None)
+            lp.swap1ForExact0(USER_ACCT1, expandTo18Decimals(1) // 100, None)
+            lp.swapExact1For0(USER_ACCT0, expandTo18Decimals(1), None)
+            lp.burn(USER_ACCT1, -46080, -23040, expandTo18Decimals(1) // 2)
+            lp.collect(USER_ACCT1, -46080, -23040, MAX_UINT128, MAX_UINT128)
+            assert kernelMode.checked
+            lps.append(lp)
+
+        (checked, trusted) = lps
+        assert trusted.trusted and not checked.trusted
+        assert trusted.slot0 == checked.slot0
+        assert trusted.total_supply == checked.total_supply
+        assert trusted.feeGrowthGlobal0X128 == checked.feeGrowthGlobal0X128
+        assert trusted.feeGrowthGlobal1X128 == checked.feeGrowthGlobal1X128
+        assert trusted.protocolFees == checked.protocolFees
+        assert trusted.ticks == checked.ticks
+        assert trusted.positions == checked.positions
+        assert (trusted.reserve0, trusted.reserve1) == (checked.reserve0, checked.reserve1)
+
+    def test_quoteSwap_matchesSwap(self):
+        tick_spacing = TICK_SPACINGS[FeeAmount.MEDIUM]
+        lwr_tick = getMinTick(TICK_SPACINGS[FeeAmount.MEDIUM])
+        upr_tick = getMaxTick(TICK_SPACINGS[FeeAmount.MEDIUM])
+        (_, _, lp) = self.setup_lp_mint() 
+        lp.setFeeProtocol(6, 6)
+        lp.mint(USER_ACCT0, lwr_tick + tick_spacing, upr_tick - tick_spacing, expandTo18Decimals(1))
+        lp.mint(USER_ACCT1, -46080, -23040, expandTo18Decimals(1))
+        tokens = lp.factory.token_from_exchange[lp.name]
+
+        for (zeroForOne, exactInput, amount) in [(False, True, expandTo18Decimals(1) // 100),
+                                                 (True, False, expandTo18Decimals(1) // 100), 
+                                                 (True, True, expandTo18Decimals(1) // 10)]:
+            slot0 = copy.deepcopy(lp.slot0)
+            ticks = copy.deepcopy(lp.ticks)
+            totals = (tokens.get(lp.token0).token_total, tokens.get(lp.token1).token_total)
+            feeGrowth = (lp.feeGrowthGlobal0X128, lp.feeGrowthGlobal1X128)
+
+            if exactInput:
+                quote = lp.quote_exact_input(zeroForOne, amount)
+            else:
+                quote = lp.quote_exact_output(zeroForOne, amount)
+
+            assert lp.slot0 == slot0 and lp.ticks == ticks
+            assert (lp.feeGrowthGlobal0X128, lp.feeGrowthGlobal1X128) == feeGrowth
+            assert (tokens.get(lp.token0).token_total, tokens.get(lp.token1).token_total) == totals
+
+            amountSpecified = amount if exactInput else -amount
+            limit = getSqrtPriceLimitX96(TEST_TOKENS[0] if zeroForOne else TEST_TOKENS[1])
+            (_, amount0, amount1, sqrtPriceX96, liquidity, tick) = lp.swap(USER_ACCT0, zeroForOne, amountSpecified, limit)
+            assert (quote.amount0, quote.amount1) == (amount0, amount1)
+            assert (quote.sqrtPriceX96, quote.tick, quote.liquidity) == (sqrtPriceX96, tick, liquidity)
+
+        assert quote.ticksCrossed == [-23040]
+
+    def test_swap_updatesLiquidity_afterCrossing(self):
+        tick_spacing = TICK_SPACINGS[FeeAmount.MEDIUM]
+        lwr_tick = getMinTick(TICK_SPACINGS[FeeAmount.MEDIUM])
+        upr_tick = getMaxTick(TICK_SPACINGS[FeeAmount.MEDIUM])
+        for engine in [UniswapExchangeData.ENGINE_EXACT, UniswapExchangeData.ENGINE_FLOAT]:
+            (_, _, lp) = self.setup_lp_mint(engine = engine) 
+            lp.mint(USER_ACCT0, lwr_tick + tick_spacing, upr_tick - tick_spacing, expandTo18Decimals(1))
+            lp.mint(USER_ACCT1, -23100, -22980, expandTo18Decimals(1))
+            assert lp.total_supply == 3161 + 2*expandTo18Decimals(1)
+
+            (_, _, _, sqrtPriceX96, liquidity, tick) = lp.swapExact0For1(USER_ACCT0, expandTo18Decimals(1) // 10, None)
+            assert tick < -23100 and liquidity == 3161 + expandTo18Decimals(1)
+            assert lp.total_supply == lp.get_active_liquidity() == liquidity
+            assert lp.get_liquidity() == pytest.approx(liquidity / 10**18, rel = 1e-15)
+
+            # the next swap runs on the liquidity left in range, as on a pool holding only that liquidity
+            fresh = self.setup_deploy(UniswapFactory("TEST pool factory", "0x2"), ERC20("USDC", "0x09"), 
+                                      ERC20("DAI", "0x111"), tick_spacing, FeeAmount.MEDIUM, engine = engine)
+            fresh.initialize(sqrtPriceX96)
+            fresh.mint(USER_ACCT0, lwr_tick + tick_spacing, upr_tick - tick_spacing, liquidity)
+            quote = lp.quote_exact_input(True, expandTo18Decimals(1) // 100)
+            expected = fresh.swapExact0For1(USER_ACCT0, expandTo18Decimals(1) // 100, None)
+            result = lp.swapExact0For1(USER_ACCT0, expandTo18Decimals(1) // 100, None)
+            if engine == UniswapExchangeData.ENGINE_EXACT:
+                assert result[1:] == expected[1:]
+            else:
+                assert [float(v) for v in result[1:]] == pytest.approx([float(v) for v in expected[1:]], rel = 1e-12)
+            assert (quote.amount0, quote.amount1, quote.sqrtPriceX96, quote.liquidity, quote.tick) == result[1:]
+
+    def test_observe_tickCumulatives(self):
+        tick_spacing = TICK_SPACINGS[FeeAmount.MEDIUM]
+        lwr_tick = getMinTick(TICK_SPACINGS[FeeAmount.MEDIUM])
+        upr_tick = getMaxTick(TICK_SPACINGS[FeeAmount.MEDIUM])
+        (_, _, lp) = self.setup_lp_mint(observation_cardinality = 4) 
+        lp.mint(USER_ACCT0, lwr_tick + tick_spacing, upr_tick - tick_spacing, expandTo18Decimals(1))
+        assert (lp.slot0.observationIndex, lp.slot0.observationCardinality, lp.slot0.observationCardinalityNext) == (0, 1, 4)
+
+        ticks = [lp.slot0.tick]
+        lp.set_block_timestamp(10)
+        lp.swapExact0For1(USER_ACCT0, expandTo18Decimals(1) // 10, None)
+        ticks.append(lp.slot0.tick)
+        lp.set_block_timestamp(30)
+        lp.swapExact1For0(USER_ACCT0, expandTo18Decimals(1) // 100, None)
+        ticks.append(lp.slot0.tick)
+        assert ticks[0] != ticks[1] and ticks[1] != ticks[2]
+        assert (lp.slot0.observationIndex, lp.slot0.observationCardinality) == (2, 4)
+
+        # A rolled back swap leaves the ring untouched
+        state = lambda lp: copy.deepcopy((lp.slot0, lp.observations))
+        before = state(lp)
+        lp.set_block_timestamp(35)
+        with pytest.raises(AssertionError):
+            with lp.transaction():
+                lp.swapExact0For1(USER_ACCT0, expandTo18Decimals(1) // 100, None)
+                assert False
+        assert state(lp) == before
+
+        lp.set_block_timestamp(40)
+        (tickCumulatives, secondsPerLiquidityX128s) = lp.observe([0, 10, 25, 40])
+        cum10 = ticks[0]*10
+        cum30 = cum10 + ticks[1]*20
+        assert tickCumulatives == [cum30 + ticks[2]*10, cum30, cum10 + ticks[1]*5, 0]
+        assert secondsPerLiquidityX128s[-1] == 0
+        assert secondsPerLiquidityX128s[0] > secondsPerLiquidityX128s[1] > secondsPerLiquidityX128s[2] > 0
+        with pytest.raises(AssertionError):
+            lp.observe([41])
+
+    def test_swapTrace_recordsSteps(self):
+        tick_spacing = TICK_SPACINGS[FeeAmount.MEDIUM]
+        lwr_tick = getMinTick(TICK_SPACINGS[FeeAmount.MEDIUM])
+        upr_tick = getMaxTick(TICK_SPACINGS[FeeAmount.MEDIUM])
+        (_, _, lp) = self.setup_lp_mint() 
+        lp.mint(USER_ACCT0, lwr_tick + tick_spacing, upr_tick - tick_spacing, expandTo18Decimals(1))
+        lp.mint(USER_ACCT1, -46080, -23040, expandTo18Decimals(1))
+        
+        trace = lp.enable_trace(capacity = 1)
+        amount = expandTo18Decimals(1) // 10
+        quote = lp.quote_exact_input(True, amount)
+        assert len(trace) == 0
+        (_, amount0, amount1, sqrtPriceX96, _, _) = lp.swapExact0For1(USER_ACCT0, amount, None)
+        lp.swapExact0For1(USER_ACCT0, amount // 10, None)
+        assert lp.disable_trace() is trace and lp.trace == None
+        lp.swapExact0For1(USER_ACCT0, amount // 10, None)
+
+        records = trace.to_records()
+        first = records[records['swap'] == 0]
+        assert trace.n_swaps == 2 and len(records) == len(trace) and trace.capacity >= len(trace)
+        assert list(first['step']) == list(range(len(first)))
+        assert len(quote.ticksCrossed) > 0
+        assert list(first['tickNext'][first['sqrtPriceX96'] == first['sqrtPriceNextX96']]) == quote.ticksCrossed
+        assert sum(int(v) for v in first['amountIn'] + first['feeAmount']) == pytest.approx(amount0, rel=1e-12)
+        assert first['sqrtPriceX96'][-1] == float(sqrtPriceX96)
+        assert list(trace.column('liquidity')) == list(records['liquidity'])
+        trace.clear()
+        assert len(trace) == 0 and len(trace.to_records()) == 0
+
+    def test_swapToPrice_reachesTarget(self):
+        tick_spacing = TICK_SPACINGS[FeeAmount.MEDIUM]
+        lwr_tick = getMinTick(TICK_SPACINGS[FeeAmount.MEDIUM])
+        upr_tick = getMaxTick(TICK_SPACINGS[FeeAmount.MEDIUM])
+        lps = []
+        for k in range(2):
+            (_, _, lp) = self.setup_lp_mint() 
+            lp.mint(USER_ACCT0, lwr_tick + tick_spacing, upr_tick - tick_spacing, expandTo18Decimals(1))
+            lp.mint(USER_ACCT1, -46080, -23040, expandTo18Decimals(1))
+            lps.append(lp)
+        (lp, exact_lp) = lps
+
+        assert lp.amount_to_price(lp.slot0.sqrtPriceX96) == (True, 0)
+        target = TickMath.getSqrtRatioAtTick(-30000) + 10**12
+        (zeroForOne, amount) = lp.amount_to_price(target)
+        quote = lp.quote_exact_input(zeroForOne, amount - 1)
+        assert zeroForOne and quote.sqrtPriceX96 > target and quote.ticksCrossed == [-23040]
+
+        (_, amount0, _, sqrtPriceX96, _, tick) = lp.swap_to_price(USER_ACCT0, target)
+        assert (amount0, sqrtPriceX96, tick) == (amount, target, -30000)
+        # Without the limit the rounded up input only overshoots the target by rounding dust
+        (_, amount0, _, sqrtPriceX96, _, tick) = exact_lp.swapExact0For1(USER_ACCT0, amount, None)
+        assert amount0 == amount and tick == -30000 and 0 <= target - sqrtPriceX96 < target >> 48
+
+    def test_swapToPrice_decPrecision(self):
+        tick_spacing = TICK_SPACINGS[FeeAmount.MEDIUM]
+        lwr_tick = getMinTick(TICK_SPACINGS[FeeAmount.MEDIUM])
+        upr_tick = getMaxTick(TICK_SPACINGS[FeeAmount.MEDIUM])
+        (_, _, gwei_lp) = self.setup_lp_mint() 
+        gwei_lp.mint(USER_ACCT0, lwr_tick + tick_spacing, upr_tick - tick_spacing, expandTo18Decimals(1))
+        factory = UniswapFactory("TEST pool factory", "0x2")
+        exchg_data = UniswapExchangeData(tkn0 = ERC20("USDC", "0x09"), tkn1 = ERC20("DAI", "0x111"), symbol="LP", 
+                                         address="0x011", version = UniswapExchangeData.VERSION_V3,
+                                         tick_spacing = tick_spacing, fee = FeeAmount.MEDIUM)
+        lp = factory.deploy(exchg_data)
+        lp.initialize(encodePriceSqrt(1, 10))
+        lp.mint(USER_ACCT0, lwr_tick, upr_tick, 3161e-18)
+        lp.mint(USER_ACCT0, lwr_tick + tick_spacing, upr_tick - tick_spacing, 1)
+
+        # Amounts come back in human units once, as on the GWEI pool in machine units
+        target = TickMath.getSqrtRatioAtTick(-30000)
+        (zeroForOne, amount) = lp.amount_to_price(target)
+        assert zeroForOne and amount == pytest.approx(gwei_lp.amount_to_price(target)[1] / 10**18, rel = 1e-12)
+        (_, amount0, _, sqrtPriceX96, _, tick) = lp.swap_to_price(USER_ACCT0, target)
+        assert (amount0, sqrtPriceX96, tick) == (amount, target, -30000)
+
+    def test_collectAll_matchesCollect(self):
+        tick_spacing = TICK_SPACINGS[FeeAmount.MEDIUM]
+        lwr_tick = getMinTick(TICK_SPACINGS[FeeAmount.MEDIUM])
+        upr_tick = getMaxTick(TICK_SPACINGS[FeeAmount.MEDIUM])
+        (_, _, lp) = self.setup_lp_mint() 
+        ranges = [(lwr_tick + tick_spacing, upr_tick - tick_spacing), (-46080, -23040), (-23100, -22980)]
+        for (tickLower, tickUpper) in ranges:
+            lp.mint(USER_ACCT0, tickLower, tickUpper, expandTo18Decimals(1))
+        lp.mint(USER_ACCT1, -23100, -22980, expandTo18Decimals(1))
+        lp.swapExact0For1(USER_ACCT0, expandTo18Decimals(1) // 10, None)
+
+        positions = lp.positions
+        assert positions.ownerPositions(USER_ACCT0) == [(USER_ACCT0, lwr_tick, upr_tick)] + [(USER_ACCT0,) + r for r in ranges]
+        assert positions.rangePositions(-23100, -22980) == [(USER_ACCT0, -23100, -22980), (USER_ACCT1, -23100, -22980)]
+        assert positions.rangePositions(-600, 600) == []
+
+        expected = copy.deepcopy(lp)
+        assert expected.positions.ownerPositions(USER_ACCT1) == [(USER_ACCT1, -23100, -22980)]
+        (amount0, amount1) = (0, 0)
+        for (_, tickLower, tickUpper) in expected.positions.ownerPositions(USER_ACCT0):
+            expected.burn(USER_ACCT0, tickLower, tickUpper, 0)
+            (_, _, _, collected0, collected1) = expected.collect(USER_ACCT0, tickLower, tickUpper, MAX_UINT128, MAX_UINT128)
+            (amount0, amount1) = (amount0 + collected0, amount1 + collected1)
+
+        assert amount0 > 0 and lp.collect_all(USER_ACCT0) == (amount0, amount1)
+        assert lp.positions == expected.positions
+        tokens = lp.factory.token_from_exchange[lp.name]
+        expected_tokens = expected.factory.token_from_exchange[expected.name]
+        assert [tokens[name].token_total for name in tokens] == [expected_tokens[name].token_total for name in tokens]
+        assert lp.poke_all() == len(lp.positions)
+
+    def test_valuePositions_matchesBurn(self):
+        tick_spacing = TICK_SPACINGS[FeeAmount.MEDIUM]
+        lwr_tick = getMinTick(TICK_SPACINGS[FeeAmount.MEDIUM])
+        upr_tick = getMaxTick(TICK_SPACINGS[FeeAmount.MEDIUM])
+        (_, _, lp) = self.setup_lp_mint() 
+        for (tickLower, tickUpper) in [(lwr_tick + tick_spacing, upr_tick - tick_spacing), (-46080, -23040), (-23100, -22980)]:
+            lp.mint(USER_ACCT0, tickLower, tickUpper, expandTo18Decimals(1))
+        lp.mint(USER_ACCT1, -23100, -22980, expandTo18Decimals(1))
+        lp.swapExact0For1(USER_ACCT0, expandTo18Decimals(1) // 10**4, None)
+        lp.swapExact1For0(USER_ACCT0, expandTo18Decimals(1) // 10**5, None)
+
+        positions = copy.deepcopy(lp.positions)
+        values = lp.value_positions()
+        fast_values = lp.value_positions(exact = False)
+        assert lp.positions == positions and values['keys'] == list(positions)
+
+        expected = copy.deepcopy(lp)
+        for (k, (owner, tickLower, tickUpper)) in enumerate(values['keys']):
+            liquidity = expected.positions[(owner, tickLower, tickUpper)].liquidity
+            (_, _, _, _, amount0, amount1) = expected.burn(owner, tickLower, tickUpper, liquidity)
+            (_, _, _, owed0, owed1) = expected.collect(owner, tickLower, tickUpper, MAX_UINT128, MAX_UINT128)
+            assert values['liquidity'][k] == liquidity
+            assert (values['amount0'][k], values['amount1'][k]) == (amount0, amount1)
+            assert (values['fees0'][k], values['fees1'][k]) == (owed0 - amount0, owed1 - amount1)
+        assert values['fees0'].sum() > 0 and values['fees1'].sum() > 0
+        for name in ['liquidity', 'amount0', 'amount1', 'fees0', 'fees1']:
+            assert fast_values[name] == pytest.approx(values[name].astype(float), rel = 1e-12, abs = 1)
+
+        subset = lp.positions.ownerPositions(USER_ACCT1)
+        assert list(lp.value_positions(subset)['amount0']) == [values['amount0'][-1]]
+
+    def test_floatEngine_matchesExact(self):
+        tick_spacing = TICK_SPACINGS[FeeAmount.MEDIUM]
+        lwr_tick = getMinTick(TICK_SPACINGS[FeeAmount.MEDIUM])
+        upr_tick = getMaxTick(TICK_SPACINGS[FeeAmount.MEDIUM])
+        lps = []
+        results = []
+        for engine in [UniswapExchangeData.ENGINE_EXACT, UniswapExchangeData.ENGINE_FLOAT]:
+            (_, _, lp) = self.setup_lp_mint(engine = engine) 
+            lp.setFeeProtocol(6, 6)
+            res = [lp.mint(USER_ACCT0, lwr_tick + tick_spacing, upr_tick - tick_spacing, expandTo18Decimals(1))]
+            res.append(lp.mint(USER_ACCT1, -46080, -23040, expandTo18Decimals(1)))
+            res.append(lp.swapExact0For1(USER_ACCT0, expandTo18Decimals(1) // 10,  None)[1:4])
+            res.append(lp.swap1ForExact0(USER_ACCT1, expandTo18Decimals(1) // 100, None)[1:4])
+            res.append(lp.swapExact1For0(USER_ACCT0, expandTo18Decimals(1) // 1000, None)[1:4])
+            res.append(lp.burn(USER_ACCT1, -46080, -23040, expandTo18Decimals(1) // 2)[3:])
+            res.append(lp.collect(USER_ACCT1, -46080, -23040, MAX_UINT128, MAX_UINT128)[3:])
+            lps.append(lp)
+            results.append(np.array([float(value) for values in res for value in values]))
+
+        (exact, approx) = lps
+        assert type(approx).__name__ == 'UniswapV3FloatExchange' and type(exact).__name__ == 'UniswapV3Exchange'
+        assert approx.version == UniswapExchangeData.VERSION_V3
+        assert results[1] == pytest.approx(results[0], rel = 1e-12)
+        assert approx.slot0.tick == exact.slot0.tick
+        assert approx.total_supply == exact.total_supply
+        assert approx.feeGrowthGlobal0X128 == pytest.approx(exact.feeGrowthGlobal0X128, rel = 1e-12)
+        assert approx.feeGrowthGlobal1X128 == pytest.approx(exact.feeGrowthGlobal1X128, rel = 1e-12)
+        assert list(approx.ticks) == list(exact.ticks)
+        assert [info.liquidityNet for info in approx.ticks.values()] == [info.liquidityNet for info in exact.ticks.values()]
+        assert [approx.get_reserve(tkn) for tkn in [ERC20("USDC", "0x09"), ERC20("DAI", "0x111")]] == pytest.approx(
+            [exact.get_reserve(tkn) for tkn in [ERC20("USDC", "0x09"), ERC20("DAI", "0x111")]], rel = 1e-12)
+        assert approx.collect_all(USER_ACCT0) == pytest.approx(exact.collect_all(USER_ACCT0), rel = 1e-12)
+        target = TickMath.getSqrtRatioAtTick(exact.slot0.tick + 600)
+        assert approx.amount_to_price(target)[1] == pytest.approx(exact.amount_to_price(target)[1], rel = 1e-12)
+
+    def test_floatEngine_valuePositions(self):
+        tick_spacing = TICK_SPACINGS[FeeAmount.MEDIUM]
+        lwr_tick = getMinTick(TICK_SPACINGS[FeeAmount.MEDIUM])
+        upr_tick = getMaxTick(TICK_SPACINGS[FeeAmount.MEDIUM])
+        lps = []
+        for engine in [UniswapExchangeData.ENGINE_EXACT, UniswapExchangeData.ENGINE_FLOAT]:
+            (_, _, lp) = self.setup_lp_mint(engine = engine) 
+            lp.mint(USER_ACCT0, lwr_tick + tick_spacing, upr_tick - tick_spacing, expandTo18Decimals(1))
+            lp.mint(USER_ACCT1, -46080, -23040, expandTo18Decimals(1))
+            lp.swapExact0For1(USER_ACCT0, expandTo18Decimals(1) // 10, None)
+            lp.swapExact1For0(USER_ACCT0, expandTo18Decimals(1) // 1000, None)
+            lps.append(lp)
+
+        (exact, approx) = lps
+        expected = exact.value_positions()
+        for mode in [True, False]:
+            values = approx.value_positions(exact = mode)
+            assert values['keys'] == expected['keys'] and values['fees0'].dtype == float
+            for name in ['liquidity', 'amount0', 'amount1', 'fees0', 'fees1']:
+                assert values[name] == pytest.approx(expected[name].astype(float), rel = 1e-9, abs = 1)
+        assert values['fees0'].sum() > 0 and values['fees1'].sum() > 0
+
+    def test_batch_matchesReplicas(self):
+        tick_spacing = TICK_SPACINGS[FeeAmount.MEDIUM]
+        lwr_tick = getMinTick(TICK_SPACINGS[FeeAmount.MEDIUM])
+        upr_tick = getMaxTick(TICK_SPACINGS[FeeAmount.MEDIUM])
+        (_, _, lp) = self.setup_lp_mint() 
+        lp.setFeeProtocol(6, 6)
+        lp.mint(USER_ACCT0, lwr_tick + tick_spacing, upr_tick - tick_spacing, expandTo18Decimals(1))
+        lp.mint(USER_ACCT1, -46080, -23040, expandTo18Decimals(1))
+        lp.mint(USER_ACCT1, -23040, -22980, expandTo18Decimals(1))
+        lp.swapExact0For1(USER_ACCT0, 10**15, None)
+
+        batch = UniswapV3Batch(lp, 5)
+        replicas = [copy.deepcopy(lp) for k in range(5)]
+        # second round crosses ticks in both directions
+        rounds = [(np.array([True, False, True, False, True]), [10**14, 10**14, 10**15, 0, 3*10**13]),
+                  (np.array([False, True, True, False, False]), [10**17, 10**17, 10**18, 5*10**16, 2*10**18])]
+        for (token_in_flags, amounts) in rounds:
+            swapped = batch.swap(token_in_flags, np.array(amounts, dtype=float))
+            amount_out = []
+            for (replica, zeroForOne, amount) in zip(replicas, token_in_flags, amounts):
+                if amount == 0:
+                    amount_out.append(0)
+                elif zeroForOne:
+                    amount_out.append(-replica.swapExact0For1(USER_ACCT0, amount, None)[2])
+                else:
+                    amount_out.append(-replica.swapExact1For0(USER_ACCT0, amount, None)[1])
+            assert swapped['amount_out'] == pytest.approx(np.array(amount_out, dtype=float), rel = 1e-12)
+
+        assert list(batch.tick) == [replica.slot0.tick for replica in replicas]
+        assert batch.sqrtPrice*2**96 == pytest.approx([float(replica.slot0.sqrtPriceX96) for replica in replicas], rel = 1e-12)
+        assert batch.reserve0 == pytest.approx([float(replica.reserve0) for replica in replicas], rel = 1e-12)
+        assert batch.reserve1 == pytest.approx([float(replica.reserve1) for replica in replicas], rel = 1e-12)
+        assert batch.protocolFees0 == pytest.approx([float(replica.protocolFees.token0) for replica in replicas], rel = 1e-12)
+        key = getPositionKey(USER_ACCT1, -46080, -23040)
+        fees = [replica.value_positions([key])['fees0'][0] for replica in replicas]
+        assert batch.get_position_fees(*key)[0] == pytest.approx(np.array(fees, dtype=float), rel = 1e-9)
+
+    def test_trustedKernels_matchesChecked(self):
+        sqrtPrices = [MIN_SQRT_RATIO, encodePriceSqrt(1, 10), encodePriceSqrt(1, 1), encodePriceSqrt(121, 100)]
+        def run():
+            res = []
+            for (sqrtA, sqrtB) in zip(sqrtPrices[:-1], sqrtPrices[1:]):
+                res.append(SwapMath.computeSwapStep(sqrtB, sqrtA, expandTo18Decimals(2), expandTo18Decimals(1), 3000))
+                res.append(SwapMath.computeSwapStep(sqrtA, sqrtB, expandTo18Decimals(2), -expandTo18Decimals(1), 600))
+                res.append(SqrtPriceMath.getAmount0DeltaHelper(sqrtA, sqrtB, -expandTo18Decimals(3)))
+                res.append(SqrtPriceMath.getAmount1DeltaHelper(sqrtA, sqrtB, expandTo18Decimals(3)))
+                res.append(TickMath.getTickAtSqrtRatio(sqrtB - 1))
+            return res
+
+        checked = run()
+        with trustedKernels():
+            assert not kernelMode.checked
+            unchecked = run()
+            # Invalid inputs are no longer rejected by the kernels themselves
+            SqrtPriceMath.getAmount1Delta(MIN_SQRT_RATIO, MAX_SQRT_RATIO, MAX_UINT128 + 1, True)
+        assert kernelMode.checked
+        assert unchecked == checked
+        with pytest.raises(AssertionError):
+            SqrtPriceMath.getAmount1Delta(MIN_SQRT_RATIO, MAX_SQRT_RATIO, MAX_UINT128 + 1, True)
+
+    def test_swapDeposit_closedForm(self):
+        eth = ERC20("ETH", "0x09") 
+        tkn = ERC20("TKN", "0x111")
+        tick_spacing = TICK_SPACINGS[FeeAmount.MEDIUM]
+        factory = UniswapFactory("TEST pool factory", "0x2")
+        exchg_data = UniswapExchangeData(tkn0 = eth, tkn1 = tkn, symbol="LP", address="0x011", 
+                                         version = UniswapExchangeData.VERSION_V3, 
+                                         tick_spacing = tick_spacing, fee = FeeAmount.MEDIUM)
+        lp = factory.deploy(exchg_data)
+        lp.initialize(encodePriceSqrt(100, 1))
+        lp.mint(USER_ACCT0, getMinTick(tick_spacing), getMaxTick(tick_spacing), 10000)
+        lp.mint(USER_ACCT0, 46140, 46200, 100)
+        (lwr_tick, upr_tick) = (45000, 47400)
+
+        # In range: the closed form reaches the optimum of the Nelder-Mead objective
+        deposit = SwapDeposit()
+        amts = np.array([1, 2.5, 4])
+        portions = deposit.calc_univ3_deposit_portions(lp, eth, amts, lwr_tick, upr_tick)
+        for (amt, portion) in zip(amts, portions):
+            assert deposit._obj_func(portion, amt, lp, eth, lwr_tick, upr_tick) < 1e-7
+        assert deposit._calc_univ3_deposit_portion(lp, eth, amts[1], lwr_tick, upr_tick) == portions[1]
+
+        # A token1 deposit large enough to cross tick 46140 falls back to the optimizer
+        portion = deposit.calc_univ3_deposit_portions(lp, tkn, [2000], lwr_tick, upr_tick)[0]
+        assert portion == deposit._calc_univ3_deposit_portion_opt(lp, tkn, 2000, lwr_tick, upr_tick)
+
+        # The swap proceeds and the remainder are deposited in full
+        (eth_total, tkn_total) = (eth.token_total, tkn.token_total)
+        deposit.apply(lp, eth, USER_ACCT1, 2.5, lwr_tick, upr_tick)
+        assert abs((eth.token_total - eth_total)/1e18 - 2.5) < 1e-6
+        assert abs((tkn.token_total - tkn_total)/1e18) < 1e-6
+          
                        
          
 if __name__ == '__main__':
@@ -13,6 +13,8 @@ from python.prod.cpt.factory import UniswapFactory
 from python.prod.erc import ERC20
 from python.prod.utils.data import UniswapExchangeData
 from python.prod.cpt.quote import LPQuote
+from python.prod.utils.tools.v3 import TickMath, Precision, SqrtPriceMath
+from decimal import Decimal
 from python.test.v3.utilities import *
 import numpy as np 
 
@@ -22,28 +24,28 @@ DAI_AMT = 1000
 
 class Test_UniV3Tick(unittest.TestCase):
 
-    def setup_deploy(self, factory, tkn1, tkn2, tick_spacing, fee):
+    def setup_deploy(self, factory, tkn1, tkn2, tick_spacing, fee, tick_store = UniswapExchangeData.TICK_STORE_DICT):
         exchg_data = UniswapExchangeData(tkn0 = tkn1, tkn1 = tkn2, symbol="LP", 
                                            address="0x011", version = UniswapExchangeData.VERSION_V3, 
                                            precision = UniswapExchangeData.TYPE_GWEI,
-                                           tick_spacing = tick_spacing, fee = fee)
+                                           tick_spacing = tick_spacing, fee = fee, tick_store = tick_store)
         return factory.deploy(exchg_data)
               
     
-    def setup_lp(self, tkn1, tkn2):
+    def setup_lp(self, tkn1, tkn2, tick_store = UniswapExchangeData.TICK_STORE_DICT):
         fee = FeeAmount.MEDIUM
         tick_spacing = TICK_SPACINGS[FeeAmount.MEDIUM]
         factory = UniswapFactory("TEST pool factory", "0x2")
-        lp = self.setup_deploy(factory, tkn1, tkn2, tick_spacing, fee)  
+        lp = self.setup_deploy(factory, tkn1, tkn2, tick_spacing, fee, tick_store)  
         lp.initialize(encodePriceSqrt(1, 10))    
         return lp
 
-    def setup_lp_mint(self):  
+    def setup_lp_mint(self, tick_store = UniswapExchangeData.TICK_STORE_DICT):  
         lwr_tick = getMinTick(TICK_SPACINGS[FeeAmount.MEDIUM])
         upr_tick = getMaxTick(TICK_SPACINGS[FeeAmount.MEDIUM])
         usdc = ERC20("USDC", "0x09") 
         dai = ERC20("DAI", "0x111")
-        lp = self.setup_lp(usdc, dai)
+        lp = self.setup_lp(usdc, dai, tick_store)
         (amt0, amt1)  = lp.mint(USER_ACCT, lwr_tick, upr_tick, 3161) 
         return (amt0, amt1, lp)        
 
@@ -238,6 +240,200 @@ class Test_UniV3Tick(unittest.TestCase):
         )
         assert amt0 == 0
         assert amt1 == 3                           
+
+    def test_nextTick_sortedIndex(self):
+        lwr_tick = getMinTick(TICK_SPACINGS[FeeAmount.MEDIUM])
+        upr_tick = getMaxTick(TICK_SPACINGS[FeeAmount.MEDIUM])
+        (_, _, lp) = self.setup_lp_mint() 
+        lp.mint(USER_ACCT, -240, 0, 100)
+        lp.mint(USER_ACCT, -120, 60, 100)
+        assert lp.ticks.sortedTicks == sorted(lp.ticks.keys())
+        assert lp.nextTick(-120, True) == (-120, True)
+        assert lp.nextTick(-100, True) == (-120, True)
+        assert lp.nextTick(-100, False) == (0, True)
+        assert lp.nextTick(0, False) == (60, True)
+        assert lp.nextTick(lwr_tick - 1, True) == (MIN_TICK, False)
+        assert lp.nextTick(upr_tick, False) == (MAX_TICK, False)
+        lp.burn(USER_ACCT, -120, 60, 100)
+        assert lp.ticks.sortedTicks == sorted(lp.ticks.keys())
+        assert lp.nextTick(-100, True) == (-240, True)
+        assert lp.nextTick(0, False) == (upr_tick, True)
+
+    def test_tickArrayStore_matchesTickMap(self):
+        lps = []
+        for tick_store in [UniswapExchangeData.TICK_STORE_DICT, UniswapExchangeData.TICK_STORE_ARRAY]:
+            (_, _, lp) = self.setup_lp_mint(tick_store) 
+            lp.mint(USER_ACCT, -46080, -23040, 10000)
+            lp.mint(USER_ACCT, -23040, 0, 20000)
+            lp.swapExact0For1(USER_ACCT, 5000, None)
+            lp.swapExact1For0(USER_ACCT, 1000, None)
+            lp.burn(USER_ACCT, -46080, -23040, 10000)
+            lp.collect(USER_ACCT, -46080, -23040, MAX_UINT128, MAX_UINT128)
+            lps.append(lp)
+
+        (dict_lp, array_lp) = lps
+        assert isinstance(array_lp.ticks, TickArrayStore)
+        assert array_lp.ticks == dict_lp.ticks
+        assert array_lp.ticks.sortedTicks == dict_lp.ticks.sortedTicks
+        assert array_lp.ticks[-23040] == dict_lp.ticks[-23040]
+        assert array_lp.slot0 == dict_lp.slot0
+        assert array_lp.positions == dict_lp.positions
+        assert array_lp.feeGrowthGlobal0X128 == dict_lp.feeGrowthGlobal0X128
+        assert array_lp.feeGrowthGlobal1X128 == dict_lp.feeGrowthGlobal1X128
+        assert array_lp.nextTick(-100, True) == dict_lp.nextTick(-100, True)
+        assert array_lp.nextTick(-23040, True) == dict_lp.nextTick(-23040, True)
+
+        ticks = copy.deepcopy(array_lp.ticks)
+        with pytest.raises(AssertionError):
+            with array_lp.transaction():
+                array_lp.burn(USER_ACCT, -23040, 0, 20000)
+                array_lp.mint(USER_ACCT, -120, 60, 100)
+                assert False
+        assert array_lp.ticks == ticks
+        assert array_lp.ticks.sortedTicks == ticks.sortedTicks
+
+    def test_liquidityIndex_matchesTickSums(self):
+        for tick_store in [UniswapExchangeData.TICK_STORE_DICT, UniswapExchangeData.TICK_STORE_ARRAY]:
+            (_, _, lp) = self.setup_lp_mint(tick_store) 
+            lp.mint(USER_ACCT, -46080, -23040, 5000)
+            index = lp.liquidity_index()
+            lp.mint(USER_ACCT, -23100, 600, 20000)
+            lp.mint(USER_ACCT, -240, 0, 100)
+            lp.mint(USER_ACCT, -46080, -22980, 700)
+            lp.burn(USER_ACCT, -240, 0, 100)
+            assert lp.liquidity_index() is index and not lp.ticks.__contains__(-240)
+
+            def active_liquidity(tick):
+                return sum(lp.ticks[k].liquidityNet for k in lp.ticks if k <= tick)
+
+            def range_reserves(tickLower, tickUpper):
+                bounds = sorted(set([tickLower, tickUpper] + [k for k in lp.ticks if tickLower < k < tickUpper]))
+                (amount0, amount1) = (0, 0)
+                for (lwr, upr) in zip(bounds[:-1], bounds[1:]):
+                    (sqrtA, sqrtB) = (TickMath.getSqrtRatioAtTick(lwr), TickMath.getSqrtRatioAtTick(upr))
+                    amount0 += SqrtPriceMath.getAmount0Delta(sqrtA, sqrtB, active_liquidity(lwr), False)
+                    amount1 += SqrtPriceMath.getAmount1Delta(sqrtA, sqrtB, active_liquidity(lwr), False)
+                return (amount0, amount1, len(bounds))
+
+            assert lp.get_active_liquidity() == lp.total_supply
+            for tick in [MIN_TICK, -46081, -46080, -23041, -23040, -23028, -22980, -240, 0, 599, 600, MAX_TICK]:
+                assert lp.get_active_liquidity(tick) == active_liquidity(tick)
+            for (tickLower, tickUpper) in [(-46080, -23040), (-50000, 1000), (-23050, -23000), (-120, 60)]:
+                (amount0, amount1, n) = range_reserves(tickLower, tickUpper)
+                (index0, index1) = lp.get_range_reserves(tickLower, tickUpper)
+                assert abs(index0 - amount0) <= n and abs(index1 - amount1) <= n
+
+            # A rolled back transaction drops the index, which is rebuilt on next use
+            with pytest.raises(AssertionError):
+                with lp.transaction():
+                    lp.mint(USER_ACCT, -600, 600, 10**6)
+                    assert False
+            assert lp.ticks.liquidityIndex == None
+            assert lp.get_active_liquidity(0) == active_liquidity(0)
+
+    def test_mintMany_matchesMints(self):
+        owners = [USER_ACCT, 'user1', USER_ACCT, 'user1', USER_ACCT, 'user2']
+        tickLowers = [-46080, -23100, -46080, -240, -46080, 600]
+        tickUppers = [-23040, 600, -23040, 0, -22980, 1200]
+        amounts = [5000, 20000, 300, 100, 700, 900]
+        for tick_store in [UniswapExchangeData.TICK_STORE_DICT, UniswapExchangeData.TICK_STORE_ARRAY]:
+            lps = []
+            for k in range(2):
+                (_, _, lp) = self.setup_lp_mint(tick_store)
+                lp.mint(USER_ACCT, -46080, -23040, 1000)
+                lp.swapExact0For1(USER_ACCT, 5000, None)
+                lp.liquidity_index()
+                lps.append(lp)
+            (sequential, batch) = lps
+            paid = [sequential.mint(*args) for args in zip(owners, tickLowers, tickUppers, amounts)]
+            (amount0, amount1) = batch.mint_many(owners, np.array(tickLowers), np.array(tickUppers), amounts)
+
+            assert list(zip(amount0, amount1)) == paid
+            assert batch.ticks == sequential.ticks
+            assert batch.ticks.sortedTicks == sequential.ticks.sortedTicks
+            assert batch.positions == sequential.positions
+            assert batch.positions.ownerPositions('user1') == sequential.positions.ownerPositions('user1')
+            assert (batch.reserve0, batch.reserve1) == (sequential.reserve0, sequential.reserve1)
+            assert batch.total_supply == sequential.total_supply
+            assert batch.observations == sequential.observations
+            for tick in [-46081, -23041, -22980, -1, 0, 600, 1200]:
+                assert batch.get_active_liquidity(tick) == sequential.get_active_liquidity(tick)
+
+            ticks = copy.deepcopy(batch.ticks)
+            with pytest.raises(AssertionError):
+                with batch.transaction():
+                    batch.mint_many([USER_ACCT, USER_ACCT], [-120, -46080], [60, -23040], [100, 100])
+                    assert False
+            assert batch.ticks == ticks
+            assert batch.ticks.sortedTicks == ticks.sortedTicks
+
+    def test_mintMany_overflow_leavesPoolUnchanged(self):
+        for tick_store in [UniswapExchangeData.TICK_STORE_DICT, UniswapExchangeData.TICK_STORE_ARRAY]:
+            (_, _, lp) = self.setup_lp_mint(tick_store)
+            lp.mint(USER_ACCT, -46080, -23040, 1000)
+            lp.liquidity_index()
+            ticks = copy.deepcopy(lp.ticks)
+            positions = copy.deepcopy(lp.positions)
+            state = (lp.total_supply, lp.reserve0, lp.reserve1)
+            # the last range overflows maxLiquidityPerTick on the already initialized tick -23040
+            with pytest.raises(AssertionError, match = "LO"):
+                lp.mint_many([USER_ACCT, 'user1', 'user1'], [-46080, -240, -23040], [-23040, 0, 600], 
+                             [100, 100, lp.maxLiquidityPerTick])
+
+            assert lp.ticks == ticks and lp.ticks.sortedTicks == ticks.sortedTicks
+            assert lp.positions == positions
+            assert (lp.total_supply, lp.reserve0, lp.reserve1) == state
+            for tick in [-46081, -46080, -23040, -240, 0]:
+                assert lp.get_active_liquidity(tick) == (3161 + 1000 if -46080 <= tick < -23040 else 3161)
+
+    def test_loadDistribution_liquidityNet(self):
+        ticks = [-46080, -23100, -23040, -240, 0, 600]
+        liquidityNet = [5000, 20000, -5000, 100, -100, -20000]
+        (_, _, lp) = self.setup_lp_mint(UniswapExchangeData.TICK_STORE_ARRAY)
+        (amount0, amount1) = lp.load_distribution('user1', ticks, liquidityNet)
+
+        assert len(amount0) == 5 and len(lp.positions.ownerPositions('user1')) == 5
+        assert [lp.ticks[tick].liquidityNet for tick in ticks] == liquidityNet
+        assert lp.get_active_liquidity(-23040) == 3161 + 20000
+        with pytest.raises(AssertionError):
+            lp.load_distribution('user1', ticks, liquidityNet[:-1] + [-19000])
+
+    def test_mintMany_largeLiquidity(self):
+        # Liquidity on both sides of 2**63, as in mainnet pools
+        (_, _, sequential) = self.setup_lp_mint()
+        (_, _, batch) = self.setup_lp_mint()
+        paid = [sequential.mint('user1', -600, 600, 10**19), sequential.mint('user1', -1200, 600, 10**18)]
+        (amount0, amount1) = batch.mint_many(['user1', 'user1'], [-600, -1200], [600, 600], [10**19, 10**18])
+        assert list(zip(amount0, amount1)) == paid
+        assert batch.ticks == sequential.ticks and batch.positions == sequential.positions
+
+        (_, _, lp) = self.setup_lp_mint()
+        lp.load_distribution('user1', [-1200, -600, 600], [10**19, -5*10**18, -5*10**18])
+        assert [lp.ticks[tick].liquidityNet for tick in [-1200, -600, 600]] == [10**19, -5*10**18, -5*10**18]
+        assert lp.get_active_liquidity(-600) == 3161 + 5*10**18
+
+    def test_sqrtRatio_cache(self):
+        (_, _, lp) = self.setup_lp_mint() 
+        lp.mint(USER_ACCT, -240, 0, 100)
+        TickMath.clearSqrtRatioCache()
+        lp.preload_sqrt_prices()
+        assert TickMath.sqrtRatioCacheInfo().currsize == len(lp.ticks)
+        for tick in lp.ticks.sortedTicks + [MIN_TICK, -1, 0, 1, MAX_TICK]:
+            assert TickMath.getSqrtRatioAtTick(tick) == TickMath.computeSqrtRatioAtTick(tick)
+
+    def test_precision_matchesDecimal(self):
+        amounts = [0, 1, 0.1, 1.5, -2.75, 1e-7, 123456.789, 3.0e21, 1/3, np.float64(0.3), 10**20 + 7]
+        for amount in amounts:
+            gwei = int(Decimal(str(amount))*Decimal(str(10**18)))
+            assert Precision.decToGwei(amount) == gwei
+            assert Precision.decToGwei(amount, 6) == int(Decimal(str(amount))*Decimal(str(10**6)))
+            assert Precision.gweiToDec(gwei) == float(Decimal(str(gwei))/Decimal(str(10**18)))
+            assert Precision.gweiToDec(amount, 6) == float(Decimal(str(amount))/Decimal(str(10**6)))
+            assert abs(Precision.decToGweiFloat(amount) - gwei) <= abs(amount)*10**18*2**-53 + 1
+            assert Precision.gweiToDecFloat(gwei) == pytest.approx(Precision.gweiToDec(gwei), rel=2**-52)
+        gweis = [Precision.decToGwei(amount) for amount in amounts]
+        assert list(Precision.gweiToDecArray(gweis)) == [Precision.gweiToDecFloat(gwei) for gwei in gweis]
+        assert list(Precision.decToGweiArray(amounts)) == [float(Precision.decToGweiFloat(a)) for a in amounts]
          
 if __name__ == '__main__':
     unittest.main()    
\ No newline at end of file
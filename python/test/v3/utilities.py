@@ -105,7 +105,7 @@ def tryExceptHandler(fcn, assertMessage, *args):
 
 
 def getPositionKey(address, lowerTick, upperTick):
-    return hash((address, lowerTick, upperTick))
+    return (address, lowerTick, upperTick)
 
 
 def getLimitPositionKey(address, tick, isToken0):